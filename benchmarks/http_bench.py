@@ -0,0 +1,292 @@
+"""Нагрузочный замер HTTP-маршрутов на приложении в том же процессе.
+
+Для каждого размера данных создаётся временный каталог с копией резюме и
+SQLite-базой, заполненной `size` пунктами вишлиста и `size` постами. Запросы
+идут через httpx.ASGITransport без сети, так что замер воспроизводим офлайн.
+
+    uv run --extra dev python benchmarks/http_bench.py --sizes 10,1000 --output bench.json
+    uv run --extra dev python benchmarks/http_bench.py --baseline bench.json --threshold 0.2
+
+С `--baseline` сравнивает p50 и запросы в секунду с прошлым прогоном и
+завершается с кодом 1, если хоть один сценарий стал хуже больше чем на порог.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import io
+import json
+import math
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, List, Sequence
+
+ROOT = Path(__file__).resolve().parents[1]
+ADMIN_TOKEN = "bench"
+SCENARIOS = ("home", "wishlist_page", "api_resume", "api_wishlist", "reserve", "upload")
+
+# до импорта приложения: require_admin и get_settings читают настройки из окружения
+_SCRATCH = Path(tempfile.mkdtemp(prefix="resume-bench-"))
+os.environ["APP_DATA_DIR"] = str(_SCRATCH / "import")
+os.environ["APP_ADMIN_TOKEN"] = ADMIN_TOKEN
+sys.path.insert(0, str(ROOT / "src"))
+
+import httpx  # noqa: E402
+from sqlalchemy import update  # noqa: E402
+from sqlmodel import Session  # noqa: E402
+
+from app import crud, database  # noqa: E402
+from app.app_factory import create_app  # noqa: E402
+from app.config import Settings  # noqa: E402
+from app.models import WishItem  # noqa: E402
+from app.schemas import PostImport, WishItemImport  # noqa: E402
+
+Request = Callable[[httpx.AsyncClient, int], Awaitable[httpx.Response]]
+
+
+def _sample_image() -> bytes:
+    try:
+        from PIL import Image
+    except ImportError:
+        # минимальный PNG 1x1: без Pillow замеряется только приём и сохранение файла
+        return bytes.fromhex(
+            "89504e470d0a1a0a0000000d4948445200000001000000010806000000"
+            "1f15c4890000000d49444154789c6360000002000154a24f5d0000000049454e44ae426082"
+        )
+    buffer = io.BytesIO()
+    Image.new("RGB", (1024, 768), (180, 90, 40)).save(buffer, "JPEG", quality=85)
+    return buffer.getvalue()
+
+
+def seed(size: int) -> None:
+    wishes = [
+        (i, WishItemImport(title=f"Подарок {i}", description="Описание " * 10, price=str(i * 100)))
+        for i in range(size)
+    ]
+    posts = [
+        (i, PostImport(title=f"Заметка {i}", summary="Кратко " * 5, body="Текст заметки. " * 40, tags=[f"t{i % 7}"]))
+        for i in range(size)
+    ]
+    with Session(database.get_engine()) as session:
+        for start in range(0, size, 1000):
+            crud.import_wishes(session, wishes[start : start + 1000])
+            crud.import_posts(session, posts[start : start + 1000])
+
+
+def release_all() -> None:
+    with Session(database.get_engine()) as session:
+        session.exec(  # type: ignore[call-overload]
+            update(WishItem).values(reserved_by=None, reserved_contact=None, reserved_at=None, reservation_key=None)
+        )
+        session.commit()
+
+
+def percentile(values: Sequence[float], pct: float) -> float:
+    ordered = sorted(values)
+    if not ordered:
+        return 0.0
+    # nearest-rank: наименьшее значение, не меньше которого pct% выборки
+    index = max(0, min(len(ordered) - 1, math.ceil(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+async def measure(client: httpx.AsyncClient, request: Request, total: int, concurrency: int) -> Dict[str, Any]:
+    latencies: List[float] = []
+    errors = 0
+    counter = iter(range(total))
+
+    async def worker() -> None:
+        nonlocal errors
+        for i in counter:
+            started = time.perf_counter()
+            response = await request(client, i)
+            latencies.append(time.perf_counter() - started)
+            if response.status_code >= 400:
+                errors += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    return {
+        "requests": total,
+        "concurrency": concurrency,
+        "p50_ms": round(percentile(latencies, 50) * 1000, 3),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 3),
+        "mean_ms": round(sum(latencies) / len(latencies) * 1000, 3) if latencies else 0.0,
+        "rps": round(total / elapsed, 1) if elapsed else 0.0,
+        "errors": errors,
+    }
+
+
+def scenarios(size: int) -> Dict[str, Request]:
+    admin = {"X-Admin-Token": ADMIN_TOKEN}
+    image = _sample_image()
+
+    async def reserve(client: httpx.AsyncClient, i: int) -> httpx.Response:
+        return await client.post(f"/api/wishlist/{i % size + 1}/reserve", json={"name": f"Гость {i}"})
+
+    async def upload(client: httpx.AsyncClient, i: int) -> httpx.Response:
+        # хвост после конца изображения делает файл уникальным, декодеры его игнорируют
+        payload = image + i.to_bytes(8, "big")
+        return await client.post(
+            "/api/wishlist",
+            data={"title": f"Фото {i}"},
+            files={"image": ("photo.jpg", payload, "image/jpeg")},
+            headers=admin,
+        )
+
+    return {
+        "home": lambda client, _: client.get("/"),
+        "wishlist_page": lambda client, _: client.get("/wishlist"),
+        "api_resume": lambda client, _: client.get("/api/resume"),
+        "api_wishlist": lambda client, _: client.get("/api/wishlist"),
+        "reserve": reserve,
+        "upload": upload,
+    }
+
+
+async def run_size(size: int, names: Sequence[str], total: int, concurrency: int, warmup: int) -> List[Dict[str, Any]]:
+    data_dir = _SCRATCH / f"size-{size}"
+    data_dir.mkdir(parents=True, exist_ok=True)
+    resume = ROOT / "data" / "resume.yaml"
+    if resume.exists():
+        shutil.copy(resume, data_dir / "resume.yaml")
+    # движок БД глобален на процесс: без сброса create_app подхватил бы базу прошлого прогона
+    database.engine = None
+    database.async_engine = None
+    # лимиты на запись защищают от одного шумного клиента, а бенчмарк и есть такой клиент
+    app = create_app(
+        Settings(
+            data_dir=data_dir,
+            admin_token=ADMIN_TOKEN,
+            precompress_assets=False,
+            rate_limit_enabled=False,
+            max_concurrent_writes=0,
+        )
+    )
+    seed(size)
+    available = scenarios(size)
+    results = []
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        for name in names:
+            request = available[name]
+            if name == "reserve":
+                # каждый подарок бронируется один раз за проход, иначе замеряются только 409
+                rounds = [min(size, total - start) for start in range(0, total, size)]
+                chunks = []
+                for count in rounds:
+                    release_all()
+                    chunks.append(await measure(client, request, count, concurrency))
+                stats = _merge(chunks)
+            else:
+                for i in range(warmup):
+                    await request(client, i)
+                stats = await measure(client, request, total, concurrency)
+            results.append({"scenario": name, "size": size, **stats})
+            print(
+                f"{name:>14} size={size:<6} p50={stats['p50_ms']:>8.2f}ms p99={stats['p99_ms']:>8.2f}ms "
+                f"rps={stats['rps']:>8.1f} errors={stats['errors']}",
+                flush=True,
+            )
+    database.get_engine().dispose()
+    return results
+
+
+def _merge(chunks: Sequence[Dict[str, Any]]) -> Dict[str, Any]:
+    # проходы брони одинаковы по составу, поэтому усредняем их с весом по числу запросов
+    total = sum(c["requests"] for c in chunks)
+    merged: Dict[str, Any] = {"requests": total, "concurrency": chunks[0]["concurrency"]}
+    for key in ("p50_ms", "p99_ms", "mean_ms", "rps"):
+        merged[key] = round(sum(c[key] * c["requests"] for c in chunks) / total, 3)
+    merged["errors"] = sum(c["errors"] for c in chunks)
+    return merged
+
+
+def compare(results: List[Dict[str, Any]], baseline: Dict[str, Any], threshold: float) -> List[str]:
+    """Сценарии, где p50 вырос или RPS упал больше чем на `threshold` относительно базы."""
+    previous = {(r["scenario"], r["size"]): r for r in baseline.get("results", [])}
+    regressions = []
+    for current in results:
+        before = previous.get((current["scenario"], current["size"]))
+        if before is None:
+            continue
+        if before["p50_ms"] and current["p50_ms"] > before["p50_ms"] * (1 + threshold):
+            regressions.append(
+                f"{current['scenario']} size={current['size']}: p50 {before['p50_ms']} -> {current['p50_ms']} ms"
+            )
+        if before["rps"] and current["rps"] < before["rps"] * (1 - threshold):
+            regressions.append(f"{current['scenario']} size={current['size']}: rps {before['rps']} -> {current['rps']}")
+    return regressions
+
+
+def _git_revision() -> str | None:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main(argv: Sequence[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", default="10,100,1000,10000", help="размеры данных через запятую")
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS), help="сценарии через запятую")
+    parser.add_argument("--requests", type=int, default=200, help="запросов на сценарий")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--warmup", type=int, default=10, help="прогревочных запросов перед замером")
+    parser.add_argument("--output", type=Path, help="куда сохранить результаты в JSON")
+    parser.add_argument("--baseline", type=Path, help="JSON прошлого прогона для сравнения")
+    parser.add_argument("--threshold", type=float, default=0.2, help="допустимое ухудшение, доля (0.2 = 20%%)")
+    args = parser.parse_args(argv)
+
+    names = [name.strip() for name in args.scenarios.split(",") if name.strip()]
+    unknown = sorted(set(names) - set(SCENARIOS))
+    if unknown:
+        parser.error(f"неизвестные сценарии: {', '.join(unknown)}")
+    sizes = [int(size) for size in args.sizes.split(",") if size.strip()]
+
+    results: List[Dict[str, Any]] = []
+    try:
+        for size in sizes:
+            results.extend(asyncio.run(run_size(size, names, args.requests, args.concurrency, args.warmup)))
+    finally:
+        shutil.rmtree(_SCRATCH, ignore_errors=True)
+
+    report = {
+        "meta": {
+            "created_at": datetime.now(timezone.utc).isoformat(),
+            "revision": _git_revision(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "requests": args.requests,
+            "concurrency": args.concurrency,
+        },
+        "results": results,
+    }
+    if args.output:
+        args.output.write_text(json.dumps(report, ensure_ascii=False, indent=2), encoding="utf-8")
+
+    failed = sum(r["errors"] for r in results)
+    if failed:
+        print(f"Ошибочных ответов: {failed}", file=sys.stderr)
+    if args.baseline:
+        regressions = compare(results, json.loads(args.baseline.read_text(encoding="utf-8")), args.threshold)
+        for line in regressions:
+            print(f"Регрессия: {line}", file=sys.stderr)
+        if regressions:
+            return 1
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
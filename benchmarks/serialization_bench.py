@@ -0,0 +1,97 @@
+"""Микробенчмарк сериализации списка вишлиста: прежний путь против `app.serialization`.
+
+Прежний путь — то, что делал обработчик до отдельного слоя сериализации:
+строка БД -> `WishItemPublic` -> `model_dump()` -> `jsonable_encoder` FastAPI -> `json.dumps`.
+Новый — словари из `crud.wish_to_public` сразу в байты через `serialization.dumps`
+(orjson, если установлен extra `json`).
+
+    uv run python benchmarks/serialization_bench.py --sizes 10,1000,10000
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import statistics
+import sys
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Sequence
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT / "src"))
+
+from fastapi.encoders import jsonable_encoder  # noqa: E402
+
+from app import crud, serialization  # noqa: E402
+from app.models import WishItem  # noqa: E402
+from app.schemas import WishItemPublic  # noqa: E402
+
+
+def rows(size: int) -> List[WishItem]:
+    now = datetime.now(timezone.utc).replace(tzinfo=None)
+    return [
+        WishItem(
+            id=i + 1,
+            title=f"Подарок {i}",
+            description="Описание " * 10,
+            link=f"https://example.com/{i}",
+            price=str(i * 100),
+            reserved_by="Гость" if i % 3 == 0 else None,
+            reserved_at=now if i % 3 == 0 else None,
+            image_path=f"wishlist/{i:064x}.jpg",
+            image_variants=json.dumps({"variants": [{"path": f"wishlist/{i:064x}-{w}.webp", "width": w} for w in (320, 640)]}),
+            created_at=now,
+        )
+        for i in range(size)
+    ]
+
+
+def legacy(items: Sequence[WishItem]) -> bytes:
+    dumped = [WishItemPublic.model_validate(crud.wish_to_public(item)).model_dump() for item in items]
+    content = jsonable_encoder({"items": dumped, "next_cursor": None})
+    return json.dumps(content, ensure_ascii=False, allow_nan=False, separators=(",", ":")).encode("utf-8")
+
+
+def current(items: Sequence[WishItem]) -> bytes:
+    return serialization.dumps({"items": [crud.wish_to_public(item) for item in items], "next_cursor": None})
+
+
+def measure(func: Callable[[Sequence[WishItem]], bytes], items: Sequence[WishItem], repeat: int) -> float:
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func(items)
+        timings.append(time.perf_counter() - started)
+    return statistics.median(timings)
+
+
+def main(argv: Sequence[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", default="10,1000,10000", help="размеры списка через запятую")
+    parser.add_argument("--repeat", type=int, default=20, help="повторов на замер, берётся медиана")
+    args = parser.parse_args(argv)
+
+    encoder = "orjson" if serialization.orjson is not None else "json"
+    print(f"кодировщик: {encoder}")
+    results: List[Dict[str, Any]] = []
+    for size in (int(size) for size in args.sizes.split(",") if size.strip()):
+        items = rows(size)
+        if json.loads(legacy(items)) != json.loads(current(items)):
+            print(f"size={size}: ответы прежнего и нового пути различаются", file=sys.stderr)
+            return 1
+        repeat = max(3, args.repeat if size <= 1000 else args.repeat // 4)
+        before = measure(legacy, items, repeat)
+        after = measure(current, items, repeat)
+        results.append({"size": size, "legacy_ms": before * 1000, "current_ms": after * 1000})
+        print(
+            f"size={size:<6} прежний={before * 1000:>9.2f}ms новый={after * 1000:>9.2f}ms "
+            f"ускорение={before / after if after else 0:>5.1f}x",
+            flush=True,
+        )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,4 +1,21 @@
-from .__main__ import app
-from .app_factory import create_app
+import time
+from typing import Any
+
+_import_started = time.perf_counter()
+
+from .app_factory import create_app  # noqa: E402
+
+# время импорта пакета с зависимостями — первая фаза в разбивке запуска
+IMPORT_SECONDS = time.perf_counter() - _import_started
 
 __all__ = ["app", "create_app"]
+
+
+def __getattr__(name: str) -> Any:
+    # приложение создаётся при первом обращении: воркеры и утилиты импортируют `app.*`,
+    # не запуская миграции на импорте
+    if name == "app":
+        from .__main__ import app
+
+        return app
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
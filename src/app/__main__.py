@@ -1,32 +1,66 @@
 from __future__ import annotations
 
+import os
+from typing import Any, Dict
+
 import uvicorn
+from fastapi import FastAPI
+
+from . import database
+from .app_factory import create_app, prepare
+from .config import Settings, get_settings
+
+_app: FastAPI | None = None
+
+
+def __getattr__(name: str) -> Any:
+    # `app.__main__:app` для запуска через `uvicorn` напрямую; создаётся при первом обращении
+    global _app
+    if name == "app":
+        if _app is None:
+            _app = create_app()
+        return _app
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
-from .app_factory import create_app
-from .config import get_settings
 
-app = create_app()
+def _server_options(settings: Settings) -> Dict[str, Any]:
+    return {
+        "host": settings.host,
+        "port": settings.port,
+        "loop": settings.server_loop,
+        "http": settings.server_http,
+        "backlog": settings.server_backlog,
+        "timeout_keep_alive": settings.server_keepalive,
+        "access_log": settings.server_access_log,
+        "timeout_graceful_shutdown": settings.server_graceful_timeout,
+    }
 
 
 def main() -> None:
     settings = get_settings()
+    workers = settings.resolved_workers
+    if workers > 1 and settings.prepare_on_start:
+        # миграции и сжатие статики — один раз до запуска воркеров, воркеры их пропускают
+        prepare(settings)
+        database.get_engine().dispose()
+        os.environ["APP_PREPARE_ON_START"] = "false"
     uvicorn.run(
-        "app.__main__:app",
-        host=settings.host,
-        port=settings.port,
+        "app.app_factory:create_app",
+        factory=True,
+        workers=workers if workers > 1 else None,
         reload=False,
-        factory=False,
+        **_server_options(settings),
     )
 
 
 def dev() -> None:
     settings = get_settings()
     uvicorn.run(
-        "app.__main__:app",
+        "app.app_factory:create_app",
+        factory=True,
+        reload=True,
         host=settings.host,
         port=settings.port,
-        reload=True,
-        factory=False,
     )
 
 
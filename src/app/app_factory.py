@@ -1,87 +1,171 @@
 from __future__ import annotations
 
-import json
-import secrets
-import shutil
-from datetime import datetime
+import asyncio
+import functools
+import logging
+import signal
+import time
 from pathlib import Path
-from typing import Any, Dict, List
+from typing import TYPE_CHECKING, Any, AsyncIterator, Awaitable, Callable, Dict, List, Sequence, Tuple
 
 from fastapi import (
     Depends,
     FastAPI,
     File,
     Form,
+    Header,
     HTTPException,
+    Query,
     Request,
+    Response,
     UploadFile,
     status,
 )
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import HTMLResponse
-from fastapi.staticfiles import StaticFiles
-from fastapi.templating import Jinja2Templates
-from sqlmodel import Session, select
-from fastapi.encoders import jsonable_encoder
-from uvicorn.middleware.proxy_headers import ProxyHeadersMiddleware
+from fastapi.responses import HTMLResponse, JSONResponse, StreamingResponse
+from sqlmodel import Session
+from starlette.concurrency import run_in_threadpool
 
+from . import assets, backup, bulk, crud, metrics, search, serialization, uploads
+from .compression import CompressionMiddleware, precompress_directory
 from .config import Settings, get_settings
-from .database import create_db_and_tables, ensure_wishlist_columns, init_engine
-from .deps import get_db_session, require_admin
-from .models import Post, WishItem
+from .database import (
+    create_db_and_tables,
+    ensure_indexes,
+    ensure_wishlist_columns,
+    get_engine,
+    init_async_engine,
+    init_engine,
+    migrate_post_tags,
+)
+from .events import EventHub, parse_last_event_id
+from .export import StaticExporter
+from .generation import EventRelay, SharedGeneration
+from .deps import Database, get_db, open_db, require_admin
+from .http_cache import Watermark, cache_headers, make_etag, not_modified
+from .images import ImageError, ImageProcessor, variants_from_text
+from .ratelimit import AdmissionMiddleware, TokenBucket
 from .resume_loader import ResumeLoader
 from .schemas import (
     PostCreate,
-    PostPublic,
+    PostImport,
     PostUpdate,
     WishItemCreate,
-    WishItemPublic,
+    WishItemImport,
     WishItemReserve,
     WishItemUpdate,
 )
-from .utils import tags_from_text, tags_to_text
+from .snapshot import PageSnapshot, SnapshotCache
 
+if TYPE_CHECKING:
+    from fastapi.templating import Jinja2Templates
+
+logger = logging.getLogger(__name__)
+# запас на текстовые поля и разметку multipart сверх размера самого файла
+UPLOAD_FORM_OVERHEAD = 64 * 1024
+# метка места встроенного состояния в отрендеренном шаблоне (оно стоит после всей разметки резюме)
+STATE_SLOT = "\x00initial-state\x00"
+# поля постов во встроенном состоянии главной: без текста, он приходит из GET /api/posts/{id}
+HOME_POST_FIELDS = ("id", "title", "summary", "tags", "created_at")
 
-def _templates() -> Jinja2Templates:
-    template_dir = Path(__file__).parent / "templates"
-    templates = Jinja2Templates(directory=str(template_dir))
-    return templates
 
+def _templates(bytecode_dir: Path | None = None) -> Jinja2Templates:
+    # Jinja импортируется только при подготовке шаблонов
+    from fastapi.templating import Jinja2Templates
+    from jinja2 import Environment, FileSystemBytecodeCache, FileSystemLoader, pass_context
 
-def wish_to_public(item: WishItem, data_prefix: str = "/data") -> WishItemPublic:
-    return WishItemPublic(
-        id=item.id or 0,
-        title=item.title,
-        description=item.description,
-        link=item.link,
-        price=item.price,
-        reserved=item.reserved_by is not None,
-        reserved_by=item.reserved_by,
-        reserved_contact=item.reserved_contact,
-        reserved_note=item.reserved_note,
-        reserved_at=item.reserved_at,
-        image_url=f"{data_prefix}/{item.image_path}" if item.image_path else None,
+    template_dir = Path(__file__).parent / "templates"
+    bytecode_cache = None
+    if bytecode_dir is not None:
+        bytecode_dir.mkdir(parents=True, exist_ok=True)
+        bytecode_cache = FileSystemBytecodeCache(str(bytecode_dir))
+    env = Environment(
+        loader=FileSystemLoader(str(template_dir)),
+        autoescape=True,
+        bytecode_cache=bytecode_cache,
     )
+    env.globals["asset_url"] = pass_context(assets.asset_url)
+    templates = Jinja2Templates(env=env)
+    # компилируем шаблоны заранее, чтобы первый запрос после рестарта не платил за это
+    for name in env.list_templates(extensions=["html"]):
+        env.get_template(name)
+    return templates
 
 
-def post_to_public(post: Post) -> PostPublic:
-    return PostPublic(
-        id=post.id or 0,
-        title=post.title,
-        summary=post.summary,
-        body=post.body,
-        tags=tags_from_text(post.tags),
-        created_at=post.created_at,
-    )
+def _templates_version() -> float:
+    # в HTML попадают отпечатки статики, поэтому её изменение тоже меняет версию страниц
+    base = Path(__file__).parent
+    files = [*(base / "templates").glob("*.html"), *(base / "static").glob("*.css"), *(base / "static").glob("*.js")]
+    return max((p.stat().st_mtime for p in files), default=0.0)
 
 
-def create_app(settings: Settings | None = None) -> FastAPI:
-    settings = settings or get_settings()
+def prepare(settings: Settings) -> None:
+    """Разовая подготовка данных: схема и миграции БД, поисковый индекс, сжатые копии файлов.
+
+    При нескольких воркерах её выполняет лаунчер до их запуска, а не каждый воркер.
+    """
     init_engine(settings.resolved_database_url, settings)
     create_db_and_tables()
     ensure_wishlist_columns()
+    migrate_post_tags()
+    ensure_indexes()
+    search.ensure_search_index(get_engine())
+    if settings.precompress_assets:
+        data_dir = settings.resolved_data_dir
+        # у статической выгрузки свои сжатые копии, она пишет их сама; резервным копиям они не нужны
+        exclude = [
+            path.relative_to(data_dir).as_posix()
+            for path in (settings.resolved_export_dir, settings.resolved_backup_dir)
+            if path.is_relative_to(data_dir)
+        ]
+        for directory, skip in ((Path(__file__).parent / "static", []), (data_dir, exclude)):
+            try:
+                precompress_directory(directory, minimum_size=settings.compression_minimum_size, exclude=skip)
+            except OSError as exc:
+                logger.warning("Не удалось подготовить сжатые копии в %s: %s", directory, exc)
+
+
+def create_app(settings: Settings | None = None) -> FastAPI:
+    from uvicorn.middleware.proxy_headers import ProxyHeadersMiddleware
+
+    from . import IMPORT_SECONDS
+
+    started = time.perf_counter()
+    timer = metrics.StartupTimer()
+    timer.add("import", IMPORT_SECONDS)
+    settings = settings or get_settings()
+    instrumented = settings.metrics_enabled or settings.debug
+    lazy = settings.startup_mode == "lazy"
 
-    app = FastAPI(title=settings.site_name, description=settings.site_tagline)
+    app = FastAPI(
+        title=settings.site_name,
+        description=settings.site_tagline,
+        default_response_class=serialization.JSONBytesResponse,
+    )
+    trusted = settings.trusted_hosts
+    trust_any_proxy = "*" in ([host.strip() for host in trusted.split(",")] if isinstance(trusted, str) else trusted)
+    # при `*` X-Forwarded-For подделывается, а адрес соединения за прокси один на всех:
+    # лимит на адрес клиента возможен только с явным списком прокси
+    if settings.rate_limit_enabled and trust_any_proxy:
+        raise RuntimeError(
+            "APP_RATE_LIMIT_ENABLED требует явных адресов прокси в APP_TRUSTED_HOSTS вместо `*`"
+        )
+    rate_limit = not trust_any_proxy if settings.rate_limit_enabled is None else settings.rate_limit_enabled
+    if not rate_limit:
+        logger.info("Лимит записи на адрес клиента выключен; действует только APP_MAX_CONCURRENT_WRITES")
+    # внутри ProxyHeadersMiddleware (добавлен раньше — значит, глубже): адрес клиента уже из X-Forwarded-For
+    app.add_middleware(
+        AdmissionMiddleware,
+        bucket=TokenBucket(
+            settings.rate_limit_writes_per_minute / 60,
+            settings.rate_limit_burst,
+            settings.rate_limit_max_clients,
+        )
+        if rate_limit
+        else None,
+        max_concurrent=settings.max_concurrent_writes,
+        admin_token=settings.admin_token,
+    )
     app.add_middleware(
         ProxyHeadersMiddleware,
         trusted_hosts=settings.trusted_hosts,
@@ -93,101 +177,453 @@ def create_app(settings: Settings | None = None) -> FastAPI:
         allow_methods=["*"],
         allow_headers=["*"],
     )
+    if settings.compression_enabled:
+        app.add_middleware(
+            CompressionMiddleware,
+            minimum_size=settings.compression_minimum_size,
+            gzip_level=settings.compression_gzip_level,
+            brotli_quality=settings.compression_brotli_quality,
+        )
 
     static_dir = Path(__file__).parent / "static"
     data_dir = settings.resolved_data_dir
 
-    app.mount("/static", StaticFiles(directory=str(static_dir)), name="static")
-    app.mount("/data", StaticFiles(directory=str(data_dir)), name="data")
+    static_assets = assets.AssetManifest(static_dir)
+    data_assets = assets.AssetManifest(data_dir, immutable=uploads.CONTENT_ADDRESSED)
+    assets.register("static", static_assets)
+    assets.register("data", data_assets)
+    app.mount(
+        "/static",
+        assets.FingerprintedStaticFiles(directory=str(static_dir), manifest=static_assets),
+        name="static",
+    )
+    # база, служебные файлы и резервные копии лежат в том же data_dir, но наружу не отдаются
+    private = [data_dir / ".cache", data_dir / "app.db", settings.resolved_backup_dir]
+    try:
+        private.append(backup.sqlite_path(settings))
+    except backup.BackupError:
+        pass
+    app.mount(
+        "/data",
+        assets.FingerprintedStaticFiles(
+            directory=str(data_dir),
+            manifest=data_assets,
+            private=[path.relative_to(data_dir).as_posix() for path in private if path.is_relative_to(data_dir)],
+        ),
+        name="data",
+    )
 
-    templates = _templates()
-    resume_loader = ResumeLoader(data_dir / "resume.yaml")
+    @functools.cache
+    def templates() -> Jinja2Templates:
+        return _templates(settings.resolved_template_cache_dir)
+
+    resume_loader = ResumeLoader(data_dir / "resume.yaml", stat_interval=settings.resume_stat_interval)
+    images = ImageProcessor(
+        data_dir,
+        fmt=settings.image_format,
+        widths=settings.image_widths,
+        quality=settings.image_quality,
+        workers=settings.image_workers,
+    )
+    # при нескольких воркерах запись в одном сбрасывает кэши остальных через общий счётчик
+    shared_generation = SharedGeneration(data_dir / ".cache" / "generation") if settings.resolved_workers > 1 else None
+    snapshots = SnapshotCache(resume_loader, shared=shared_generation)
+    app.state.snapshots = snapshots
+    events = EventHub(history=settings.events_history, queue_size=settings.events_queue_size)
+    app.state.events = events
+    app.add_event_handler("shutdown", events.close)
+
+    async def close_streams_on_exit() -> None:
+        # uvicorn запускает lifespan shutdown только после закрытия всех соединений, а поток
+        # событий сам не закончится: закрываем потоки уже по сигналу остановки
+        loop = asyncio.get_running_loop()
+        for signum in (signal.SIGINT, signal.SIGTERM):
+            previous = signal.getsignal(signum)
+            if not callable(previous):
+                continue
+
+            def on_exit_signal(sig: int, frame: Any, previous: Callable[..., Any] = previous) -> None:
+                loop.call_soon_threadsafe(events.close)
+                previous(sig, frame)
+
+            try:
+                signal.signal(signum, on_exit_signal)
+            except ValueError:
+                # не главный поток (например, TestClient): сигналы обрабатывает не сервер
+                return
+
+    app.add_event_handler("startup", close_streams_on_exit)
+    # чужие события воркеры дочитывают из общего журнала и рассылают своим подписчикам
+    relay = EventRelay(data_dir / ".cache" / "events") if shared_generation is not None else None
+
+    def _publish(name: str, data: Any) -> None:
+        events.publish(name, data)
+        if relay is not None:
+            relay.append(name, data)
+    # nginx отдаёт выгруженные файлы, а приложение после записи обновляет только затронутые
+    exporter: StaticExporter | None = None
+    if settings.export_on_write:
+        exporter = StaticExporter(app, settings.resolved_export_dir, settings.api_max_page_size)
+        app.add_event_handler("shutdown", exporter.wait)
+
+    def initialize() -> None:
+        """БД, миграции и шаблоны; при startup_mode=lazy — при старте сервера, а не в create_app."""
+        with timer.phase("database"):
+            engine = init_engine(settings.resolved_database_url, settings)
+            if instrumented:
+                metrics.instrument_engine(engine, settings.slow_query_ms)
+            if settings.prepare_on_start:
+                prepare(settings)
+            else:
+                search.detect_search_index(engine)
+            if settings.database_async:
+                async_engine = init_async_engine(settings.resolved_database_url, settings)
+                if instrumented:
+                    metrics.instrument_engine(async_engine.sync_engine, settings.slow_query_ms)
+        with timer.phase("templates"):
+            templates()
+        if settings.resume_watch and resume_loader.start_watching():
+            app.add_event_handler("shutdown", resume_loader.stop_watching)
+
+    initialized = False
+    init_lock = asyncio.Lock()
+
+    async def ensure_initialized() -> None:
+        nonlocal initialized
+        if initialized:
+            return
+        async with init_lock:
+            if not initialized:
+                await run_in_threadpool(initialize)
+                initialized = True
+                timer.report()
+
+    if lazy:
+        app.add_event_handler("startup", ensure_initialized)
+    else:
+        initialize()
+        initialized = True
+    if shared_generation is not None and relay is not None:
+        generation_watch: List[asyncio.Task[None]] = []
+
+        async def start_generation_watch() -> None:
+            # подписчики потока в этом воркере получают события записей в других воркерах
+            task = asyncio.create_task(relay.watch(settings.workers_sync_interval, events.publish))
+            generation_watch.append(task)
+
+        async def stop_generation_watch() -> None:
+            for task in generation_watch:
+                task.cancel()
+            relay.close()
+            shared_generation.close()
+
+        app.add_event_handler("startup", start_generation_watch)
+        app.add_event_handler("shutdown", stop_generation_watch)
+    if settings.backup_interval_hours > 0:
+        backup_tasks: List[asyncio.Task[None]] = []
+
+        async def start_backups() -> None:
+            try:
+                scheduler = backup.scheduler(settings)
+            except backup.BackupError as exc:
+                logger.warning("Резервные копии по расписанию отключены: %s", exc)
+                return
+            backup_tasks.append(asyncio.create_task(scheduler.run()))
+
+        async def stop_backups() -> None:
+            for task in backup_tasks:
+                task.cancel()
+
+        app.add_event_handler("startup", start_backups)
+        app.add_event_handler("shutdown", stop_backups)
+    templates_version = _templates_version()
+
+    @app.middleware("http")
+    async def limit_upload_size(request, call_next):  # type: ignore[no-untyped-def]
+        # отсекаем заведомо большие загрузки до разбора multipart; точный лимит — в save_upload
+        length = request.headers.get("content-length")
+        if (
+            request.headers.get("content-type", "").startswith("multipart/form-data")
+            and length
+            and length.isdigit()
+            and int(length) > settings.upload_max_bytes + UPLOAD_FORM_OVERHEAD
+        ):
+            return JSONResponse(
+                {"detail": "Файл слишком большой"}, status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE
+            )
+        return await call_next(request)
 
     @app.middleware("http")
     async def add_state(request, call_next):  # type: ignore[no-untyped-def]
+        if not initialized:
+            # сервер без lifespan (или тестовый клиент вне with) — готовим всё на первом запросе
+            await ensure_initialized()
         request.state.settings = settings
         return await call_next(request)
 
-    def _build_wishlist(session: Session) -> List[Dict[str, Any]]:
-        items = session.exec(select(WishItem).order_by(WishItem.created_at.desc())).all()
-        return [wish_to_public(i).model_dump() for i in items]
+    if instrumented:
+        # добавлен последним — внешний слой, в замер попадают и остальные middleware
+        app.add_middleware(
+            metrics.MetricsMiddleware,
+            collect=settings.metrics_enabled,
+            server_timing=settings.debug,
+        )
 
-    @app.get("/", response_class=HTMLResponse)
-    def index(request: Request, session: Session = Depends(get_db_session)) -> HTMLResponse:
-        resume_data: Dict[str, Any] = resume_loader.load()
-        wishlist_items = _build_wishlist(session)
-        posts = session.exec(select(Post).order_by(Post.created_at.desc())).all()
-
-        initial_state = {
-            "resume": resume_data,
-            "wishlist": wishlist_items,
-            "posts": [post_to_public(p).model_dump() for p in posts],
-        }
-        initial_json = json.dumps(jsonable_encoder(initial_state), ensure_ascii=False, indent=2)
-
-        return templates.TemplateResponse(
-            "index.html",
-            {
+    def _full_state(session: Session) -> Dict[str, Any]:
+        return {"wishlist": crud.list_wishes(session), "posts": crud.list_posts(session)}
+
+    def _first_page(limit: int, fields: List[str] | None = None) -> crud.PageQuery:
+        return crud.PageQuery(limit=min(limit, settings.api_max_page_size), fields=fields)
+
+    def _home_state(session: Session) -> Dict[str, Any]:
+        # в страницу встраиваются только анонсы первой страницы постов; тексты и вишлист JS догружает из API
+        page = crud.page_posts(session, _first_page(settings.api_page_size, list(HOME_POST_FIELDS)))
+        return {"posts": page["items"], "posts_cursor": page["next_cursor"]}
+
+    def _wishlist_state(session: Session) -> Dict[str, Any]:
+        page = crud.page_wishes(session, _first_page(settings.api_page_size))
+        return {"wishlist": page["items"], "wishlist_cursor": page["next_cursor"]}
+
+    async def _full_snapshot() -> PageSnapshot:
+        async def build() -> PageSnapshot:
+            async with open_db() as db:
+                state = await db.run(_full_state)
+            return PageSnapshot.from_state(
+                {"resume": resume_loader.load(), **state}, prepared={"resume": resume_loader.json_bytes}
+            )
+
+        return await snapshots.get("full", build)
+
+    def _page_snapshot(key: str, state_builder: Callable[[Session], Dict[str, Any]]) -> Callable[[], Awaitable[PageSnapshot]]:
+        async def snapshot() -> PageSnapshot:
+            async def build() -> PageSnapshot:
+                async with open_db() as db:
+                    state = await db.run(state_builder)
+                return PageSnapshot.from_state(
+                    {"resume": resume_loader.load(), **state}, prepared={"resume": resume_loader.json_bytes}
+                )
+
+            return await snapshots.get(key, build)
+
+        return snapshot
+
+    _home_snapshot = _page_snapshot("home", _home_state)
+    _wishlist_snapshot = _page_snapshot("wishlist", _wishlist_state)
+
+    async def _watermarks() -> Dict[str, Watermark]:
+        async def build() -> Dict[str, Watermark]:
+            async with open_db() as db:
+                return await db.run(crud.table_watermarks)
+
+        return await snapshots.get("watermarks", build)
+
+    async def _validators(name: str, *sources: str) -> Tuple[str, float | None]:
+        """ETag и Last-Modified по версиям источников: резюме и таблиц БД."""
+        marks = await _watermarks()
+        parts: List[Any] = [name]
+        stamps: List[float] = []
+        for source in sources:
+            if source == "resume":
+                parts.append(resume_loader.mtime)
+                if resume_loader.mtime is not None:
+                    stamps.append(resume_loader.mtime)
+            elif source == "templates":
+                parts.append(templates_version)
+            else:
+                mark = marks[source]
+                parts.append((mark.count, mark.created, mark.updated))
+                if mark.last_modified is not None:
+                    stamps.append(mark.last_modified)
+        return make_etag(*parts), max(stamps, default=None)
+
+    def _data_changed(source: str, post_ids: Sequence[int] | None = ()) -> None:
+        """После записи: сброс кэшей и, с export_on_write, перевыгрузка затронутых файлов.
+
+        `post_ids` — посты, чьи файлы `api/posts/<id>.json` устарели; None — все.
+        """
+        snapshots.bump()
+        if exporter is not None:
+            exporter.schedule(source, post_ids)
+
+    async def _page_shell(request: Request, name: str, page_name: str) -> Tuple[bytes, bytes]:
+        """HTML страницы без встроенного состояния, разрезанный по его месту.
+
+        Зависит только от резюме и шаблонов, поэтому готов раньше, чем данные из БД.
+        """
+        root_path = request.scope.get("root_path", "")
+
+        async def build() -> Tuple[bytes, bytes]:
+            context = {
                 "request": request,
                 "settings": settings,
-                "resume": resume_data,
-                "initial_json": initial_json,
-                "page_name": "home",
-            },
+                "resume": resume_loader.load(),
+                "initial_json": STATE_SLOT,
+                "page_name": page_name,
+            }
+            template = templates().get_template(name)
+
+            def render() -> str:
+                with metrics.timed("render", metrics.TEMPLATE_RENDER, template=name):
+                    return template.render(context)
+
+            head, _, tail = (await run_in_threadpool(render)).rpartition(STATE_SLOT)
+            return head.encode("utf-8"), tail.encode("utf-8")
+
+        return await snapshots.get(("shell", name, root_path), build)
+
+    async def _render_page(
+        request: Request,
+        name: str,
+        page_name: str,
+        snapshot: Callable[[], Awaitable[PageSnapshot]],
+        headers: Dict[str, str],
+    ) -> Response:
+        """Страница целиком из кэша, а если её там нет — потоком.
+
+        Поток сначала отдаёт `<head>` и разметку резюме, и браузер начинает грузить
+        стили и рисовать, пока выбираются данные для встроенного состояния.
+        """
+        key = ("html", name, request.scope.get("root_path", ""))
+        html = snapshots.peek(key)
+        if html is not None:
+            return HTMLResponse(html, headers=headers)
+
+        async def stream() -> AsyncIterator[bytes]:
+            head, tail = await _page_shell(request, name, page_name)
+            yield head
+
+            async def build() -> bytes:
+                return head + (await snapshot()).initial_json.encode("utf-8") + tail
+
+            html = await snapshots.get(key, build)
+            if html.startswith(head):
+                yield html[len(head) :]
+            else:
+                # резюме сменилось, пока отдавалось начало страницы: досылаем хвост той же версии
+                yield (await snapshot()).initial_json.encode("utf-8") + tail
+
+        return StreamingResponse(stream(), media_type="text/html", headers=headers)
+
+    @app.get("/", response_class=HTMLResponse)
+    async def index(request: Request) -> Response:
+        etag, last_modified = await _validators("home", "templates", "resume", "posts")
+        cached = not_modified(request, settings, etag, last_modified)
+        if cached is not None:
+            return cached
+        return await _render_page(
+            request, "index.html", "home", _home_snapshot, cache_headers(settings, etag, last_modified)
         )
 
     @app.get("/wishlist", response_class=HTMLResponse)
-    def wishlist_page(request: Request, session: Session = Depends(get_db_session)) -> HTMLResponse:
-        resume_data: Dict[str, Any] = resume_loader.load()
-        wishlist_items = _build_wishlist(session)
-        initial_state = {
-            "resume": resume_data,
-            "wishlist": wishlist_items,
-        }
-        initial_json = json.dumps(jsonable_encoder(initial_state), ensure_ascii=False, indent=2)
-        return templates.TemplateResponse(
-            "wishlist.html",
-            {
-                "request": request,
-                "settings": settings,
-                "resume": resume_data,
-                "initial_json": initial_json,
-                "page_name": "wishlist",
-            },
+    async def wishlist_page(request: Request) -> Response:
+        etag, last_modified = await _validators("wishlist-page", "templates", "resume", "wishlist")
+        cached = not_modified(request, settings, etag, last_modified)
+        if cached is not None:
+            return cached
+        return await _render_page(
+            request, "wishlist.html", "wishlist", _wishlist_snapshot, cache_headers(settings, etag, last_modified)
         )
 
     @app.get("/api/health")
     def health() -> Dict[str, str]:
         return {"status": "ok"}
 
+    @app.get("/api/cache", dependencies=[Depends(require_admin)])
+    def cache_stats() -> Dict[str, int]:
+        return {**snapshots.stats(), "stream_subscribers": events.subscribers}
+
+    if settings.metrics_enabled:
+
+        @app.get(
+            "/metrics",
+            include_in_schema=False,
+            dependencies=[] if settings.metrics_public else [Depends(require_admin)],
+        )
+        def metrics_endpoint() -> Response:
+            return Response(metrics.REGISTRY.render(), media_type=metrics.CONTENT_TYPE)
+
     @app.get("/api/resume")
-    def api_resume(session: Session = Depends(get_db_session)) -> Dict[str, Any]:
-        wishlist_items = _build_wishlist(session)
-        posts = session.exec(select(Post).order_by(Post.created_at.desc())).all()
-        return {
-            "resume": resume_loader.load(),
-            "wishlist": wishlist_items,
-            "posts": [post_to_public(p).model_dump() for p in posts],
-        }
+    async def api_resume(request: Request) -> Response:
+        etag, last_modified = await _validators("api-resume", "resume", "wishlist", "posts")
+        cached = not_modified(request, settings, etag, last_modified)
+        if cached is not None:
+            return cached
+        snapshot = await _full_snapshot()
+        return Response(
+            content=snapshot.body,
+            media_type="application/json",
+            headers=cache_headers(settings, etag, last_modified),
+        )
+
+    def _page_query(limit: int | None, cursor: str | None, fields: List[str] | None) -> crud.PageQuery:
+        size = min(limit or settings.api_page_size, settings.api_max_page_size)
+        return crud.PageQuery(limit=size, cursor=cursor, fields=fields)
 
     @app.get("/api/wishlist")
-    def list_wishlist(session: Session = Depends(get_db_session)) -> Dict[str, List[Dict[str, Any]]]:
-        items = session.exec(select(WishItem).order_by(WishItem.created_at.desc())).all()
-        return {"items": [wish_to_public(i).model_dump() for i in items]}
+    async def list_wishlist(
+        request: Request,
+        limit: int | None = Query(None, ge=1),
+        cursor: str | None = None,
+        reserved: bool | None = None,
+        has_price: bool | None = None,
+        fields: str | None = None,
+    ) -> Response:
+        query = _page_query(limit, cursor, crud.parse_fields(fields, crud.WISH_FIELD_COLUMNS))
+        etag, last_modified = await _validators(f"api-wishlist?{request.url.query}", "wishlist")
+        cached = not_modified(request, settings, etag, last_modified)
+        if cached is not None:
+            return cached
+        async with open_db() as db:
+            page = await db.run(crud.page_wishes, query, reserved, has_price)
+        return serialization.JSONBytesResponse(page, headers=cache_headers(settings, etag, last_modified))
+
+    @app.get("/api/wishlist/stream")
+    async def wishlist_stream(request: Request, last_event_id: str | None = Query(None)) -> StreamingResponse:
+        # браузер передаёт Last-Event-ID сам при переподключении; параметр — для первого подключения
+        last_id = parse_last_event_id(request.headers.get("last-event-id") or last_event_id)
+        return StreamingResponse(
+            events.stream(last_id, keepalive=settings.events_keepalive),
+            media_type="text/event-stream",
+            headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+        )
 
-    def _store_image(upload: UploadFile | None, base_dir: Path) -> str | None:
+    @app.get("/api/search")
+    async def search_content(
+        q: str = Query(..., min_length=1, max_length=200),
+        kind: str | None = Query(None, pattern="^(post|wish)$"),
+        limit: int | None = Query(None, ge=1),
+        offset: int = Query(0, ge=0),
+    ) -> Response:
+        if not search.enabled:
+            raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail="Поиск недоступен")
+        size = min(limit or settings.api_page_size, settings.api_max_page_size)
+        async with open_db() as db:
+            return serialization.JSONBytesResponse(await db.run(search.search, q, kind, size, offset))
+
+    async def _store_image(upload: UploadFile | None, base_dir: Path) -> str | None:
         if not upload or not upload.filename:
             return None
-        if not upload.content_type or not upload.content_type.startswith("image/"):
-            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Нужно изображение")
-        ext = Path(upload.filename).suffix.lower() or ".jpg"
-        safe_name = f"{secrets.token_hex(4)}{ext}"
-        target_dir = base_dir / "wishlist"
-        target_dir.mkdir(parents=True, exist_ok=True)
-        target_path = target_dir / safe_name
-        with target_path.open("wb") as f:
-            shutil.copyfileobj(upload.file, f)
-        return f"wishlist/{safe_name}"
+        return await uploads.save_upload(upload, base_dir, "wishlist", settings.upload_max_bytes)
+
+    async def _drop_orphans(db: Database, files: List[str]) -> None:
+        orphans = await db.run(crud.orphaned_image_files, files)
+        if orphans:
+            await run_in_threadpool(uploads.remove_files, data_dir, "wishlist", orphans)
+
+    async def _discard_upload(image_path: str, data: Dict[str, Any]) -> None:
+        """Убирает только что сохранённое фото и его копии, если запись не удалась.
+
+        Сессия запроса после ошибки может быть непригодна, поэтому проверка ссылок — в своей.
+        """
+        files = [image_path, *(v.path for v in variants_from_text(data.get("image_variants")))]
+        async with open_db() as cleanup_db:
+            await _drop_orphans(cleanup_db, files)
+
+    async def _process_image(image_path: str) -> Dict[str, Any]:
+        try:
+            return await images.process(image_path)
+        except (OSError, ImageError):
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Не удалось обработать изображение")
 
     @app.post("/api/wishlist", dependencies=[Depends(require_admin)])
     async def create_wish(
@@ -197,7 +633,7 @@ def create_app(settings: Settings | None = None) -> FastAPI:
         link: str | None = Form(None),
         price: str | None = Form(None),
         image: UploadFile | None = File(None),
-        session: Session = Depends(get_db_session),
+        db: Database = Depends(get_db),
     ) -> Dict[str, Any]:
         data: Dict[str, Any]
         if title is None and request.headers.get("content-type", "").startswith("application/json"):
@@ -212,14 +648,35 @@ def create_app(settings: Settings | None = None) -> FastAPI:
             }
         if not data.get("title"):
             raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail="Нужен заголовок")
-        image_path = _store_image(image, data_dir)
+        image_path = await _store_image(image, data_dir)
         if image_path:
             data["image_path"] = image_path
-        item = WishItem(**data)
-        session.add(item)
-        session.commit()
-        session.refresh(item)
-        return {"status": "ok", "item": wish_to_public(item).model_dump()}
+        try:
+            if data.get("image_path"):
+                data.update(await _process_image(data["image_path"]))
+            item = await db.run(crud.create_wish, data)
+        except Exception:
+            if image_path:
+                await _discard_upload(image_path, data)
+            raise
+        _data_changed("wishlist")
+        _publish("upsert", item)
+        return {"status": "ok", "item": item}
+
+    @app.post("/api/wishlist/bulk", dependencies=[Depends(require_admin)])
+    async def import_wishes(request: Request, db: Database = Depends(get_db)) -> Dict[str, Any]:
+        report = await bulk.import_records(request, db, WishItemImport, crud.import_wishes, settings.bulk_batch_size)
+        if report["created"]:
+            _data_changed("wishlist")
+            _publish("reset", {"created": report["created"]})
+        return report
+
+    @app.get("/api/wishlist/export", dependencies=[Depends(require_admin)])
+    async def export_wishes() -> StreamingResponse:
+        return StreamingResponse(
+            bulk.export_records(crud.export_wishes_query(), crud.export_wish_rows, settings.bulk_batch_size),
+            media_type=bulk.NDJSON,
+        )
 
     @app.put("/api/wishlist/{item_id}", dependencies=[Depends(require_admin)])
     async def update_wish(
@@ -230,106 +687,135 @@ def create_app(settings: Settings | None = None) -> FastAPI:
         link: str | None = Form(None),
         price: str | None = Form(None),
         image: UploadFile | None = File(None),
-        session: Session = Depends(get_db_session),
+        db: Database = Depends(get_db),
     ) -> Dict[str, Any]:
-        item = session.get(WishItem, item_id)
-        if not item:
-            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Элемент не найден")
+        # 404 до сохранения загрузки, чтобы не оставлять файл без пункта
+        old_files = await db.run(crud.wish_image_files, item_id)
         data: Dict[str, Any]
         if title is None and request.headers.get("content-type", "").startswith("application/json"):
             raw = await request.json()
             data = WishItemUpdate.model_validate(raw).model_dump(exclude_none=True)
         else:
             data = {k: v for k, v in {"title": title, "description": description, "link": link, "price": price}.items() if v}
-        if image and image.filename:
-            data["image_path"] = _store_image(image, data_dir)
-        for field, value in data.items():
-            setattr(item, field, value)
-        session.add(item)
-        session.commit()
-        session.refresh(item)
-        return {"status": "ok", "item": wish_to_public(item).model_dump()}
+        image_path = await _store_image(image, data_dir)
+        if image_path:
+            data["image_path"] = image_path
+        try:
+            if data.get("image_path"):
+                data.update(await _process_image(data["image_path"]))
+            item = await db.run(crud.update_wish, item_id, data)
+        except Exception:
+            # фото, которое уже было у пункта, _drop_orphans не тронет: на него есть ссылка
+            if image_path:
+                await _discard_upload(image_path, data)
+            raise
+        _data_changed("wishlist")
+        if old_files and data.get("image_path") not in (None, old_files[0]):
+            await _drop_orphans(db, old_files)
+        _publish("upsert", item)
+        return {"status": "ok", "item": item}
 
     @app.delete("/api/wishlist/{item_id}", dependencies=[Depends(require_admin)])
-    def delete_wish(item_id: int, session: Session = Depends(get_db_session)) -> Dict[str, Any]:
-        item = session.get(WishItem, item_id)
-        if not item:
-            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Элемент не найден")
-        session.delete(item)
-        session.commit()
+    async def delete_wish(item_id: int, db: Database = Depends(get_db)) -> Dict[str, Any]:
+        old_files = await db.run(crud.wish_image_files, item_id)
+        await db.run(crud.delete_wish, item_id)
+        _data_changed("wishlist")
+        await _drop_orphans(db, old_files)
+        _publish("delete", {"id": item_id})
         return {"status": "ok"}
 
     @app.post("/api/wishlist/{item_id}/reserve")
-    def reserve_wish(
-        item_id: int, payload: WishItemReserve, session: Session = Depends(get_db_session)
+    async def reserve_wish(
+        item_id: int,
+        payload: WishItemReserve,
+        idempotency_key: str | None = Header(None, max_length=200),
+        db: Database = Depends(get_db),
     ) -> Dict[str, Any]:
-        item = session.get(WishItem, item_id)
-        if not item:
-            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Элемент не найден")
-        if item.reserved_by:
-            raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="Уже забронировано")
-        item.reserved_by = payload.name.strip()
-        item.reserved_contact = payload.contact
-        item.reserved_note = payload.note
-        item.reserved_at = datetime.utcnow()
-        session.add(item)
-        session.commit()
-        session.refresh(item)
-        return {"status": "ok", "item": wish_to_public(item).model_dump()}
+        item = await db.run(crud.reserve_wish, item_id, payload, idempotency_key)
+        _data_changed("wishlist")
+        _publish("upsert", item)
+        return {"status": "ok", "item": item}
 
     @app.post("/api/wishlist/{item_id}/release", dependencies=[Depends(require_admin)])
-    def release_wish(item_id: int, session: Session = Depends(get_db_session)) -> Dict[str, Any]:
-        item = session.get(WishItem, item_id)
-        if not item:
-            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Элемент не найден")
-        item.reserved_by = None
-        item.reserved_contact = None
-        item.reserved_note = None
-        item.reserved_at = None
-        session.add(item)
-        session.commit()
-        session.refresh(item)
-        return {"status": "ok", "item": wish_to_public(item).model_dump()}
+    async def release_wish(item_id: int, db: Database = Depends(get_db)) -> Dict[str, Any]:
+        item = await db.run(crud.release_wish, item_id)
+        _data_changed("wishlist")
+        _publish("upsert", item)
+        return {"status": "ok", "item": item}
 
     @app.get("/api/posts")
-    def list_posts(session: Session = Depends(get_db_session)) -> Dict[str, List[Dict[str, Any]]]:
-        posts = session.exec(select(Post).order_by(Post.created_at.desc())).all()
-        return {"items": [post_to_public(p).model_dump() for p in posts]}
+    async def list_posts(
+        request: Request,
+        limit: int | None = Query(None, ge=1),
+        cursor: str | None = None,
+        tag: str | None = None,
+        fields: str | None = None,
+    ) -> Response:
+        query = _page_query(limit, cursor, crud.parse_fields(fields, crud.POST_FIELD_COLUMNS))
+        etag, last_modified = await _validators(f"api-posts?{request.url.query}", "posts")
+        cached = not_modified(request, settings, etag, last_modified)
+        if cached is not None:
+            return cached
+        async with open_db() as db:
+            page = await db.run(crud.page_posts, query, tag)
+        return serialization.JSONBytesResponse(page, headers=cache_headers(settings, etag, last_modified))
+
+    @app.get("/api/tags")
+    async def list_tags(request: Request) -> Response:
+        etag, last_modified = await _validators("api-tags", "posts")
+        cached = not_modified(request, settings, etag, last_modified)
+        if cached is not None:
+            return cached
+        async with open_db() as db:
+            tags = await db.run(crud.tag_counts)
+        return serialization.JSONBytesResponse({"items": tags}, headers=cache_headers(settings, etag, last_modified))
 
     @app.post("/api/posts", dependencies=[Depends(require_admin)])
-    def create_post(payload: PostCreate, session: Session = Depends(get_db_session)) -> Dict[str, Any]:
-        post = Post(**payload.model_dump(exclude_none=True))
-        post.tags = tags_to_text(payload.tags)
-        session.add(post)
-        session.commit()
-        session.refresh(post)
-        return {"status": "ok", "item": post_to_public(post).model_dump()}
+    async def create_post(payload: PostCreate, db: Database = Depends(get_db)) -> Dict[str, Any]:
+        item = await db.run(crud.create_post, payload)
+        _data_changed("posts", [item["id"]])
+        return {"status": "ok", "item": item}
+
+    @app.post("/api/posts/bulk", dependencies=[Depends(require_admin)])
+    async def import_posts(request: Request, db: Database = Depends(get_db)) -> Dict[str, Any]:
+        report = await bulk.import_records(request, db, PostImport, crud.import_posts, settings.bulk_batch_size)
+        if report["created"]:
+            _data_changed("posts", None)
+        return report
+
+    @app.get("/api/posts/export", dependencies=[Depends(require_admin)])
+    async def export_posts() -> StreamingResponse:
+        return StreamingResponse(
+            bulk.export_records(crud.export_posts_query(), crud.export_post_rows, settings.bulk_batch_size),
+            media_type=bulk.NDJSON,
+        )
+
+    # после /api/posts/export: иначе "export" разбирался бы как post_id
+    @app.get("/api/posts/{post_id}")
+    async def read_post(request: Request, post_id: int) -> Response:
+        etag, last_modified = await _validators(f"api-post-{post_id}", "posts")
+        cached = not_modified(request, settings, etag, last_modified)
+        if cached is not None:
+            return cached
+        async with open_db() as db:
+            post = await db.run(crud.read_post, post_id)
+        return serialization.JSONBytesResponse(post, headers=cache_headers(settings, etag, last_modified))
 
     @app.put("/api/posts/{post_id}", dependencies=[Depends(require_admin)])
-    def update_post(
-        post_id: int, payload: PostUpdate, session: Session = Depends(get_db_session)
+    async def update_post(
+        post_id: int, payload: PostUpdate, db: Database = Depends(get_db)
     ) -> Dict[str, Any]:
-        post = session.get(Post, post_id)
-        if not post:
-            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Пост не найден")
-        data = payload.model_dump(exclude_none=True)
-        tags = data.pop("tags", None)
-        for field, value in data.items():
-            setattr(post, field, value)
-        if tags is not None:
-            post.tags = tags_to_text(tags)
-        session.add(post)
-        session.commit()
-        session.refresh(post)
-        return {"status": "ok", "item": post_to_public(post).model_dump()}
+        item = await db.run(crud.update_post, post_id, payload)
+        _data_changed("posts", [post_id])
+        return {"status": "ok", "item": item}
 
     @app.delete("/api/posts/{post_id}", dependencies=[Depends(require_admin)])
-    def delete_post(post_id: int, session: Session = Depends(get_db_session)) -> Dict[str, str]:
-        post = session.get(Post, post_id)
-        if not post:
-            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Пост не найден")
-        session.delete(post)
-        session.commit()
+    async def delete_post(post_id: int, db: Database = Depends(get_db)) -> Dict[str, str]:
+        await db.run(crud.delete_post, post_id)
+        _data_changed("posts", [post_id])
         return {"status": "ok"}
 
+    timer.add("create_app", time.perf_counter() - started)
+    if not lazy:
+        timer.report()
     return app
@@ -0,0 +1,128 @@
+from __future__ import annotations
+
+import hashlib
+import os
+import posixpath
+import re
+import threading
+from pathlib import Path
+from typing import Any, Dict, Sequence, Tuple
+
+from starlette.concurrency import run_in_threadpool
+from starlette.exceptions import HTTPException
+from starlette.responses import Response
+from starlette.types import Scope
+
+from .compression import IMMUTABLE_CACHE_CONTROL, PrecompressedStaticFiles
+
+FINGERPRINT_LENGTH = 10
+_FINGERPRINTED = re.compile(rf"^(?P<stem>.+)\.(?P<digest>[0-9a-f]{{{FINGERPRINT_LENGTH}}})(?P<ext>\.[A-Za-z0-9]+)$")
+
+
+def split_fingerprint(path: str) -> Tuple[str, str | None]:
+    """`css/style.0123456789.css` -> (`css/style.css`, `0123456789`)."""
+    head, name = posixpath.split(path)
+    match = _FINGERPRINTED.match(name)
+    if not match:
+        return path, None
+    return posixpath.join(head, match["stem"] + match["ext"]), match["digest"]
+
+
+class AssetManifest:
+    """Отпечатки содержимого файлов каталога для URL вида `name.<hash>.ext`.
+
+    Хэш считается один раз и пересчитывается, только если у файла изменились
+    mtime или размер. Файлы, чьё имя уже само является хэшем (`immutable`),
+    отдаются без отпечатка.
+    """
+
+    def __init__(self, directory: Path, immutable: re.Pattern[str] | None = None):
+        self.directory = directory
+        self.immutable = immutable
+        self._digests: Dict[str, Tuple[int, int, str]] = {}
+        self._lock = threading.Lock()
+
+    def digest(self, rel_path: str) -> str | None:
+        try:
+            stat = os.stat(self.directory / rel_path)
+        except (OSError, ValueError):
+            return None
+        cached = self._digests.get(rel_path)
+        if cached and cached[:2] == (stat.st_mtime_ns, stat.st_size):
+            return cached[2]
+        hasher = hashlib.blake2b(digest_size=16)
+        try:
+            with (self.directory / rel_path).open("rb") as f:
+                while chunk := f.read(1024 * 1024):
+                    hasher.update(chunk)
+        except OSError:
+            return None
+        value = hasher.hexdigest()[:FINGERPRINT_LENGTH]
+        with self._lock:
+            self._digests[rel_path] = (stat.st_mtime_ns, stat.st_size, value)
+        return value
+
+    def fingerprinted(self, rel_path: str) -> str:
+        """Путь с отпечатком; если файла нет — исходный путь."""
+        head, name = posixpath.split(rel_path)
+        if self.immutable is not None and self.immutable.match(name):
+            return rel_path
+        value = self.digest(rel_path)
+        if value is None:
+            return rel_path
+        stem, ext = posixpath.splitext(name)
+        return posixpath.join(head, f"{stem}.{value}{ext}")
+
+
+_manifests: Dict[str, AssetManifest] = {}
+
+
+def register(name: str, manifest: AssetManifest) -> None:
+    _manifests[name] = manifest
+
+
+def asset_path(name: str, rel_path: str) -> str:
+    """Путь файла внутри монтирования `name` с отпечатком содержимого (если манифест задан)."""
+    manifest = _manifests.get(name)
+    return manifest.fingerprinted(rel_path) if manifest else rel_path
+
+
+def asset_url(context: Dict[str, Any], name: str, rel_path: str) -> str:
+    """Jinja-хелпер (регистрируется с pass_context): `{{ asset_url('static', 'app.js') }}` -> `/static/app.<hash>.js`."""
+    return context["request"].url_for(name, path=asset_path(name, rel_path)).path
+
+
+class FingerprintedStaticFiles(PrecompressedStaticFiles):
+    """Отдаёт `name.<hash>.ext` как `name.ext`; при совпадении хэша — с `immutable` на год.
+
+    Пути из `private` (каталоги и файлы вместе с их `-wal`, `.gz` и т. п.) отвечают 404.
+    """
+
+    def __init__(self, *args: Any, manifest: AssetManifest, private: Sequence[str] = (), **kwargs: Any):
+        kwargs.setdefault("immutable", manifest.immutable)
+        super().__init__(*args, **kwargs)
+        self.manifest = manifest
+        self.private = tuple(private)
+
+    def is_private(self, path: str) -> bool:
+        return any(
+            path == name or path.startswith((name + "/", name + "-", name + "."))
+            for name in self.private
+        )
+
+    async def get_response(self, path: str, scope: Scope) -> Response:
+        original, digest = split_fingerprint(path.replace(os.sep, "/"))
+        if self.is_private(path.replace(os.sep, "/")) or self.is_private(original):
+            raise HTTPException(status_code=404)
+        if digest is None:
+            return await super().get_response(path, scope)
+        try:
+            response = await super().get_response(original, scope)
+        except HTTPException as exc:
+            if exc.status_code != 404:
+                raise
+            return await super().get_response(path, scope)
+        # устаревший отпечаток: отдаём текущий файл, но без долгого кэша
+        if response.status_code in (200, 304) and await run_in_threadpool(self.manifest.digest, original) == digest:
+            response.headers["Cache-Control"] = IMMUTABLE_CACHE_CONTROL
+        return response
@@ -0,0 +1,450 @@
+"""Резервные копии SQLite-базы и медиа без остановки сервера.
+
+    uv run backup create            # новая копия в APP_BACKUP_DIR (по умолчанию data/backups)
+    uv run backup list
+    uv run backup restore 20240101T120000Z
+
+База копируется онлайн-API SQLite порциями страниц с паузами между ними, так что
+запись в живую базу блокируется лишь на время одной порции. Рядом с копией базы
+лежат файлы изображений, на которые она ссылается, и `manifest.json` с их списком.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import shutil
+import sqlite3
+import sys
+import time
+from contextlib import closing
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Sequence
+
+from .config import Settings, get_settings
+from .images import variants_from_text
+from .resume_loader import _parse_yaml
+from .uploads import CONTENT_ADDRESSED
+
+try:  # fcntl есть только на POSIX; без него две копии одновременно не исключаются
+    import fcntl
+except ImportError:  # pragma: no cover - зависит от платформы
+    fcntl = None  # type: ignore[assignment]
+
+logger = logging.getLogger(__name__)
+
+DATABASE_NAME = "app.db"
+MANIFEST_NAME = "manifest.json"
+FILES_DIR = "files"
+NAME_FORMAT = "%Y%m%dT%H%M%SZ"
+# копия текущего состояния перед восстановлением; `restore latest` её не выбирает
+PRE_RESTORE_SUFFIX = "-pre-restore"
+# сколько раз пошаговое копирование может начаться заново из-за записи, прежде чем копировать одним шагом
+MAX_RESTARTS = 3
+MAX_STEPPED_SECONDS = 60.0
+
+
+class BackupError(Exception):
+    pass
+
+
+@dataclass(frozen=True)
+class Backup:
+    name: str
+    path: Path
+    manifest: Dict[str, Any]
+
+    @property
+    def created_at(self) -> datetime:
+        return datetime.fromisoformat(self.manifest["created_at"])
+
+
+def sqlite_path(settings: Settings) -> Path:
+    scheme, _, path = settings.resolved_database_url.partition(":///")
+    if scheme.split("+", 1)[0] != "sqlite" or not path or path == ":memory:":
+        raise BackupError(f"Резервное копирование поддерживается только для файла SQLite, а не {scheme}")
+    return Path(path.split("?", 1)[0])
+
+
+class _Abandoned(Exception):
+    """Пошаговое копирование прервано: база меняется быстрее, чем копируется."""
+
+
+def _backup_to(source: Path, target: Path, pages: int, progress: Any = None) -> None:
+    target.unlink(missing_ok=True)
+    with closing(sqlite3.connect(f"file:{source}?mode=ro", uri=True)) as src, closing(sqlite3.connect(target)) as dst:
+        src.execute("PRAGMA busy_timeout = 5000")
+        # `sleep` у backup() — пауза только после BUSY/LOCKED; паузу между шагами делает `progress`
+        src.backup(dst, pages=pages, progress=progress)
+        # копия — один самостоятельный файл, без -wal рядом
+        dst.execute("PRAGMA journal_mode = DELETE")
+
+
+def copy_database(
+    source: Path,
+    target: Path,
+    pages_per_step: int = 256,
+    pause: float = 0.005,
+    max_restarts: int = MAX_RESTARTS,
+    max_seconds: float = MAX_STEPPED_SECONDS,
+) -> int:
+    """Онлайн-копия SQLite порциями по `pages_per_step` страниц; возвращает число страниц.
+
+    Каждый шаг снимает блокировку чтения по завершении, а `progress` после шага
+    спит `pause` секунд — в это время запросы приложения проходят без очереди к
+    диску. Но если другое соединение за это время записало в базу,
+    SQLite начинает копирование заново с первой страницы. Поэтому после
+    `max_restarts` перезапусков или `max_seconds` секунд копия снимается одним
+    шагом: в режиме WAL читатель не мешает записи, так что это лишь дольше
+    держит открытой одну транзакцию чтения.
+    """
+    started = time.monotonic()
+    state = {"total": 0, "remaining": None, "restarts": 0}
+
+    def on_step(_status: int, remaining: int, total: int) -> None:
+        state["total"] = total
+        if state["remaining"] is not None and remaining > state["remaining"]:
+            state["restarts"] += 1
+        state["remaining"] = remaining
+        if state["restarts"] > max_restarts or time.monotonic() - started > max_seconds:
+            raise _Abandoned
+        if remaining and pause > 0:
+            time.sleep(pause)
+
+    tmp = target.with_name(target.name + ".tmp")
+    try:
+        _backup_to(source, tmp, max(pages_per_step, 1), on_step)
+    except _Abandoned:
+        logger.info(
+            "Пошаговое копирование базы прервано (перезапусков: %s за %.1f с), копирую одним шагом",
+            state["restarts"],
+            time.monotonic() - started,
+        )
+        _backup_to(source, tmp, -1)
+    with closing(sqlite3.connect(tmp)) as dst:
+        pages = dst.execute("PRAGMA page_count").fetchone()[0]
+        check = dst.execute("PRAGMA quick_check").fetchone()[0]
+    if check != "ok":
+        tmp.unlink(missing_ok=True)
+        raise BackupError(f"Копия базы не прошла проверку: {check}")
+    os.replace(tmp, target)
+    return pages
+
+
+def referenced_files(database: Path, data_dir: Path) -> List[str]:
+    """Файлы в data_dir, на которые ссылается база копии и резюме: фото вишлиста с копиями, фото из резюме."""
+    files: List[str] = []
+    with closing(sqlite3.connect(f"file:{database}?mode=ro", uri=True)) as conn:
+        try:
+            rows = conn.execute("SELECT image_path, image_variants FROM wishitem WHERE image_path IS NOT NULL").fetchall()
+        except sqlite3.OperationalError:
+            rows = []
+    for image_path, variants in rows:
+        files.append(image_path)
+        files.extend(v.path for v in variants_from_text(variants))
+    resume = data_dir / "resume.yaml"
+    if resume.exists():
+        files.append(resume.name)
+        try:
+            photo = (_parse_yaml(resume.read_bytes()) or {}).get("person", {}).get("photo")
+        except (ValueError, AttributeError):
+            photo = None
+        if isinstance(photo, str):
+            files.append(photo)
+    return sorted(set(files))
+
+
+def _sha256(path: Path) -> str:
+    hasher = hashlib.sha256()
+    with path.open("rb") as f:
+        while chunk := f.read(1024 * 1024):
+            hasher.update(chunk)
+    return hasher.hexdigest()
+
+
+def _link_or_copy(source: Path, target: Path) -> None:
+    target.parent.mkdir(parents=True, exist_ok=True)
+    # фото вишлиста названы по хэшу содержимого и не перезаписываются — им хватает жёсткой ссылки;
+    # resume.yaml и фото резюме правят на месте, их копируем, иначе правка изменит и копию
+    if CONTENT_ADDRESSED.match(source.name):
+        try:
+            os.link(source, target)
+            return
+        except OSError:
+            pass
+    shutil.copy2(source, target)
+
+
+def _inside(root: Path, rel_path: str) -> Path | None:
+    path = (root / rel_path).resolve()
+    return path if path.is_relative_to(root.resolve()) else None
+
+
+def create_backup(
+    data_dir: Path,
+    database: Path,
+    backup_dir: Path,
+    pages_per_step: int = 256,
+    pause: float = 0.005,
+    name: str | None = None,
+) -> Backup:
+    started = time.perf_counter()
+    base = name or datetime.now(timezone.utc).strftime(NAME_FORMAT)
+    name, attempt = base, 1
+    while (backup_dir / name).exists():
+        attempt += 1
+        name = f"{base}-{attempt}"
+    target = backup_dir / name
+    partial = backup_dir / f".{name}.partial"
+    shutil.rmtree(partial, ignore_errors=True)
+    partial.mkdir(parents=True)
+    try:
+        pages = copy_database(database, partial / DATABASE_NAME, pages_per_step, pause)
+        files: List[Dict[str, Any]] = []
+        missing: List[str] = []
+        for rel_path in referenced_files(partial / DATABASE_NAME, data_dir):
+            source = _inside(data_dir, rel_path)
+            if source is None or not source.is_file():
+                missing.append(rel_path)
+                continue
+            copy = partial / FILES_DIR / rel_path
+            _link_or_copy(source, copy)
+            files.append({"path": rel_path, "size": copy.stat().st_size, "sha256": _sha256(copy)})
+        manifest = {
+            "name": name,
+            "created_at": datetime.now(timezone.utc).isoformat(),
+            "database": {
+                "file": DATABASE_NAME,
+                "pages": pages,
+                "size": (partial / DATABASE_NAME).stat().st_size,
+                "sha256": _sha256(partial / DATABASE_NAME),
+            },
+            "files": files,
+            "missing": missing,
+        }
+        (partial / MANIFEST_NAME).write_text(json.dumps(manifest, ensure_ascii=False, indent=2), encoding="utf-8")
+        # копия появляется под своим именем только целиком
+        os.replace(partial, target)
+    except BaseException:
+        shutil.rmtree(partial, ignore_errors=True)
+        raise
+    logger.info(
+        "Резервная копия %s: %s страниц, %s файлов за %.1f с",
+        name,
+        pages,
+        len(files),
+        time.perf_counter() - started,
+    )
+    if missing:
+        logger.warning("В копию %s не попали отсутствующие файлы: %s", name, ", ".join(missing))
+    return Backup(name, target, manifest)
+
+
+def list_backups(backup_dir: Path) -> List[Backup]:
+    """Готовые копии от старых к новым."""
+    if not backup_dir.is_dir():
+        return []
+    backups = []
+    for path in backup_dir.iterdir():
+        manifest_path = path / MANIFEST_NAME
+        if path.name.startswith(".") or not manifest_path.is_file():
+            continue
+        try:
+            manifest = json.loads(manifest_path.read_text(encoding="utf-8"))
+        except ValueError:
+            logger.warning("Повреждён манифест копии %s", path.name)
+            continue
+        if "created_at" not in manifest:
+            logger.warning("В манифесте копии %s нет created_at", path.name)
+            continue
+        backups.append(Backup(path.name, path, manifest))
+    return sorted(backups, key=lambda backup: backup.created_at)
+
+
+def prune_backups(backup_dir: Path, keep: int) -> List[str]:
+    """Удаляет старые копии, оставляя `keep` последних."""
+    if keep <= 0:
+        return []
+    removed = []
+    for backup in list_backups(backup_dir)[:-keep]:
+        shutil.rmtree(backup.path, ignore_errors=True)
+        removed.append(backup.name)
+    return removed
+
+
+def restore_backup(backup: Backup, data_dir: Path, database: Path, pages_per_step: int = 256) -> None:
+    """Возвращает базу и файлы из копии. Сервер лучше остановить: кэши процессов о восстановлении не знают."""
+    db_file = backup.path / DATABASE_NAME
+    expected = backup.manifest.get("database", {}).get("sha256")
+    if expected and _sha256(db_file) != expected:
+        raise BackupError(f"Файл базы в копии {backup.name} повреждён: sha256 не совпадает")
+    for entry in backup.manifest.get("files", []):
+        source = backup.path / FILES_DIR / entry["path"]
+        target = _inside(data_dir, entry["path"])
+        if target is None or not source.is_file():
+            raise BackupError(f"В копии {backup.name} нет файла {entry['path']}")
+        if "sha256" in entry and _sha256(source) != entry["sha256"]:
+            raise BackupError(f"Файл {entry['path']} в копии {backup.name} повреждён: sha256 не совпадает")
+        if not target.exists() or _sha256(target) != entry.get("sha256"):
+            tmp = target.with_name(target.name + ".tmp")
+            tmp.parent.mkdir(parents=True, exist_ok=True)
+            shutil.copy2(source, tmp)
+            os.replace(tmp, target)
+    # тем же онлайн-API в обратную сторону: база остаётся согласованной и с -wal рядом
+    with closing(sqlite3.connect(f"file:{db_file}?mode=ro", uri=True)) as src, closing(sqlite3.connect(database)) as dst:
+        dst.execute("PRAGMA busy_timeout = 5000")
+        src.backup(dst, pages=max(pages_per_step, 1))
+
+
+@dataclass
+class BackupScheduler:
+    """Периодические копии в фоне с хранением `keep` последних.
+
+    Копию делает тот процесс, который первым взял flock на каталоге, а интервал
+    считается от последней готовой копии, так что при нескольких воркерах и
+    перезапусках копии не множатся.
+    """
+
+    data_dir: Path
+    database: Path
+    backup_dir: Path
+    interval: float
+    keep: int
+    pages_per_step: int = 256
+    pause: float = 0.005
+
+    def due_in(self) -> float:
+        backups = list_backups(self.backup_dir)
+        if not backups:
+            return 0.0
+        age = (datetime.now(timezone.utc) - backups[-1].created_at).total_seconds()
+        return max(self.interval - age, 0.0)
+
+    def run_once(self) -> Backup | None:
+        self.backup_dir.mkdir(parents=True, exist_ok=True)
+        with _exclusive(self.backup_dir / ".lock") as acquired:
+            if not acquired or self.due_in() > 0:
+                return None
+            backup = create_backup(self.data_dir, self.database, self.backup_dir, self.pages_per_step, self.pause)
+            prune_backups(self.backup_dir, self.keep)
+            return backup
+
+    async def run(self) -> None:
+        from starlette.concurrency import run_in_threadpool
+
+        while True:
+            await asyncio.sleep(max(self.due_in(), 1.0))
+            try:
+                await run_in_threadpool(self.run_once)
+            except Exception:
+                logger.exception("Не удалось сделать резервную копию")
+                await asyncio.sleep(min(self.interval, 600))
+
+
+class _exclusive:
+    """flock без ожидания: True, если замок взят этим процессом."""
+
+    def __init__(self, path: Path):
+        self.path = path
+        self._fd: int | None = None
+
+    def __enter__(self) -> bool:
+        if fcntl is None:
+            return True
+        self._fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            fcntl.flock(self._fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            os.close(self._fd)
+            self._fd = None
+            return False
+        return True
+
+    def __exit__(self, *exc: Any) -> None:
+        if self._fd is not None:
+            fcntl.flock(self._fd, fcntl.LOCK_UN)
+            os.close(self._fd)
+            self._fd = None
+
+
+def scheduler(settings: Settings) -> BackupScheduler:
+    return BackupScheduler(
+        data_dir=settings.resolved_data_dir,
+        database=sqlite_path(settings),
+        backup_dir=settings.resolved_backup_dir,
+        interval=settings.backup_interval_hours * 3600,
+        keep=settings.backup_keep,
+        pages_per_step=settings.backup_pages_per_step,
+        pause=settings.backup_step_pause_ms / 1000,
+    )
+
+
+def _describe(backup: Backup) -> Iterator[str]:
+    database = backup.manifest.get("database", {})
+    yield (
+        f"{backup.name}  база {database.get('size', 0) / 1024:.0f} КиБ, "
+        f"файлов {len(backup.manifest.get('files', []))}"
+        + (f", отсутствовали {len(backup.manifest['missing'])}" if backup.manifest.get("missing") else "")
+    )
+
+
+def main(argv: Sequence[str] | None = None) -> int:
+    settings = get_settings()
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    commands = parser.add_subparsers(dest="command", required=True)
+    create = commands.add_parser("create", help="сделать копию сейчас")
+    create.add_argument("--keep", type=int, default=settings.backup_keep, help="сколько последних копий хранить")
+    commands.add_parser("list", help="показать готовые копии")
+    restore = commands.add_parser("restore", help="восстановить базу и файлы из копии")
+    restore.add_argument("name", help="имя копии из `list` или `latest`")
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+
+    data_dir = settings.resolved_data_dir
+    backup_dir = settings.resolved_backup_dir
+    try:
+        database = sqlite_path(settings)
+        if args.command == "create":
+            create_backup(
+                data_dir,
+                database,
+                backup_dir,
+                settings.backup_pages_per_step,
+                settings.backup_step_pause_ms / 1000,
+            )
+            for name in prune_backups(backup_dir, args.keep):
+                logger.info("Удалена старая копия %s", name)
+        elif args.command == "list":
+            for backup in list_backups(backup_dir):
+                for line in _describe(backup):
+                    print(line)
+        else:
+            backups = list_backups(backup_dir)
+            if args.name == "latest":
+                # страховочная копия перед прошлым восстановлением — не та, к которой откатываются
+                chosen = [b for b in backups if PRE_RESTORE_SUFFIX not in b.name][-1:]
+            else:
+                chosen = [b for b in backups if b.name == args.name]
+            if not chosen:
+                raise BackupError(f"Копия {args.name} не найдена в {backup_dir}")
+            if database.exists():
+                # текущее состояние тоже сохраняем: восстановление можно откатить
+                stamp = datetime.now(timezone.utc).strftime(NAME_FORMAT)
+                safety = create_backup(data_dir, database, backup_dir, name=stamp + PRE_RESTORE_SUFFIX)
+                logger.info("Текущая база сохранена в %s", safety.name)
+            restore_backup(chosen[0], data_dir, database, settings.backup_pages_per_step)
+            logger.info("Восстановлено из %s; перезапустите сервер, чтобы сбросить кэши", chosen[0].name)
+    except BackupError as exc:
+        logger.error("%s", exc)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
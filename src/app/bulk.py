@@ -0,0 +1,118 @@
+from __future__ import annotations
+
+from typing import Any, AsyncIterator, Callable, Dict, Iterator, List, Sequence, Tuple, Type
+
+from fastapi import HTTPException, Request, status
+from pydantic import BaseModel, ValidationError
+from sqlalchemy import Select
+from sqlmodel import Session
+
+from . import database
+from .deps import Database
+from .serialization import dumps, loads
+
+NDJSON = "application/x-ndjson"
+Importer = Callable[[Session, Sequence[Tuple[int, Any]]], Tuple[int, List[Dict[str, Any]]]]
+RowConverter = Callable[[Session, Sequence[Any]], List[Dict[str, Any]]]
+
+
+def encode_lines(rows: Sequence[Dict[str, Any]]) -> bytes:
+    return b"".join(dumps(row) + b"\n" for row in rows)
+
+
+def _validation_message(exc: ValidationError) -> str:
+    return "; ".join(f"{'.'.join(str(p) for p in err['loc']) or 'row'}: {err['msg']}" for err in exc.errors())
+
+
+async def _raw_records(request: Request) -> AsyncIterator[Tuple[int, Any]]:
+    """Записи из тела запроса: JSON-массив целиком или NDJSON построчно по мере чтения."""
+    content_type = request.headers.get("content-type", "").split(";")[0].strip().lower()
+    if content_type in ("application/json", ""):
+        try:
+            payload = loads(await request.body() or b"[]")
+        except ValueError:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Некорректный JSON")
+        if not isinstance(payload, list):
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Ожидается JSON-массив")
+        for row, record in enumerate(payload, start=1):
+            yield row, record
+        return
+    if content_type not in (NDJSON, "application/jsonl", "application/json-lines", "text/plain"):
+        raise HTTPException(status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE, detail="Нужен JSON-массив или NDJSON")
+    buffer = b""
+    row = 0
+
+    def parse(line: bytes) -> Any:
+        try:
+            return loads(line)
+        except ValueError as exc:
+            return exc
+
+    async for chunk in request.stream():
+        buffer += chunk
+        *lines, buffer = buffer.split(b"\n")
+        for line in lines:
+            row += 1
+            if line.strip():
+                yield row, parse(line)
+    if buffer.strip():
+        yield row + 1, parse(buffer)
+
+
+async def import_records(
+    request: Request, db: Database, schema: Type[BaseModel], importer: Importer, batch_size: int
+) -> Dict[str, Any]:
+    """Проверяет записи схемой и вставляет их пачками по `batch_size` строк на транзакцию.
+
+    Ошибки не прерывают импорт: они собираются в отчёт с номером строки.
+    """
+    created = 0
+    errors: List[Dict[str, Any]] = []
+    batch: List[Tuple[int, BaseModel]] = []
+
+    async def flush() -> None:
+        nonlocal created
+        if not batch:
+            return
+        done, failed = await db.run(importer, list(batch))
+        created += done
+        errors.extend(failed)
+        batch.clear()
+
+    async for row, record in _raw_records(request):
+        if isinstance(record, ValueError):
+            errors.append({"row": row, "error": f"Некорректный JSON: {record}"})
+            continue
+        try:
+            batch.append((row, schema.model_validate(record)))
+        except ValidationError as exc:
+            errors.append({"row": row, "error": _validation_message(exc)})
+            continue
+        if len(batch) >= batch_size:
+            await flush()
+    await flush()
+    errors.sort(key=lambda err: err["row"])
+    return {"status": "ok" if not errors else "partial", "created": created, "errors": errors}
+
+
+def _sync_export(stmt: Select[Any], convert: RowConverter, batch_size: int) -> Iterator[bytes]:
+    with Session(database.get_engine()) as session:
+        result = session.execute(stmt.execution_options(yield_per=batch_size))
+        for rows in result.partitions():
+            yield encode_lines(convert(session, rows))
+
+
+async def _async_export(stmt: Select[Any], convert: RowConverter, batch_size: int) -> AsyncIterator[bytes]:
+    from sqlmodel.ext.asyncio.session import AsyncSession
+
+    async with AsyncSession(database.async_engine) as session:
+        result = await session.stream(stmt.execution_options(yield_per=batch_size))
+        async for rows in result.partitions():
+            yield encode_lines(await session.run_sync(convert, rows))
+
+
+def export_records(stmt: Select[Any], convert: RowConverter, batch_size: int) -> Iterator[bytes] | AsyncIterator[bytes]:
+    """NDJSON-поток строк таблицы: курсор читается пачками, таблица целиком в памяти не держится."""
+    if database.async_engine is not None:
+        return _async_export(stmt, convert, batch_size)
+    return _sync_export(stmt, convert, batch_size)
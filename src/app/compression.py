@@ -0,0 +1,336 @@
+from __future__ import annotations
+
+import gzip
+import os
+import re
+import zlib
+from collections import OrderedDict
+from mimetypes import guess_type
+from pathlib import Path
+from typing import Any, Iterable, List, Tuple
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.responses import FileResponse, Response
+from starlette.staticfiles import NotModifiedResponse, StaticFiles
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from . import metrics
+
+try:  # brotli — необязательная зависимость (extra `compression`)
+    import brotli
+except ImportError:  # pragma: no cover - зависит от окружения
+    brotli = None
+
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+COMPRESSIBLE_TYPES = (
+    "text/",
+    "application/json",
+    "application/x-ndjson",
+    "application/javascript",
+    "application/xml",
+    "application/yaml",
+    "application/x-yaml",
+    "image/svg+xml",
+)
+COMPRESSIBLE_SUFFIXES = {".css", ".js", ".json", ".html", ".svg", ".txt", ".yaml", ".yml", ".xml", ".map"}
+SUFFIXES = {"br": ".br", "gzip": ".gz"}
+
+
+def is_compressible(content_type: str | None) -> bool:
+    if not content_type:
+        return False
+    if content_type.startswith("text/event-stream"):
+        return False
+    return content_type.startswith(COMPRESSIBLE_TYPES)
+
+
+def strip_encoding(tag: str) -> str:
+    """ETag без суффикса кодировки, который ставит CompressionMiddleware: `"abc-gzip"` -> `"abc"`."""
+    for encoding in SUFFIXES:
+        suffix = f'-{encoding}"'
+        if tag.endswith(suffix):
+            return tag[: -len(suffix)] + '"'
+    return tag
+
+
+def accepted_encodings(accept_encoding: str) -> List[str]:
+    """Поддерживаемые кодировки из Accept-Encoding в порядке предпочтения сервера."""
+    offered = {}
+    for part in accept_encoding.split(","):
+        name, _, params = part.strip().partition(";")
+        quality = 1.0
+        if params.strip().startswith("q="):
+            try:
+                quality = float(params.strip()[2:])
+            except ValueError:
+                quality = 0.0
+        offered[name.strip().lower()] = quality
+    result = []
+    if brotli is not None and offered.get("br", 0) > 0:
+        result.append("br")
+    if offered.get("gzip", 0) > 0:
+        result.append("gzip")
+    return result
+
+
+class _Encoder:
+    def __init__(self, encoding: str, gzip_level: int, brotli_quality: int):
+        self.encoding = encoding
+        if encoding == "br":
+            self._br = brotli.Compressor(quality=brotli_quality)
+        else:
+            self._gz = zlib.compressobj(gzip_level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+
+    def chunk(self, data: bytes) -> bytes:
+        # сбрасываем буфер на каждом фрагменте, чтобы потоковые ответы доходили сразу
+        if self.encoding == "br":
+            return self._br.process(data) + self._br.flush()
+        return self._gz.compress(data) + self._gz.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self) -> bytes:
+        if self.encoding == "br":
+            return self._br.finish()
+        return self._gz.flush(zlib.Z_FINISH)
+
+
+def compress_bytes(data: bytes, encoding: str, gzip_level: int = 6, brotli_quality: int = 5) -> bytes:
+    if encoding == "br":
+        return brotli.compress(data, quality=brotli_quality)
+    return gzip.compress(data, compresslevel=gzip_level, mtime=0)
+
+
+class CompressionMiddleware:
+    """gzip/brotli для динамических ответов.
+
+    Полные ответы с ETag сжимаются один раз на версию содержимого: результат
+    хранится в небольшом LRU-кэше по (путь, запрос, ETag, кодировка) — ETag
+    StaticFiles строится из mtime и размера и у разных файлов может совпасть.
+    Потоковые ответы сжимаются по фрагментам.
+
+    У сжатого ответа ETag с суффиксом кодировки; из `If-None-Match` суффикс
+    снимается до передачи запроса приложению, поэтому и StaticFiles, и
+    `http_cache` отвечают 304 на ETag сжатого представления.
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        minimum_size: int = 1024,
+        gzip_level: int = 6,
+        brotli_quality: int = 5,
+        cache_entries: int = 256,
+    ):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+        self.cache_entries = cache_entries
+        self._cache: OrderedDict[Tuple[str, bytes, str, str], bytes] = OrderedDict()
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or scope["method"] == "HEAD":
+            await self.app(scope, receive, send)
+            return
+        encodings = accepted_encodings(Headers(scope=scope).get("accept-encoding", ""))
+        if not encodings:
+            await self.app(scope, receive, send)
+            return
+        if_none_match = Headers(scope=scope).get("if-none-match", "")
+        responder = _CompressionResponder(self, encodings[0], f'-{encodings[0]}"' in if_none_match)
+        await responder(_without_encoding_suffix(scope), receive, send)
+
+    def cached(self, scope: Scope, etag: str | None, encoding: str, body: bytes) -> bytes:
+        if etag is None:
+            return compress_bytes(body, encoding, self.gzip_level, self.brotli_quality)
+        key = (scope["path"], scope.get("query_string", b""), etag, encoding)
+        compressed = self._cache.get(key)
+        metrics.CACHE_LOOKUPS.inc(cache="compression", result="miss" if compressed is None else "hit")
+        if compressed is None:
+            compressed = compress_bytes(body, encoding, self.gzip_level, self.brotli_quality)
+            self._cache[key] = compressed
+            if len(self._cache) > self.cache_entries:
+                self._cache.popitem(last=False)
+        else:
+            self._cache.move_to_end(key)
+        return compressed
+
+
+def _without_encoding_suffix(scope: Scope) -> Scope:
+    """Копия scope, где в If-None-Match сняты суффиксы кодировки; исходная, если снимать нечего."""
+    headers = scope["headers"]
+    for i, (name, value) in enumerate(headers):
+        if name != b"if-none-match":
+            continue
+        tags = value.decode("latin-1").split(",")
+        stripped = ",".join(strip_encoding(tag.strip()) for tag in tags)
+        if stripped == ",".join(tag.strip() for tag in tags):
+            return scope
+        headers = [*headers[:i], (name, stripped.encode("latin-1")), *headers[i + 1 :]]
+        return {**scope, "headers": headers}
+    return scope
+
+
+class _CompressionResponder:
+    def __init__(self, middleware: CompressionMiddleware, encoding: str, revalidating_compressed: bool = False):
+        self.middleware = middleware
+        self.encoding = encoding
+        # клиент прислал ETag сжатого представления: 304 должен подтвердить именно его
+        self.revalidating_compressed = revalidating_compressed
+        self.start: Message | None = None
+        self.encoder: _Encoder | None = None
+        self.passthrough = False
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        self.send = send
+        self.scope = scope
+        await self.middleware.app(scope, receive, self.wrapped_send)
+
+    async def wrapped_send(self, message: Message) -> None:
+        if message["type"] == "http.response.start":
+            headers = Headers(raw=message["headers"])
+            self.passthrough = (
+                message["status"] < 200
+                or message["status"] in (204, 304)
+                or "content-encoding" in headers
+                or not is_compressible(headers.get("content-type"))
+            )
+            if self.passthrough:
+                if message["status"] == 304 and self.revalidating_compressed:
+                    self._suffix_etag(MutableHeaders(raw=message["headers"]))
+                await self.send(message)
+            else:
+                self.start = message
+            return
+        if message["type"] != "http.response.body" or self.passthrough:
+            await self.send(message)
+            return
+
+        body: bytes = message.get("body", b"")
+        more_body: bool = message.get("more_body", False)
+        if self.start is not None and not more_body:
+            # весь ответ пришёл одним сообщением
+            start, self.start = self.start, None
+            if len(body) < self.middleware.minimum_size:
+                await self.send(start)
+                await self.send(message)
+                return
+            headers = MutableHeaders(raw=start["headers"])
+            compressed = self.middleware.cached(self.scope, headers.get("etag"), self.encoding, body)
+            self._set_headers(headers)
+            headers["Content-Length"] = str(len(compressed))
+            await self.send(start)
+            await self.send({"type": "http.response.body", "body": compressed})
+            return
+
+        if self.start is not None:
+            start, self.start = self.start, None
+            headers = MutableHeaders(raw=start["headers"])
+            self._set_headers(headers)
+            del headers["Content-Length"]
+            self.encoder = _Encoder(self.encoding, self.middleware.gzip_level, self.middleware.brotli_quality)
+            await self.send(start)
+        assert self.encoder is not None
+        data = self.encoder.chunk(body) if body else b""
+        if not more_body:
+            data += self.encoder.finish()
+        await self.send({"type": "http.response.body", "body": data, "more_body": more_body})
+
+    def _set_headers(self, headers: MutableHeaders) -> None:
+        headers["Content-Encoding"] = self.encoding
+        headers.add_vary_header("Accept-Encoding")
+        self._suffix_etag(headers)
+
+    def _suffix_etag(self, headers: MutableHeaders) -> None:
+        etag = headers.get("etag")
+        if etag and etag.endswith('"'):
+            # у сжатого представления свой ETag; из If-None-Match суффикс снимается в __call__
+            headers["ETag"] = f'{etag[:-1]}-{self.encoding}"'
+
+
+def precompress_directory(
+    directory: Path,
+    minimum_size: int = 1024,
+    gzip_level: int = 9,
+    brotli_quality: int = 11,
+    exclude: Iterable[str] = (),
+) -> int:
+    """Пишет рядом с текстовыми файлами сжатые копии `.gz`/`.br`, если их нет или они устарели."""
+    excluded = {directory / name for name in exclude}
+    written = 0
+    encodings = ["gzip"] + (["br"] if brotli is not None else [])
+    for path in directory.rglob("*"):
+        if path.suffix.lower() not in COMPRESSIBLE_SUFFIXES or not path.is_file():
+            continue
+        if any(parent in excluded for parent in (path, *path.parents)):
+            continue
+        stat = path.stat()
+        if stat.st_size < minimum_size:
+            continue
+        data: bytes | None = None
+        for encoding in encodings:
+            target = path.with_name(path.name + SUFFIXES[encoding])
+            if target.exists() and target.stat().st_mtime >= stat.st_mtime:
+                continue
+            if data is None:
+                data = path.read_bytes()
+            tmp = target.with_name(target.name + ".tmp")
+            tmp.write_bytes(compress_bytes(data, encoding, gzip_level, brotli_quality))
+            os.replace(tmp, target)
+            written += 1
+    return written
+
+
+class PrecompressedStaticFiles(StaticFiles):
+    """StaticFiles, отдающий готовые `.br`/`.gz` копии, если клиент их принимает.
+
+    Файлам, имя которых подходит под `immutable`, отдаётся долгий `Cache-Control`:
+    их содержимое по определению не меняется при том же имени.
+    """
+
+    def __init__(self, *args: Any, immutable: re.Pattern[str] | None = None, **kwargs: Any):
+        super().__init__(*args, **kwargs)
+        self.immutable = immutable
+
+    def file_response(
+        self,
+        full_path: Any,
+        stat_result: os.stat_result,
+        scope: Scope,
+        status_code: int = 200,
+    ) -> Response:
+        response = self._file_response(full_path, stat_result, scope, status_code)
+        if self.immutable is not None and self.immutable.match(os.path.basename(full_path)):
+            response.headers["Cache-Control"] = IMMUTABLE_CACHE_CONTROL
+        return response
+
+    def _file_response(
+        self,
+        full_path: Any,
+        stat_result: os.stat_result,
+        scope: Scope,
+        status_code: int = 200,
+    ) -> Response:
+        media_type = guess_type(str(full_path))[0]
+        if status_code != 200 or not is_compressible(media_type):
+            return super().file_response(full_path, stat_result, scope, status_code)
+        request_headers = Headers(scope=scope)
+        for encoding in accepted_encodings(request_headers.get("accept-encoding", "")):
+            sibling = f"{full_path}{SUFFIXES[encoding]}"
+            try:
+                sibling_stat = os.stat(sibling)
+            except OSError:
+                continue
+            if sibling_stat.st_mtime < stat_result.st_mtime:
+                continue
+            response = FileResponse(
+                sibling,
+                stat_result=sibling_stat,
+                media_type=media_type,
+                headers={"Content-Encoding": encoding, "Vary": "Accept-Encoding"},
+            )
+            if self.is_not_modified(response.headers, request_headers):
+                return NotModifiedResponse(response.headers)
+            return response
+        response = super().file_response(full_path, stat_result, scope, status_code)
+        response.headers.add_vary_header("Accept-Encoding")
+        return response
@@ -1,7 +1,8 @@
 from __future__ import annotations
 
+import os
 from pathlib import Path
-from typing import List
+from typing import List, Literal
 
 from pydantic import Field
 from pydantic_settings import BaseSettings, SettingsConfigDict
@@ -15,14 +16,119 @@ class Settings(BaseSettings):
         description="Токен для доступа к админским маршрутам (заголовок X-Admin-Token).",
     )
     database_url: str | None = None
+    database_async: bool = Field(
+        default=False,
+        description="Асинхронный движок БД (aiosqlite/asyncpg/aiomysql) вместо синхронного.",
+    )
+    db_pool_size: int = 5
+    db_max_overflow: int = 10
+    db_pool_timeout: float = 30.0
+    db_pool_recycle: int = -1
+    db_pool_pre_ping: bool = False
+    sqlite_journal_mode: str = Field(default="WAL", description="PRAGMA journal_mode для SQLite.")
+    sqlite_synchronous: str = Field(default="NORMAL", description="PRAGMA synchronous (в WAL достаточно NORMAL).")
+    sqlite_busy_timeout_ms: int = 5000
+    sqlite_cache_size: int = Field(default=-16000, description="PRAGMA cache_size: отрицательное значение — в КиБ.")
+    sqlite_mmap_size: int = Field(default=64 * 1024 * 1024, description="PRAGMA mmap_size в байтах.")
     host: str = "0.0.0.0"
     port: int = 8000
+    workers: int = Field(default=1, description="Число процессов uvicorn для `start`; 0 — по числу ядер.")
+    server_loop: str = Field(default="auto", description="Цикл событий uvicorn: auto, uvloop или asyncio.")
+    server_http: str = Field(default="auto", description="HTTP-парсер uvicorn: auto, httptools или h11.")
+    server_backlog: int = Field(default=2048, description="Очередь входящих соединений сокета.")
+    server_keepalive: int = Field(default=5, description="Сколько секунд держать простаивающее keep-alive соединение.")
+    server_access_log: bool = Field(default=True, description="Писать access-лог uvicorn.")
+    server_graceful_timeout: float = Field(
+        default=10.0,
+        description="Сколько секунд при остановке ждать незавершённые запросы, прежде чем прервать их.",
+    )
+    startup_mode: Literal["eager", "lazy"] = Field(
+        default="eager",
+        description="eager — БД и шаблоны готовятся в create_app; lazy — при старте сервера (lifespan) "
+        "или на первом запросе, так что импорт и create_app не трогают диск.",
+    )
+    prepare_on_start: bool = Field(
+        default=True,
+        description="Создавать и мигрировать схему БД и готовить сжатые копии при создании приложения; "
+        "лаунчер делает это один раз и выключает в воркерах.",
+    )
+    workers_sync_interval: float = Field(
+        default=1.0,
+        description="Как часто (сек) воркер читает журнал событий других воркеров и пересылает их своим подписчикам.",
+    )
     data_dir: Path = Field(
         default=Path(__file__).resolve().parents[2] / "data",
         description="Директория с пользовательскими данными и медиа.",
     )
     trusted_hosts: str | List[str] = Field(default="*", description="Доверенные хосты или список через запятую.")
     cors_origins: List[str] = Field(default_factory=lambda: ["*"])
+    api_page_size: int = Field(default=50, description="Размер страницы списков API по умолчанию.")
+    api_max_page_size: int = Field(default=200, description="Максимальный limit для списков API.")
+    http_cache_control: str = Field(
+        default="no-cache",
+        description="Значение Cache-Control для страниц и JSON API (ответы с ETag).",
+    )
+    http_last_modified: bool = Field(default=True, description="Отдавать заголовок Last-Modified.")
+    compression_enabled: bool = Field(default=True, description="gzip/brotli для динамических ответов.")
+    compression_minimum_size: int = Field(default=1024, description="Не сжимать ответы меньше этого размера (байт).")
+    compression_gzip_level: int = 6
+    compression_brotli_quality: int = 5
+    precompress_assets: bool = Field(
+        default=True,
+        description="При старте готовить .gz/.br копии текстовых файлов в static/ и data/.",
+    )
+    resume_watch: bool = Field(default=False, description="Следить за resume.yaml через watchfiles вместо проверки mtime.")
+    resume_stat_interval: float = Field(default=2.0, description="Как часто (сек) проверять mtime resume.yaml без наблюдателя.")
+    template_cache_dir: Path | None = Field(
+        default=Path(".cache/jinja"),
+        description="Каталог байткода Jinja (относительно data_dir); пусто — без кэша.",
+    )
+    upload_max_bytes: int = Field(default=15 * 1024 * 1024, description="Максимальный размер загружаемого фото, байт.")
+    image_format: str = Field(default="webp", description="Формат уменьшенных копий фото: webp или avif.")
+    image_widths: List[int] = Field(default_factory=lambda: [320, 640, 1280])
+    image_quality: int = 80
+    image_workers: int = Field(default=2, description="Потоков для обработки загруженных фото.")
+    bulk_batch_size: int = Field(default=500, description="Строк на транзакцию при массовом импорте и выгрузке.")
+    events_history: int = Field(default=256, description="Сколько событий вишлиста хранить для переподключений.")
+    events_queue_size: int = Field(default=64, description="Очередь событий на одного подписчика.")
+    events_keepalive: float = Field(default=15.0, description="Интервал keepalive в потоке событий, секунд.")
+    debug: bool = Field(default=False, description="Режим отладки: заголовок Server-Timing с разбивкой времени запроса.")
+    metrics_enabled: bool = Field(default=True, description="Счётчики запросов и эндпоинт /metrics в формате Prometheus.")
+    metrics_public: bool = Field(default=False, description="Отдавать /metrics без X-Admin-Token.")
+    slow_query_ms: float = Field(default=200.0, description="Писать в лог запросы к БД дольше стольких мс; 0 — не писать.")
+    rate_limit_enabled: bool | None = Field(
+        default=None,
+        description="Лимит запросов на запись с одного адреса клиента; по умолчанию включён, если APP_TRUSTED_HOSTS не `*`.",
+    )
+    rate_limit_writes_per_minute: float = Field(default=30.0, description="Запросов на запись в минуту с одного адреса.")
+    rate_limit_burst: int = Field(default=10, description="Сколько записей подряд можно сделать сверх равномерного темпа.")
+    rate_limit_max_clients: int = Field(default=10_000, description="Сколько адресов помнить; давние вытесняются.")
+    max_concurrent_writes: int = Field(
+        default=16,
+        description="Одновременных запросов на запись на процесс; лишние сразу получают 503. 0 — без лимита.",
+    )
+    export_dir: Path = Field(
+        default=Path("export"),
+        description="Каталог статической выгрузки `uv run export` (относительно data_dir).",
+    )
+    export_on_write: bool = Field(
+        default=False,
+        description="После каждой записи через API перевыгружать затронутые файлы в export_dir.",
+    )
+    backup_dir: Path = Field(
+        default=Path("backups"),
+        description="Каталог резервных копий `uv run backup` (относительно data_dir).",
+    )
+    backup_interval_hours: float = Field(
+        default=0.0,
+        description="Раз в сколько часов запущенное приложение делает копию в фоне. 0 — не делает.",
+    )
+    backup_keep: int = Field(default=7, description="Сколько последних копий хранить; 0 — не удалять.")
+    backup_pages_per_step: int = Field(
+        default=256,
+        description="Страниц SQLite за один шаг копирования; между шагами запись в базу не блокируется.",
+    )
+    backup_step_pause_ms: float = Field(default=5.0, description="Пауза между шагами копирования базы, мс.")
     model_config = SettingsConfigDict(env_file=".env", env_prefix="APP_", extra="ignore")
 
     @property
@@ -33,6 +139,33 @@ class Settings(BaseSettings):
         base.mkdir(parents=True, exist_ok=True)
         return base
 
+    @property
+    def resolved_workers(self) -> int:
+        return self.workers if self.workers > 0 else os.cpu_count() or 1
+
+    @property
+    def resolved_template_cache_dir(self) -> Path | None:
+        if not self.template_cache_dir or not str(self.template_cache_dir).strip():
+            return None
+        path = Path(self.template_cache_dir)
+        if not path.is_absolute():
+            path = self.resolved_data_dir / path
+        return path
+
+    @property
+    def resolved_export_dir(self) -> Path:
+        path = Path(self.export_dir)
+        if not path.is_absolute():
+            path = self.resolved_data_dir / path
+        return path
+
+    @property
+    def resolved_backup_dir(self) -> Path:
+        path = Path(self.backup_dir)
+        if not path.is_absolute():
+            path = self.resolved_data_dir / path
+        return path
+
     @property
     def resolved_database_url(self) -> str:
         if self.database_url:
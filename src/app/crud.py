@@ -0,0 +1,507 @@
+from __future__ import annotations
+
+import base64
+import json
+from dataclasses import dataclass
+from datetime import datetime
+from types import SimpleNamespace
+from typing import Any, Callable, Dict, Iterable, List, Sequence, Tuple
+
+from fastapi import HTTPException, status
+from sqlalchemy import Select, and_, delete, func, tuple_, update
+from sqlalchemy.exc import SQLAlchemyError
+from sqlmodel import Session, select
+
+from . import search
+from .assets import asset_path
+from .http_cache import Watermark
+from .images import variants_from_text
+from .models import Post, PostTag, Tag, WishItem
+from .schemas import (
+    PostCreate,
+    PostImport,
+    PostUpdate,
+    WishItemImport,
+    WishItemReserve,
+)
+from .utils import normalize_tags
+
+
+def wish_to_public(item: WishItem, data_prefix: str = "/data") -> Dict[str, Any]:
+    """Поля `WishItemPublic` словарём, прямо из строки БД.
+
+    Без валидации pydantic: данные уже проверены при записи, а на списках в тысячи
+    пунктов построение моделей стоило дороже самой выборки.
+    """
+    variants = [
+        {"url": f"{data_prefix}/{asset_path('data', v.path)}", "width": v.width}
+        for v in variants_from_text(item.image_variants)
+    ]
+    srcset = ", ".join(f"{v['url']} {v['width']}w" for v in variants) or None
+    return {
+        "id": item.id or 0,
+        "title": item.title,
+        "description": item.description,
+        "link": item.link,
+        "price": item.price,
+        "reserved": item.reserved_by is not None,
+        "reserved_by": item.reserved_by,
+        "reserved_contact": item.reserved_contact,
+        "reserved_note": item.reserved_note,
+        "reserved_at": item.reserved_at,
+        "image_url": f"{data_prefix}/{asset_path('data', item.image_path)}" if item.image_path else None,
+        "image_variants": variants,
+        "image_srcset": srcset,
+        "image_placeholder": item.image_placeholder,
+    }
+
+
+def post_to_public(post: Post, tags: Sequence[str] = ()) -> Dict[str, Any]:
+    """Поля `PostPublic` словарём, прямо из строки БД."""
+    return {
+        "id": post.id or 0,
+        "title": post.title,
+        "summary": post.summary,
+        "body": post.body,
+        "tags": list(tags),
+        "created_at": post.created_at,
+    }
+
+
+def _project(data: Dict[str, Any], include: set[str] | None) -> Dict[str, Any]:
+    return data if include is None else {key: value for key, value in data.items() if key in include}
+
+
+def post_tags(session: Session, post_ids: Iterable[int]) -> Dict[int, List[str]]:
+    """Теги для набора постов одним запросом, в порядке, заданном автором."""
+    ids = list(post_ids)
+    result: Dict[int, List[str]] = {post_id: [] for post_id in ids}
+    if not ids:
+        return result
+    rows = session.exec(
+        select(PostTag.post_id, Tag.name)
+        .join(Tag, Tag.id == PostTag.tag_id)
+        .where(PostTag.post_id.in_(ids))
+        .order_by(PostTag.post_id, PostTag.position)
+    ).all()
+    for post_id, name in rows:
+        result[post_id].append(name)
+    return result
+
+
+def _tag_ids(session: Session, names: Iterable[str]) -> Dict[str, int]:
+    """id тегов по именам; недостающие теги создаются одной вставкой."""
+    wanted = set(names)
+    if not wanted:
+        return {}
+    existing = {t.name: t for t in session.exec(select(Tag).where(Tag.name.in_(wanted))).all()}
+    created = [Tag(name=name) for name in sorted(wanted - existing.keys())]
+    if created:
+        session.add_all(created)
+        session.flush()
+    return {t.name: t.id for t in [*existing.values(), *created]}  # type: ignore[misc]
+
+
+def set_post_tags(session: Session, post_id: int, names: Iterable[str]) -> List[str]:
+    tags = normalize_tags(names)
+    session.exec(delete(PostTag).where(PostTag.post_id == post_id))  # type: ignore[call-overload]
+    ids = _tag_ids(session, tags)
+    session.add_all(PostTag(post_id=post_id, tag_id=ids[name], position=position) for position, name in enumerate(tags))
+    return tags
+
+
+def tag_counts(session: Session) -> List[Dict[str, Any]]:
+    count = func.count(PostTag.post_id)
+    rows = session.exec(
+        select(Tag.name, count).join(PostTag, PostTag.tag_id == Tag.id).group_by(Tag.id).order_by(count.desc(), Tag.name)
+    ).all()
+    return [{"name": name, "count": total} for name, total in rows]
+
+
+def _watermark(session: Session, model: type[WishItem] | type[Post]) -> Watermark:
+    count, created, updated = session.exec(
+        select(func.count(model.id), func.max(model.created_at), func.max(model.updated_at))
+    ).one()
+    return Watermark(count=count, created=created, updated=updated)
+
+
+def table_watermarks(session: Session) -> Dict[str, Watermark]:
+    return {"wishlist": _watermark(session, WishItem), "posts": _watermark(session, Post)}
+
+
+def list_wishes(session: Session) -> List[Dict[str, Any]]:
+    items = session.exec(select(WishItem).order_by(WishItem.created_at.desc())).all()
+    return [wish_to_public(i) for i in items]
+
+
+def list_posts(session: Session) -> List[Dict[str, Any]]:
+    posts = session.exec(select(Post).order_by(Post.created_at.desc())).all()
+    tags = post_tags(session, (p.id for p in posts))
+    return [post_to_public(p, tags[p.id]) for p in posts]
+
+
+# поле ответа -> колонки, нужные для его вычисления
+WISH_FIELD_COLUMNS: Dict[str, Tuple[str, ...]] = {
+    "id": ("id",),
+    "title": ("title",),
+    "description": ("description",),
+    "link": ("link",),
+    "price": ("price",),
+    "reserved": ("reserved_by",),
+    "reserved_by": ("reserved_by",),
+    "reserved_contact": ("reserved_contact",),
+    "reserved_note": ("reserved_note",),
+    "reserved_at": ("reserved_at",),
+    "image_url": ("image_path",),
+    "image_variants": ("image_variants",),
+    "image_srcset": ("image_variants",),
+    "image_placeholder": ("image_placeholder",),
+}
+
+POST_FIELD_COLUMNS: Dict[str, Tuple[str, ...]] = {
+    "id": ("id",),
+    "title": ("title",),
+    "summary": ("summary",),
+    "body": ("body",),
+    "tags": (),
+    "created_at": ("created_at",),
+}
+
+
+@dataclass(frozen=True)
+class PageQuery:
+    limit: int
+    cursor: str | None = None
+    fields: Sequence[str] | None = None
+
+
+def encode_cursor(created_at: datetime, row_id: int) -> str:
+    raw = json.dumps([created_at.isoformat(), row_id]).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        created_at, row_id = json.loads(base64.urlsafe_b64decode(padded))
+        return datetime.fromisoformat(created_at), int(row_id)
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Некорректный курсор")
+
+
+def parse_fields(raw: str | None, known: Dict[str, Tuple[str, ...]]) -> List[str] | None:
+    if not raw:
+        return None
+    fields = [f.strip() for f in raw.split(",") if f.strip()]
+    unknown = [f for f in fields if f not in known]
+    if unknown:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Неизвестные поля: {', '.join(unknown)}",
+        )
+    return fields
+
+
+def _page(
+    session: Session,
+    model: type[WishItem] | type[Post],
+    query: PageQuery,
+    field_columns: Dict[str, Tuple[str, ...]],
+    filters: List[Any],
+) -> Tuple[List[SimpleNamespace], str | None]:
+    """Страница строк по ключу (created_at, id) с выборкой только нужных колонок."""
+    fields = query.fields or list(field_columns)
+    names = {"id", "created_at"}
+    for field in fields:
+        names.update(field_columns[field])
+    columns = [getattr(model, name) for name in model.__table__.columns.keys() if name in names]
+    stmt = select(*columns).where(*filters)
+    if query.cursor:
+        created_at, row_id = decode_cursor(query.cursor)
+        stmt = stmt.where(tuple_(model.created_at, model.id) < tuple_(created_at, row_id))
+    stmt = stmt.order_by(model.created_at.desc(), model.id.desc()).limit(query.limit + 1)
+    rows = session.exec(stmt).all()
+    next_cursor = None
+    if len(rows) > query.limit:
+        rows = rows[: query.limit]
+        next_cursor = encode_cursor(rows[-1].created_at, rows[-1].id)
+    defaults = {name: None for name in model.__table__.columns.keys()}
+    return [SimpleNamespace(**{**defaults, **row._mapping}) for row in rows], next_cursor
+
+
+def page_wishes(
+    session: Session,
+    query: PageQuery,
+    reserved: bool | None = None,
+    has_price: bool | None = None,
+) -> Dict[str, Any]:
+    filters: List[Any] = []
+    if reserved is not None:
+        filters.append(WishItem.reserved_by.is_not(None) if reserved else WishItem.reserved_by.is_(None))
+    if has_price is not None:
+        priced = and_(WishItem.price.is_not(None), WishItem.price != "")
+        filters.append(priced if has_price else ~priced)
+    rows, next_cursor = _page(session, WishItem, query, WISH_FIELD_COLUMNS, filters)
+    include = set(query.fields) if query.fields else None
+    for row in rows:
+        row.title = row.title or ""
+    items = [_project(wish_to_public(row), include) for row in rows]  # type: ignore[arg-type]
+    return {"items": items, "next_cursor": next_cursor}
+
+
+def page_posts(session: Session, query: PageQuery, tag: str | None = None) -> Dict[str, Any]:
+    filters: List[Any] = []
+    if tag:
+        tagged = select(PostTag.post_id).join(Tag, Tag.id == PostTag.tag_id).where(Tag.name == tag.strip())
+        filters.append(Post.id.in_(tagged))
+    rows, next_cursor = _page(session, Post, query, POST_FIELD_COLUMNS, filters)
+    include = set(query.fields) if query.fields else None
+    tags = post_tags(session, (row.id for row in rows)) if include is None or "tags" in include else {}
+    for row in rows:
+        row.title = row.title or ""
+        row.summary = row.summary or ""
+        row.body = row.body or ""
+    items = [
+        _project(post_to_public(row, tags.get(row.id, ())), include)  # type: ignore[arg-type]
+        for row in rows
+    ]
+    return {"items": items, "next_cursor": next_cursor}
+
+
+def get_wish(session: Session, item_id: int) -> WishItem:
+    item = session.get(WishItem, item_id)
+    if not item:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Элемент не найден")
+    return item
+
+
+def get_post(session: Session, post_id: int) -> Post:
+    post = session.get(Post, post_id)
+    if not post:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Пост не найден")
+    return post
+
+
+def read_post(session: Session, post_id: int) -> Dict[str, Any]:
+    post = get_post(session, post_id)
+    return post_to_public(post, post_tags(session, [post_id])[post_id])
+
+
+def wish_image_files(session: Session, item_id: int) -> List[str]:
+    """Файлы изображения пункта: оригинал и уменьшенные копии (404, если пункта нет)."""
+    item = get_wish(session, item_id)
+    if not item.image_path:
+        return []
+    return [item.image_path, *(v.path for v in variants_from_text(item.image_variants))]
+
+
+def orphaned_image_files(session: Session, files: Sequence[str]) -> List[str]:
+    """`files` из `wish_image_files`, если на оригинал больше не ссылается ни один пункт."""
+    if not files:
+        return []
+    in_use = session.exec(select(func.count(WishItem.id)).where(WishItem.image_path == files[0])).one()
+    return [] if in_use else list(files)
+
+
+def create_wish(session: Session, data: Dict[str, Any]) -> Dict[str, Any]:
+    item = WishItem(**data)
+    session.add(item)
+    session.flush()
+    search.index_wish(session, item)
+    session.commit()
+    session.refresh(item)
+    return wish_to_public(item)
+
+
+def update_wish(session: Session, item_id: int, data: Dict[str, Any]) -> Dict[str, Any]:
+    item = get_wish(session, item_id)
+    for field, value in data.items():
+        setattr(item, field, value)
+    item.touch()
+    session.add(item)
+    search.index_wish(session, item)
+    session.commit()
+    session.refresh(item)
+    return wish_to_public(item)
+
+
+def delete_wish(session: Session, item_id: int) -> None:
+    item = get_wish(session, item_id)
+    session.delete(item)
+    search.remove(session, "wish", item_id)
+    session.commit()
+
+
+def reserve_wish(
+    session: Session, item_id: int, payload: WishItemReserve, idempotency_key: str | None = None
+) -> Dict[str, Any]:
+    """Бронь одним условным UPDATE ... RETURNING: из одновременных запросов выигрывает ровно один.
+
+    Повтор запроса с тем же `idempotency_key` возвращает уже сделанную бронь вместо 409.
+    """
+    table = WishItem.__table__  # type: ignore[attr-defined]
+    now = datetime.utcnow()
+    stmt = (
+        update(table)
+        .where(table.c.id == item_id, table.c.reserved_by.is_(None))
+        .values(
+            reserved_by=payload.name.strip(),
+            reserved_contact=payload.contact,
+            reserved_note=payload.note,
+            reserved_at=now,
+            reservation_key=idempotency_key,
+            updated_at=now,
+        )
+        .returning(*table.c)
+    )
+    row = session.exec(stmt).first()  # type: ignore[call-overload]
+    if row is not None:
+        result = wish_to_public(SimpleNamespace(**row._mapping))  # type: ignore[arg-type]
+        session.commit()
+        return result
+    session.rollback()
+    # строка не обновилась: либо её нет (404), либо бронь уже есть
+    item = get_wish(session, item_id)
+    if idempotency_key and item.reservation_key == idempotency_key:
+        return wish_to_public(item)
+    raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="Уже забронировано")
+
+
+def release_wish(session: Session, item_id: int) -> Dict[str, Any]:
+    item = get_wish(session, item_id)
+    item.reserved_by = None
+    item.reserved_contact = None
+    item.reserved_note = None
+    item.reserved_at = None
+    item.reservation_key = None
+    item.touch()
+    session.add(item)
+    session.commit()
+    session.refresh(item)
+    return wish_to_public(item)
+
+
+def create_post(session: Session, payload: PostCreate) -> Dict[str, Any]:
+    post = Post(**payload.model_dump(exclude_none=True, exclude={"tags"}))
+    session.add(post)
+    session.flush()
+    tags = set_post_tags(session, post.id, payload.tags)
+    search.index_post(session, post, tags)
+    session.commit()
+    session.refresh(post)
+    return post_to_public(post, tags)
+
+
+def update_post(session: Session, post_id: int, payload: PostUpdate) -> Dict[str, Any]:
+    post = get_post(session, post_id)
+    data = payload.model_dump(exclude_none=True)
+    tags = data.pop("tags", None)
+    for field, value in data.items():
+        setattr(post, field, value)
+    if tags is not None:
+        tags = set_post_tags(session, post_id, tags)
+    else:
+        tags = post_tags(session, [post_id])[post_id]
+    post.touch()
+    session.add(post)
+    search.index_post(session, post, tags)
+    session.commit()
+    session.refresh(post)
+    return post_to_public(post, tags)
+
+
+def delete_post(session: Session, post_id: int) -> None:
+    post = get_post(session, post_id)
+    session.exec(delete(PostTag).where(PostTag.post_id == post_id))  # type: ignore[call-overload]
+    session.delete(post)
+    search.remove(session, "post", post_id)
+    session.commit()
+
+
+ImportBatch = Sequence[Tuple[int, Any]]
+
+
+def _import_batch(
+    session: Session, batch: ImportBatch, insert: Callable[[Session, Sequence[Any]], None]
+) -> Tuple[int, List[Dict[str, Any]]]:
+    """Вставляет пачку одной транзакцией; если БД её отвергла — повторяет построчно."""
+    try:
+        insert(session, [model for _, model in batch])
+        session.commit()
+        return len(batch), []
+    except SQLAlchemyError:
+        session.rollback()
+    created = 0
+    errors: List[Dict[str, Any]] = []
+    for row, model in batch:
+        try:
+            insert(session, [model])
+            session.commit()
+            created += 1
+        except SQLAlchemyError as exc:
+            session.rollback()
+            errors.append({"row": row, "error": str(getattr(exc, "orig", None) or exc)})
+    return created, errors
+
+
+def _insert_wishes(session: Session, models: Sequence[WishItemImport]) -> None:
+    items = [WishItem(**model.model_dump(exclude_none=True)) for model in models]
+    session.add_all(items)
+    session.flush()
+    search.index_many(
+        session,
+        "wish",
+        [
+            {"ref_id": item.id, "title": item.title, "summary": item.description or "", "body": "", "tags": ""}
+            for item in items
+        ],
+    )
+
+
+def _insert_posts(session: Session, models: Sequence[PostImport]) -> None:
+    posts = [Post(**model.model_dump(exclude_none=True, exclude={"tags"})) for model in models]
+    session.add_all(posts)
+    session.flush()
+    tag_lists = [normalize_tags(model.tags) for model in models]
+    ids = _tag_ids(session, {name for tags in tag_lists for name in tags})
+    session.add_all(
+        PostTag(post_id=post.id, tag_id=ids[name], position=position)
+        for post, tags in zip(posts, tag_lists)
+        for position, name in enumerate(tags)
+    )
+    search.index_many(
+        session,
+        "post",
+        [
+            {"ref_id": post.id, "title": post.title, "summary": post.summary, "body": post.body, "tags": " ".join(tags)}
+            for post, tags in zip(posts, tag_lists)
+        ],
+    )
+
+
+def import_wishes(session: Session, batch: ImportBatch) -> Tuple[int, List[Dict[str, Any]]]:
+    return _import_batch(session, batch, _insert_wishes)
+
+
+def import_posts(session: Session, batch: ImportBatch) -> Tuple[int, List[Dict[str, Any]]]:
+    return _import_batch(session, batch, _insert_posts)
+
+
+def export_wishes_query() -> Select[Any]:
+    table = WishItem.__table__  # type: ignore[attr-defined]
+    return select(*(c for c in table.c if c.name != "reservation_key")).order_by(table.c.id)
+
+
+def export_posts_query() -> Select[Any]:
+    table = Post.__table__  # type: ignore[attr-defined]
+    return select(*table.c).order_by(table.c.id)
+
+
+def export_wish_rows(session: Session, rows: Sequence[Any]) -> List[Dict[str, Any]]:
+    return [dict(row._mapping) for row in rows]
+
+
+def export_post_rows(session: Session, rows: Sequence[Any]) -> List[Dict[str, Any]]:
+    tags = post_tags(session, [row.id for row in rows])
+    return [{**row._mapping, "tags": tags[row.id]} for row in rows]
+
@@ -1,14 +1,71 @@
 from __future__ import annotations
 
-from typing import Iterator
+from typing import TYPE_CHECKING, Any, AsyncIterator, Dict, Iterator
 
-from sqlalchemy import inspect, text
+from sqlalchemy import event, inspect, text
+from sqlalchemy.engine import Engine, make_url
 
 from sqlmodel import Session, SQLModel, create_engine
 
 from .config import Settings, get_settings
+from .utils import normalize_tags, tags_from_text
+
+if TYPE_CHECKING:
+    from sqlmodel.ext.asyncio.session import AsyncSession
 
 engine = None
+async_engine = None
+
+# синхронный драйвер -> асинхронный для того же URL
+ASYNC_DRIVERS = {
+    "sqlite": "aiosqlite",
+    "postgresql": "asyncpg",
+    "mysql": "aiomysql",
+    "mariadb": "aiomysql",
+}
+
+
+def _is_memory_sqlite(database_url: str) -> bool:
+    parsed = make_url(database_url)
+    return parsed.get_backend_name() == "sqlite" and parsed.database in (None, "", ":memory:")
+
+
+def _pool_options(database_url: str, settings: Settings) -> Dict[str, Any]:
+    # in-memory SQLite живёт в одном соединении (SingletonThreadPool/StaticPool) — пул не настраиваем
+    if _is_memory_sqlite(database_url):
+        return {}
+    return {
+        "pool_size": settings.db_pool_size,
+        "max_overflow": settings.db_max_overflow,
+        "pool_timeout": settings.db_pool_timeout,
+        "pool_recycle": settings.db_pool_recycle,
+        "pool_pre_ping": settings.db_pool_pre_ping,
+    }
+
+
+def apply_sqlite_pragmas(target: Engine, settings: Settings) -> None:
+    """Настраивает каждое новое SQLite-соединение: WAL, synchronous, mmap, кэш, busy timeout."""
+    if target.dialect.name != "sqlite":
+        return
+    pragmas = {
+        "journal_mode": settings.sqlite_journal_mode,
+        "synchronous": settings.sqlite_synchronous,
+        "busy_timeout": settings.sqlite_busy_timeout_ms,
+        "cache_size": settings.sqlite_cache_size,
+        "mmap_size": settings.sqlite_mmap_size,
+    }
+    if _is_memory_sqlite(str(target.url)):
+        pragmas.pop("journal_mode")
+
+    @event.listens_for(target, "connect")
+    def _set_pragmas(dbapi_connection, connection_record):  # type: ignore[no-untyped-def]
+        cursor = dbapi_connection.cursor()
+        try:
+            for name, value in pragmas.items():
+                if value is not None and value != "":
+                    cursor.execute(f"PRAGMA {name}={value}")
+        finally:
+            cursor.close()
 
 
 def init_engine(url: str | None = None, settings: Settings | None = None):
@@ -17,10 +74,36 @@ def init_engine(url: str | None = None, settings: Settings | None = None):
         settings = settings or get_settings()
         database_url = url or settings.resolved_database_url
         connect_args = {"check_same_thread": False} if database_url.startswith("sqlite") else {}
-        engine = create_engine(database_url, connect_args=connect_args)
+        engine = create_engine(database_url, connect_args=connect_args, **_pool_options(database_url, settings))
+        apply_sqlite_pragmas(engine, settings)
     return engine
 
 
+def async_database_url(url: str) -> str:
+    parsed = make_url(url)
+    if getattr(parsed.get_dialect(), "is_async", False):
+        return url
+    backend = parsed.get_backend_name()
+    driver = ASYNC_DRIVERS.get(backend)
+    if driver is None:
+        raise RuntimeError(f"Нет асинхронного драйвера для {backend}")
+    return parsed.set(drivername=f"{backend}+{driver}").render_as_string(hide_password=False)
+
+
+def init_async_engine(url: str | None = None, settings: Settings | None = None):
+    global async_engine
+    if async_engine is None:
+        try:
+            from sqlalchemy.ext.asyncio import create_async_engine
+        except ImportError as exc:  # pragma: no cover - зависит от окружения
+            raise RuntimeError("Для асинхронного режима установите extra `async`") from exc
+        settings = settings or get_settings()
+        database_url = async_database_url(url or settings.resolved_database_url)
+        async_engine = create_async_engine(database_url, **_pool_options(database_url, settings))
+        apply_sqlite_pragmas(async_engine.sync_engine, settings)
+    return async_engine
+
+
 def get_session() -> Iterator[Session]:
     if engine is None:
         raise RuntimeError("База данных не инициализирована")
@@ -34,18 +117,80 @@ def create_db_and_tables() -> None:
     SQLModel.metadata.create_all(engine)
 
 
+def _add_missing_columns(table: str, columns: dict[str, str]) -> None:
+    inspector = inspect(engine)
+    if table not in inspector.get_table_names():
+        return
+    existing = {col["name"] for col in inspector.get_columns(table)}
+    missing = {name: ddl for name, ddl in columns.items() if name not in existing}
+    if not missing:
+        return
+    with engine.begin() as conn:
+        for name, ddl in missing.items():
+            conn.execute(text(f"ALTER TABLE {table} ADD COLUMN {name} {ddl}"))
+
+
 def ensure_wishlist_columns() -> None:
-    """Простая миграция: добавляем колонку image_path при необходимости."""
+    """Простая миграция: добавляем колонки, появившиеся после первой версии схемы."""
+    if engine is None:
+        raise RuntimeError("База данных не инициализирована")
+    _add_missing_columns(
+        "wishitem",
+        {
+            "image_path": "VARCHAR",
+            "updated_at": "DATETIME",
+            "image_variants": "VARCHAR",
+            "image_placeholder": "VARCHAR",
+            "reservation_key": "VARCHAR",
+        },
+    )
+    _add_missing_columns("post", {"updated_at": "DATETIME"})
+
+
+async def get_async_session() -> AsyncIterator[AsyncSession]:
+    from sqlmodel.ext.asyncio.session import AsyncSession
+
+    if async_engine is None:
+        raise RuntimeError("Асинхронный движок не инициализирован")
+    async with AsyncSession(async_engine) as session:
+        yield session
+
+
+def migrate_post_tags() -> None:
+    """Переносит теги из старой CSV-колонки post.tags в таблицы tag/posttag."""
     if engine is None:
         raise RuntimeError("База данных не инициализирована")
     inspector = inspect(engine)
-    tables = inspector.get_table_names()
-    if "wishitem" not in tables:
+    if "post" not in inspector.get_table_names():
+        return
+    if "tags" not in {col["name"] for col in inspector.get_columns("post")}:
         return
-    columns = {col["name"] for col in inspector.get_columns("wishitem")}
-    if "image_path" not in columns:
-        with engine.begin() as conn:
-            conn.execute(text("ALTER TABLE wishitem ADD COLUMN image_path VARCHAR"))
+    with engine.begin() as conn:
+        rows = conn.execute(text("SELECT id, tags FROM post WHERE tags IS NOT NULL")).all()
+        for post_id, raw in rows:
+            for position, name in enumerate(normalize_tags(tags_from_text(raw))):
+                tag_id = conn.execute(text("SELECT id FROM tag WHERE name = :name"), {"name": name}).scalar()
+                if tag_id is None:
+                    conn.execute(text("INSERT INTO tag (name) VALUES (:name)"), {"name": name})
+                    tag_id = conn.execute(text("SELECT id FROM tag WHERE name = :name"), {"name": name}).scalar()
+                conn.execute(
+                    text(
+                        "INSERT INTO posttag (post_id, tag_id, position) "
+                        "SELECT :post_id, :tag_id, :position WHERE NOT EXISTS "
+                        "(SELECT 1 FROM posttag WHERE post_id = :post_id AND tag_id = :tag_id)"
+                    ),
+                    {"post_id": post_id, "tag_id": tag_id, "position": position},
+                )
+            conn.execute(text("UPDATE post SET tags = NULL WHERE id = :id"), {"id": post_id})
+
+
+def ensure_indexes() -> None:
+    """Создаёт индексы из моделей, которых ещё нет в существующей БД."""
+    if engine is None:
+        raise RuntimeError("База данных не инициализирована")
+    for table in SQLModel.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(engine, checkfirst=True)
 
 
 def get_engine():
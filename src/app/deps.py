@@ -1,16 +1,72 @@
 from __future__ import annotations
 
+from abc import ABC, abstractmethod
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Callable, TypeVar
+
 from fastapi import Depends, Header, HTTPException, status
 from sqlmodel import Session
+from starlette.concurrency import run_in_threadpool
 
+from . import database
 from .config import Settings, get_settings
 from .database import get_session
 
+T = TypeVar("T")
+
+
+class Database(ABC):
+    """Единая точка работы с БД для async-обработчиков.
+
+    Логика запросов пишется как обычные синхронные функции `fn(session, ...)`;
+    в синхронном режиме они уходят в threadpool, в асинхронном выполняются
+    через `AsyncSession.run_sync` без занятия потоков.
+    """
+
+    @abstractmethod
+    async def run(self, fn: Callable[..., T], *args: Any) -> T: ...
+
+
+class SyncDatabase(Database):
+    def __init__(self, session: Session):
+        self.session = session
+
+    async def run(self, fn: Callable[..., T], *args: Any) -> T:
+        return await run_in_threadpool(fn, self.session, *args)
+
+
+class AsyncDatabase(Database):
+    def __init__(self, session: Any):
+        self.session = session
+
+    async def run(self, fn: Callable[..., T], *args: Any) -> T:
+        return await self.session.run_sync(fn, *args)
+
+
+@asynccontextmanager
+async def open_db() -> AsyncIterator[Database]:
+    if database.async_engine is not None:
+        from sqlmodel.ext.asyncio.session import AsyncSession
+
+        async with AsyncSession(database.async_engine) as async_session:
+            yield AsyncDatabase(async_session)
+        return
+    session = Session(database.get_engine())
+    try:
+        yield SyncDatabase(session)
+    finally:
+        await run_in_threadpool(session.close)
+
 
 def get_db_session() -> Session:
     yield from get_session()
 
 
+async def get_db() -> AsyncIterator[Database]:
+    async with open_db() as db:
+        yield db
+
+
 def require_admin(
     admin_token: str | None = Header(default=None, alias="X-Admin-Token"),
     settings: Settings = Depends(get_settings),
@@ -0,0 +1,167 @@
+from __future__ import annotations
+
+import asyncio
+import secrets
+from collections import deque
+from dataclasses import dataclass
+from typing import Any, AsyncIterator, Deque, List, Set
+
+from .serialization import dumps
+
+
+@dataclass(frozen=True)
+class Event:
+    """Событие, уже сериализованное в формат text/event-stream."""
+
+    id: int
+    name: str
+    payload: bytes
+
+
+def format_event(event_id: str | None, name: str, data: Any) -> bytes:
+    lines = []
+    if event_id is not None:
+        lines.append(f"id: {event_id}".encode("ascii"))
+    lines.append(f"event: {name}".encode("utf-8"))
+    lines.append(b"data: " + dumps(data))
+    return b"\n".join(lines) + b"\n\n"
+
+
+class Subscription:
+    """Очередь событий одного подписчика."""
+
+    def __init__(self, hub: "EventHub", queue_size: int):
+        self._hub = hub
+        self.queue: asyncio.Queue[Event | None] = asyncio.Queue(maxsize=queue_size)
+        self.overflowed = False
+
+    def push(self, event: Event | None) -> None:
+        if self.overflowed:
+            return
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            # медленный клиент: дальше шлём ему reset, пусть перечитает список целиком
+            self.overflowed = True
+
+    def close(self) -> None:
+        self._hub.unsubscribe(self)
+
+
+class EventHub:
+    """Рассылка изменений в пределах процесса с кольцевым буфером для повторной отправки.
+
+    Событие сериализуется один раз при публикации, подписчики получают готовые байты.
+    Клиент, переподключившийся с `Last-Event-ID`, получает пропущенные события из
+    буфера; если нужных событий там уже нет — событие `reset`.
+    """
+
+    def __init__(self, history: int = 256, queue_size: int = 64):
+        self._history: Deque[Event] = deque(maxlen=max(history, 1))
+        self._subscribers: Set[Subscription] = set()
+        self._queue_size = max(queue_size, 1)
+        # id события — `<метка>-<номер>` с меткой этого процесса: Last-Event-ID, выданный
+        # другим воркером или до перезапуска, не совпадёт ни с одним своим и даст reset,
+        # а не чужие события с теми же номерами
+        self.instance = secrets.token_hex(4)
+        self._last_id = 0
+        self._closed = False
+
+    @property
+    def last_id(self) -> int:
+        return self._last_id
+
+    def event_id(self, number: int) -> str:
+        return f"{self.instance}-{number}"
+
+    def _own_number(self, last_event_id: str) -> int | None:
+        instance, _, number = last_event_id.rpartition("-")
+        if instance != self.instance or not number.isdigit():
+            return None
+        return int(number)
+
+    @property
+    def subscribers(self) -> int:
+        return len(self._subscribers)
+
+    def publish(self, name: str, data: Any) -> Event:
+        self._last_id += 1
+        event = Event(id=self._last_id, name=name, payload=format_event(self.event_id(self._last_id), name, data))
+        self._history.append(event)
+        for sub in list(self._subscribers):
+            sub.push(event)
+        return event
+
+    def replay(self, last_event_id: str) -> List[Event] | None:
+        """События после `last_event_id` или None, если часть из них вытеснена или id не наш."""
+        number = self._own_number(last_event_id)
+        if number is None:
+            return None
+        return self._replay(number)
+
+    def _replay(self, last_event_id: int) -> List[Event] | None:
+        if last_event_id == self._last_id:
+            return []
+        if last_event_id > self._last_id or not self._history or self._history[0].id > last_event_id + 1:
+            return None
+        return [event for event in self._history if event.id > last_event_id]
+
+    def subscribe(self) -> Subscription:
+        sub = Subscription(self, self._queue_size)
+        if self._closed:
+            sub.push(None)
+        self._subscribers.add(sub)
+        return sub
+
+    def unsubscribe(self, sub: Subscription) -> None:
+        self._subscribers.discard(sub)
+
+    def close(self) -> None:
+        """Завершает все открытые потоки (при остановке приложения)."""
+        self._closed = True
+        for sub in list(self._subscribers):
+            sub.overflowed = False
+            sub.push(None)
+
+    async def stream(
+        self,
+        last_event_id: str | None,
+        keepalive: float = 15.0,
+        retry_ms: int = 3000,
+    ) -> AsyncIterator[bytes]:
+        """Поток text/event-stream для одного клиента."""
+        sub = self.subscribe()
+        sent = self._last_id
+        head = [f"retry: {retry_ms}\n\n".encode("ascii")]
+        missed = self.replay(last_event_id) if last_event_id is not None else []
+        if last_event_id is None:
+            head.append(format_event(self.event_id(sent), "hello", {"last_id": self.event_id(sent)}))
+        elif missed is None:
+            head.append(format_event(self.event_id(sent), "reset", {"last_id": self.event_id(sent)}))
+        else:
+            head.extend(event.payload for event in missed)
+        try:
+            yield b"".join(head)
+            while True:
+                if sub.overflowed:
+                    last = self.event_id(self._last_id)
+                    yield format_event(last, "reset", {"last_id": last})
+                    return
+                try:
+                    event = await asyncio.wait_for(sub.queue.get(), timeout=keepalive)
+                except asyncio.TimeoutError:
+                    yield b": keepalive\n\n"
+                    continue
+                if event is None:
+                    return
+                if event.id <= sent:
+                    continue
+                sent = event.id
+                yield event.payload
+        finally:
+            sub.close()
+
+
+def parse_last_event_id(value: str | None) -> str | None:
+    value = (value or "").strip()
+    return value or None
@@ -0,0 +1,257 @@
+"""Статическая выгрузка сайта: страницы и JSON API в каталог файлов для nginx.
+
+    uv run export                 # в APP_EXPORT_DIR (по умолчанию data/export)
+    uv run export --output /srv/resume
+
+Ответы берутся у самого приложения вызовом ASGI в том же процессе, поэтому файлы
+совпадают с тем, что отдал бы сервер. С `APP_EXPORT_ON_WRITE` запущенное
+приложение после каждой записи перевыгружает только затронутые файлы.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import logging
+import os
+import shutil
+import sys
+from pathlib import Path
+from typing import Iterable, List, Sequence, Set, Tuple
+from urllib.parse import urlencode
+
+from starlette.concurrency import run_in_threadpool
+from starlette.types import ASGIApp, Message
+
+from . import assets
+from .compression import SUFFIXES, brotli, compress_bytes
+from .serialization import loads
+
+logger = logging.getLogger(__name__)
+
+PAGES = {"/": "index.html", "/wishlist": "wishlist/index.html"}
+API = ("/api/resume", "/api/wishlist", "/api/posts", "/api/tags")
+# какие файлы зависят от каких данных — те же источники, что в ETag этих маршрутов
+DEPENDENCIES = {
+    "resume": ("/", "/wishlist", "/api/resume"),
+    "wishlist": ("/wishlist", "/api/resume", "/api/wishlist"),
+    "posts": ("/", "/api/resume", "/api/posts", "/api/tags"),
+}
+MINIMUM_COMPRESS_SIZE = 1024
+
+
+def target_name(path: str) -> str:
+    """Файл для маршрута: `/wishlist` -> `wishlist/index.html`, `/api/posts/3` -> `api/posts/3.json`."""
+    return PAGES.get(path) or path.lstrip("/") + ".json"
+
+
+async def fetch(app: ASGIApp, path: str, query: str = "") -> Tuple[int, bytes]:
+    """GET к приложению в том же процессе, без сети и без сжатия ответа."""
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": "GET",
+        "scheme": "http",
+        "path": path,
+        "raw_path": path.encode("utf-8"),
+        "root_path": "",
+        "query_string": query.encode("ascii"),
+        "headers": [(b"host", b"export")],
+        "client": ("127.0.0.1", 0),
+        "server": ("export", 80),
+        "state": {},
+    }
+    status = 500
+    body: List[bytes] = []
+    requested = False
+    done = asyncio.Event()
+
+    async def receive() -> Message:
+        nonlocal requested
+        if not requested:
+            requested = True
+            return {"type": "http.request", "body": b"", "more_body": False}
+        # тело запроса пустое; дальше клиент только «отключается» после ответа
+        await done.wait()
+        return {"type": "http.disconnect"}
+
+    async def send(message: Message) -> None:
+        nonlocal status
+        if message["type"] == "http.response.start":
+            status = message["status"]
+        elif message["type"] == "http.response.body":
+            body.append(message.get("body", b""))
+            if not message.get("more_body", False):
+                done.set()
+
+    await app(scope, receive, send)
+    return status, b"".join(body)
+
+
+def write_file(target: Path, body: bytes, brotli_quality: int = 11) -> None:
+    """Атомарная запись файла и его `.gz`/`.br` копий для gzip_static/brotli_static."""
+    target.parent.mkdir(parents=True, exist_ok=True)
+    variants = [(target, body)]
+    encodings = ["gzip"] + (["br"] if brotli is not None else [])
+    for encoding in encodings:
+        sibling = target.with_name(target.name + SUFFIXES[encoding])
+        if len(body) >= MINIMUM_COMPRESS_SIZE:
+            variants.append((sibling, compress_bytes(body, encoding, 9, brotli_quality)))
+        else:
+            sibling.unlink(missing_ok=True)
+    # сначала копии, потом сам файл: nginx не увидит новый файл со старой сжатой копией дольше одной записи
+    for path, data in reversed(variants):
+        tmp = path.with_name(path.name + ".tmp")
+        tmp.write_bytes(data)
+        os.replace(tmp, path)
+
+
+def remove_file(target: Path) -> None:
+    for path in (target, *(target.with_name(target.name + suffix) for suffix in SUFFIXES.values())):
+        path.unlink(missing_ok=True)
+
+
+def copy_static(source: Path, directory: Path) -> int:
+    """Файлы `static/` под именами с отпечатком — теми, что стоят в HTML."""
+    copied = 0
+    for path in source.rglob("*"):
+        if not path.is_file() or path.suffix in (".gz", ".br", ".tmp"):
+            continue
+        rel = path.relative_to(source).as_posix()
+        target = directory / "static" / assets.asset_path("static", rel)
+        if target.exists():
+            # отпечаток в имени — от содержимого: такой файл уже выгружен
+            continue
+        target.parent.mkdir(parents=True, exist_ok=True)
+        shutil.copyfile(path, target)
+        for suffix in SUFFIXES.values():
+            sibling = path.with_name(path.name + suffix)
+            if sibling.exists() and sibling.stat().st_mtime >= path.stat().st_mtime:
+                shutil.copyfile(sibling, target.with_name(target.name + suffix))
+        copied += 1
+    return copied
+
+
+class StaticExporter:
+    """Выгрузка маршрутов приложения в файлы.
+
+    `schedule` копит затронутые источники и запускает одну фоновую задачу: серия
+    записей подряд приводит к одной перевыгрузке, а не к одной на запрос.
+    """
+
+    def __init__(self, app: ASGIApp, directory: Path, page_size: int = 200, brotli_quality: int = 11):
+        self.app = app
+        self.directory = directory
+        self.page_size = page_size
+        self.brotli_quality = brotli_quality
+        self._paths: Set[str] = set()
+        self._posts: Set[int] = set()
+        self._all_posts = False
+        self._task: asyncio.Task[None] | None = None
+
+    async def export_path(self, path: str) -> bool:
+        """Выгружает один маршрут; 404 удаляет файл (например, пост удалён)."""
+        status, body = await fetch(self.app, path)
+        target = self.directory / target_name(path)
+        if status == 404:
+            await run_in_threadpool(remove_file, target)
+            return False
+        if status != 200:
+            logger.warning("Выгрузка %s пропущена: ответ %s", path, status)
+            return False
+        await run_in_threadpool(write_file, target, body, self.brotli_quality)
+        return True
+
+    async def post_ids(self) -> List[int]:
+        ids: List[int] = []
+        cursor: str | None = None
+        while True:
+            params = {"fields": "id", "limit": self.page_size, **({"cursor": cursor} if cursor else {})}
+            status, body = await fetch(self.app, "/api/posts", urlencode(params))
+            if status != 200:
+                raise RuntimeError(f"/api/posts ответил {status}")
+            page = loads(body)
+            ids.extend(item["id"] for item in page["items"])
+            cursor = page["next_cursor"]
+            if not cursor:
+                return ids
+
+    async def export_posts(self, ids: Iterable[int] | None = None) -> int:
+        """Файлы `api/posts/<id>.json`; без `ids` — все посты, а файлы удалённых стираются."""
+        if ids is None:
+            ids = await self.post_ids()
+            known = {f"{post_id}.json" for post_id in ids}
+            posts_dir = self.directory / "api" / "posts"
+            if posts_dir.is_dir():
+                for path in posts_dir.glob("*.json"):
+                    if path.name not in known:
+                        await run_in_threadpool(remove_file, path)
+        written = 0
+        for post_id in ids:
+            written += await self.export_path(f"/api/posts/{post_id}")
+        return written
+
+    async def export_all(self, static_dir: Path | None = None) -> int:
+        written = 0
+        for path in (*PAGES, *API):
+            written += await self.export_path(path)
+        written += await self.export_posts()
+        if static_dir is not None:
+            written += await run_in_threadpool(copy_static, static_dir, self.directory)
+        return written
+
+    def schedule(self, source: str, post_ids: Sequence[int] | None = ()) -> None:
+        """Перевыгрузить файлы, зависящие от `source`; `post_ids=None` — все посты."""
+        self._paths.update(DEPENDENCIES[source])
+        if post_ids is None:
+            self._all_posts = True
+        else:
+            self._posts.update(post_ids)
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._drain())
+
+    async def _drain(self) -> None:
+        while self._paths or self._posts or self._all_posts:
+            paths, self._paths = self._paths, set()
+            posts, self._posts = self._posts, set()
+            all_posts, self._all_posts = self._all_posts, False
+            try:
+                for path in sorted(paths):
+                    await self.export_path(path)
+                await self.export_posts(None if all_posts else sorted(posts))
+            except Exception:
+                logger.exception("Не удалось перевыгрузить статические файлы")
+
+    async def wait(self) -> None:
+        """Дождаться запланированной выгрузки (при остановке приложения)."""
+        if self._task is not None:
+            await asyncio.shield(self._task)
+
+
+def main(argv: Sequence[str] | None = None) -> int:
+    from .app_factory import create_app
+    from .config import get_settings
+
+    settings = get_settings()
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--output", type=Path, help="каталог выгрузки (по умолчанию APP_EXPORT_DIR)")
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+
+    directory = args.output or settings.resolved_export_dir
+    # выгрузка сама пишет файлы: повторно перевыгружать их после каждой записи не нужно
+    app = create_app(settings.model_copy(update={"export_on_write": False}))
+    exporter = StaticExporter(app, directory, settings.api_max_page_size)
+
+    async def run() -> int:
+        async with app.router.lifespan_context(app):
+            return await exporter.export_all(Path(__file__).parent / "static")
+
+    written = asyncio.run(run())
+    logger.info("Выгружено файлов: %s в %s", written, directory)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
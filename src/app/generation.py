@@ -0,0 +1,159 @@
+from __future__ import annotations
+
+import asyncio
+import mmap
+import os
+import struct
+from pathlib import Path
+from typing import Any, Callable, List, Tuple
+
+from .serialization import dumps, loads
+
+try:  # fcntl есть только на POSIX; без него увеличение счётчика не сериализуется между процессами
+    import fcntl
+except ImportError:  # pragma: no cover - зависит от платформы
+    fcntl = None  # type: ignore[assignment]
+
+_FORMAT = "<Q"
+_SIZE = struct.calcsize(_FORMAT)
+
+
+class SharedGeneration:
+    """Поколение данных, общее для всех воркеров: 8-байтовый счётчик в файле, отображённом в память.
+
+    Чтение — обращение к памяти без системных вызовов, поэтому его можно делать
+    на каждом запросе. Запись увеличивает счётчик под flock.
+    """
+
+    def __init__(self, path: Path):
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self.path = path
+        self._fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+        if os.fstat(self._fd).st_size < _SIZE:
+            os.ftruncate(self._fd, _SIZE)
+        self._map = mmap.mmap(self._fd, _SIZE)
+
+    @property
+    def value(self) -> int:
+        return struct.unpack_from(_FORMAT, self._map)[0]
+
+    def bump(self) -> int:
+        if fcntl is not None:
+            fcntl.flock(self._fd, fcntl.LOCK_EX)
+        try:
+            value = self.value + 1
+            struct.pack_into(_FORMAT, self._map, 0, value)
+        finally:
+            if fcntl is not None:
+                fcntl.flock(self._fd, fcntl.LOCK_UN)
+        return value
+
+    def close(self) -> None:
+        self._map.close()
+        os.close(self._fd)
+
+
+class EventRelay:
+    """События потока между воркерами: общий журнал строк JSON, дописываемый под flock.
+
+    Воркер, опубликовавший событие у себя, дописывает его в журнал; остальные раз в
+    `interval` секунд дочитывают журнал и публикуют чужие события своим подписчикам —
+    так запись в одном воркере доходит до клиентов других как `upsert`/`delete`, а не
+    как `reset` с перечитыванием списка. Журнал длиннее `max_bytes` переименовывается
+    в `.1`; читатель дочитывает старый файл по своему дескриптору и переходит на новый.
+    """
+
+    def __init__(self, path: Path, max_bytes: int = 1 << 20):
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self.path = path
+        self.max_bytes = max_bytes
+        self._lock_fd = os.open(path.with_name(path.name + ".lock"), os.O_RDWR | os.O_CREAT, 0o644)
+        self._fd = os.open(path, os.O_RDONLY | os.O_CREAT, 0o644)
+        self._offset = os.fstat(self._fd).st_size
+        self._seen = self._sequence()
+
+    def _lock(self, exclusive: bool) -> None:
+        if fcntl is not None:
+            fcntl.flock(self._lock_fd, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+
+    def _unlock(self) -> None:
+        if fcntl is not None:
+            fcntl.flock(self._lock_fd, fcntl.LOCK_UN)
+
+    def _sequence(self) -> int:
+        # номер последней записи хранится в файле замка: пропуск номеров — значит, часть журнала потеряна
+        raw = os.pread(self._lock_fd, _SIZE, 0)
+        return struct.unpack(_FORMAT, raw)[0] if len(raw) == _SIZE else 0
+
+    def append(self, name: str, data: Any) -> None:
+        self._lock(exclusive=True)
+        try:
+            seq = self._sequence() + 1
+            os.pwrite(self._lock_fd, struct.pack(_FORMAT, seq), 0)
+            # pid, а не значение из __init__: приложение могли создать до fork воркеров
+            line = dumps({"seq": seq, "origin": os.getpid(), "event": name, "data": data}) + b"\n"
+            try:
+                if os.stat(self.path).st_size + len(line) > self.max_bytes:
+                    os.replace(self.path, self.path.with_name(self.path.name + ".1"))
+            except FileNotFoundError:
+                pass
+            fd = os.open(self.path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+            try:
+                os.write(fd, line)
+            finally:
+                os.close(fd)
+        finally:
+            self._unlock()
+
+    def _read_rest(self) -> bytes:
+        size = os.fstat(self._fd).st_size
+        chunk = os.pread(self._fd, size - self._offset, self._offset) if size > self._offset else b""
+        self._offset = size
+        return chunk
+
+    def read(self) -> List[Tuple[str, Any]]:
+        """Чужие события с прошлого чтения.
+
+        Если журнал повернулся дважды между чтениями и часть событий пропала, — один `reset`.
+        ValueError — журнал не разобрать, тоже нужен reset.
+        """
+        self._lock(exclusive=False)
+        try:
+            chunk = self._read_rest()
+            try:
+                rotated = os.stat(self.path).st_ino != os.fstat(self._fd).st_ino
+            except FileNotFoundError:
+                rotated = False
+            if rotated:
+                os.close(self._fd)
+                self._fd = os.open(self.path, os.O_RDONLY)
+                self._offset = 0
+                chunk += self._read_rest()
+        finally:
+            self._unlock()
+        events: List[Tuple[str, Any]] = []
+        origin = os.getpid()
+        lost = False
+        for line in chunk.splitlines():
+            record = loads(line)
+            if record["seq"] <= self._seen:
+                continue
+            lost = lost or record["seq"] != self._seen + 1
+            self._seen = record["seq"]
+            if record["origin"] != origin:
+                events.append((record["event"], record["data"]))
+        return [("reset", {})] if lost else events
+
+    async def watch(self, interval: float, publish: Callable[[str, Any], Any]) -> None:
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                relayed = self.read()
+            except (ValueError, KeyError, TypeError):
+                relayed = [("reset", {})]
+            for name, data in relayed:
+                publish(name, data)
+
+    def close(self) -> None:
+        os.close(self._fd)
+        os.close(self._lock_fd)
@@ -0,0 +1,62 @@
+from __future__ import annotations
+
+import hashlib
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from email.utils import formatdate
+from typing import Any, Dict
+
+from fastapi import Request, Response, status
+
+from .compression import strip_encoding
+from .config import Settings
+
+
+@dataclass(frozen=True)
+class Watermark:
+    """Отпечаток таблицы: число строк и самые свежие отметки времени."""
+
+    count: int
+    created: datetime | None
+    updated: datetime | None
+
+    @property
+    def last_modified(self) -> float | None:
+        stamps = [s for s in (self.created, self.updated) if s is not None]
+        if not stamps:
+            return None
+        return max(stamps).replace(tzinfo=timezone.utc).timestamp()
+
+
+def make_etag(*parts: Any) -> str:
+    digest = hashlib.blake2b(repr(parts).encode("utf-8"), digest_size=12).hexdigest()
+    return f'"{digest}"'
+
+
+def etag_matches(if_none_match: str | None, etag: str) -> bool:
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    # If-None-Match сравнивается слабо (RFC 9110, 13.1.2)
+    candidates = (strip_encoding(c.strip().removeprefix("W/")) for c in if_none_match.split(","))
+    return etag in candidates
+
+
+def cache_headers(settings: Settings, etag: str, last_modified: float | None) -> Dict[str, str]:
+    headers = {"ETag": etag, "Cache-Control": settings.http_cache_control}
+    if settings.http_last_modified and last_modified is not None:
+        headers["Last-Modified"] = formatdate(last_modified, usegmt=True)
+    return headers
+
+
+def not_modified(
+    request: Request, settings: Settings, etag: str, last_modified: float | None
+) -> Response | None:
+    """Возвращает готовый 304, если клиент прислал актуальный ETag."""
+    if not etag_matches(request.headers.get("if-none-match"), etag):
+        return None
+    return Response(
+        status_code=status.HTTP_304_NOT_MODIFIED,
+        headers=cache_headers(settings, etag, last_modified),
+    )
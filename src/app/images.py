@@ -0,0 +1,133 @@
+from __future__ import annotations
+
+import asyncio
+import base64
+import io
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Any, Dict, List, Sequence
+
+PLACEHOLDER_WIDTH = 16
+
+
+@dataclass(frozen=True)
+class ImageVariant:
+    width: int
+    path: str
+
+
+@dataclass(frozen=True)
+class ProcessedImage:
+    format: str
+    variants: List[ImageVariant] = field(default_factory=list)
+    placeholder: str | None = None
+
+    def to_columns(self) -> Dict[str, Any]:
+        variants = [asdict(v) for v in self.variants]
+        return {
+            "image_variants": json.dumps({"format": self.format, "variants": variants}),
+            "image_placeholder": self.placeholder,
+        }
+
+
+def variants_from_text(text: str | None) -> List[ImageVariant]:
+    if not text:
+        return []
+    raw = json.loads(text)
+    return [ImageVariant(width=int(v["width"]), path=v["path"]) for v in raw.get("variants", [])]
+
+
+class ImageError(ValueError):
+    """Файл не удалось прочитать или перекодировать: битый, слишком большой или неподдерживаемый формат."""
+
+
+def _encode(image: Any, fmt: str, quality: int) -> bytes:
+    buffer = io.BytesIO()
+    image.save(buffer, format=fmt.upper(), quality=quality)
+    return buffer.getvalue()
+
+
+def _write_atomic(path: Path, data: bytes) -> None:
+    # читатель не должен увидеть недописанную копию, пока рядом идёт загрузка
+    tmp = path.with_name(path.name + ".tmp")
+    tmp.write_bytes(data)
+    os.replace(tmp, path)
+
+
+def build_variants(
+    source: Path, base_dir: Path, fmt: str, widths: Sequence[int], quality: int
+) -> ProcessedImage | None:
+    """Готовит набор уменьшенных копий и крошечное превью (LQIP) для изображения.
+
+    Без Pillow возвращает None — тогда отдаётся только оригинал. Если файл не
+    удаётся декодировать или закодировать в `fmt`, бросает ImageError.
+    """
+    try:
+        from PIL import Image, ImageOps
+    except ImportError:
+        return None
+
+    try:
+        with Image.open(source) as opened:
+            image = ImageOps.exif_transpose(opened)
+            if image.mode not in ("RGB", "RGBA"):
+                image = image.convert("RGBA" if "A" in image.getbands() else "RGB")
+            image.load()
+
+        targets = sorted({w for w in widths if w < image.width} | {min(max(widths), image.width)})
+        variants: List[ImageVariant] = []
+        for width in targets:
+            height = max(1, round(image.height * width / image.width))
+            resized = image if width == image.width else image.resize((width, height), Image.LANCZOS)
+            rel_path = source.with_name(f"{source.stem}-{width}.{fmt}").relative_to(base_dir).as_posix()
+            encoded = _encode(resized, fmt, quality)
+            _write_atomic(base_dir / rel_path, encoded)
+            variants.append(ImageVariant(width=width, path=rel_path))
+    # KeyError/ValueError — Pillow без кодировщика для `fmt` или с неподходящим режимом
+    except (Image.DecompressionBombError, KeyError, ValueError) as exc:
+        raise ImageError(str(exc)) from exc
+
+    tiny_height = max(1, round(image.height * PLACEHOLDER_WIDTH / image.width))
+    tiny = image.resize((PLACEHOLDER_WIDTH, tiny_height), Image.BILINEAR)
+    # превью встраивается как data URI и не требует отдельного запроса
+    placeholder = "data:image/webp;base64," + base64.b64encode(_encode(tiny, "webp", 30)).decode("ascii")
+    return ProcessedImage(format=fmt, variants=variants, placeholder=placeholder)
+
+
+class ImageProcessor:
+    """Обработка загруженных фото в отдельном пуле потоков, вне event loop."""
+
+    def __init__(
+        self,
+        base_dir: Path,
+        fmt: str = "webp",
+        widths: Sequence[int] = (320, 640, 1280),
+        quality: int = 80,
+        workers: int = 2,
+    ):
+        self.base_dir = base_dir
+        self.fmt = fmt
+        self.widths = tuple(widths)
+        self.quality = quality
+        self.workers = workers
+        self._executor: ThreadPoolExecutor | None = None
+
+    def _pool(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="images")
+        return self._executor
+
+    async def process(self, rel_path: str) -> Dict[str, Any]:
+        source = self.base_dir / rel_path
+        if not source.is_file():
+            return {"image_variants": None, "image_placeholder": None}
+        loop = asyncio.get_running_loop()
+        processed = await loop.run_in_executor(
+            self._pool(), build_variants, source, self.base_dir, self.fmt, self.widths, self.quality
+        )
+        if processed is None:
+            return {"image_variants": None, "image_placeholder": None}
+        return processed.to_columns()
@@ -0,0 +1,378 @@
+from __future__ import annotations
+
+import bisect
+import logging
+import threading
+import time
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, Iterator, List, Sequence, Tuple, TypeVar
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+logger = logging.getLogger(__name__)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+# метка operation для запросов БД; остальные команды считаются как OTHER
+SQL_OPERATIONS = {"SELECT", "INSERT", "UPDATE", "DELETE", "WITH", "PRAGMA", "CREATE", "ALTER", "DROP"}
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _number(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+class _Metric(ABC):
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, Any]) -> Tuple[str, ...]:
+        return tuple(str(labels.get(name, "")) for name in self.labelnames)
+
+    @abstractmethod
+    def samples(self) -> List[str]: ...
+
+    def render(self) -> List[str]:
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}", *self.samples()]
+
+
+class _Value(_Metric):
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1.0, **labels: Any) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            items = sorted(self._values.items())
+        return [f"{self.name}{_labels(self.labelnames, key)} {_number(value)}" for key, value in items]
+
+
+class Counter(_Value):
+    kind = "counter"
+
+
+class Gauge(_Value):
+    kind = "gauge"
+
+    def dec(self, amount: float = 1.0, **labels: Any) -> None:
+        self.inc(-amount, **labels)
+
+    def set(self, value: float, **labels: Any) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = LATENCY_BUCKETS,
+    ):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # на серию: счётчики по корзинам, затем сумма и число наблюдений
+        self._series: Dict[Tuple[str, ...], List[float]] = {}
+
+    def observe(self, value: float, **labels: Any) -> None:
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [0.0] * (len(self.buckets) + 2)
+            if index < len(self.buckets):
+                series[index] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    def _bucket(self, key: Tuple[str, ...], bound: str, count: float) -> str:
+        le = f'le="{bound}"'
+        return f"{self.name}_bucket{_labels(self.labelnames, key, le)} {_number(count)}"
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            items = sorted((key, list(series)) for key, series in self._series.items())
+        lines = []
+        for key, series in items:
+            cumulative = 0.0
+            for bound, count in zip(self.buckets, series):
+                cumulative += count
+                lines.append(self._bucket(key, _number(bound), cumulative))
+            lines.append(self._bucket(key, "+Inf", series[-1]))
+            lines.append(f"{self.name}_sum{_labels(self.labelnames, key)} {_number(series[-2])}")
+            lines.append(f"{self.name}_count{_labels(self.labelnames, key)} {_number(series[-1])}")
+        return lines
+
+
+M = TypeVar("M", bound=_Metric)
+
+
+class Registry:
+    """Метрики процесса в текстовом формате Prometheus (без внешних зависимостей)."""
+
+    def __init__(self) -> None:
+        self._metrics: Dict[str, _Metric] = {}
+
+    def register(self, metric: M) -> M:
+        self._metrics[metric.name] = metric
+        return metric
+
+    def render(self) -> bytes:
+        lines: List[str] = []
+        for metric in self._metrics.values():
+            lines.extend(metric.render())
+        return ("\n".join(lines) + "\n").encode("utf-8")
+
+
+REGISTRY = Registry()
+
+REQUESTS = REGISTRY.register(
+    Counter("http_requests_total", "HTTP-запросы по методу, шаблону маршрута и статусу.", ("method", "route", "status"))
+)
+REQUEST_DURATION = REGISTRY.register(
+    Histogram("http_request_duration_seconds", "Время до начала ответа, секунд.", ("method", "route"))
+)
+REQUESTS_IN_PROGRESS = REGISTRY.register(Gauge("http_requests_in_progress", "Запросы в обработке."))
+DB_QUERY_DURATION = REGISTRY.register(
+    Histogram("db_query_duration_seconds", "Время одного запроса к БД, секунд.", ("operation",))
+)
+DB_SLOW_QUERIES = REGISTRY.register(Counter("db_slow_queries_total", "Запросы к БД дольше APP_SLOW_QUERY_MS."))
+DB_QUERIES_PER_REQUEST = REGISTRY.register(
+    Histogram("db_queries_per_request", "Запросов к БД на один HTTP-запрос.", ("route",), buckets=COUNT_BUCKETS)
+)
+DB_TIME_PER_REQUEST = REGISTRY.register(
+    Histogram("db_request_seconds", "Суммарное время запросов к БД на один HTTP-запрос, секунд.", ("route",))
+)
+TEMPLATE_RENDER = REGISTRY.register(
+    Histogram("template_render_seconds", "Время рендеринга шаблона, секунд.", ("template",))
+)
+JSON_SERIALIZE = REGISTRY.register(
+    Histogram("json_serialize_seconds", "Время сериализации JSON, секунд.", ("kind",))
+)
+CACHE_LOOKUPS = REGISTRY.register(
+    Counter("cache_lookups_total", "Обращения к кэшам процесса: hit или miss.", ("cache", "result"))
+)
+UPLOADS = REGISTRY.register(Counter("uploads_total", "Загруженные изображения по результату.", ("result",)))
+UPLOAD_BYTES = REGISTRY.register(Counter("upload_bytes_total", "Принято байт загруженных изображений."))
+RATE_LIMITED = REGISTRY.register(
+    Counter("rate_limited_total", "Отклонённые записи: rate — лимит на клиента, concurrency — общий лимит.", ("reason",))
+)
+STARTUP = REGISTRY.register(Gauge("app_startup_seconds", "Время фаз запуска приложения, секунд.", ("phase",)))
+
+
+class RequestTimings:
+    """Время запроса по фазам (db, render, serialize): число замеров и сумма секунд."""
+
+    __slots__ = ("phases",)
+
+    def __init__(self) -> None:
+        self.phases: Dict[str, List[float]] = {}
+
+    def add(self, phase: str, seconds: float) -> None:
+        entry = self.phases.setdefault(phase, [0, 0.0])
+        entry[0] += 1
+        entry[1] += seconds
+
+    def count(self, phase: str) -> int:
+        return int(self.phases.get(phase, (0, 0.0))[0])
+
+    def seconds(self, phase: str) -> float:
+        return self.phases.get(phase, (0, 0.0))[1]
+
+    def server_timing(self, total: float) -> str:
+        parts = []
+        for phase, (count, seconds) in self.phases.items():
+            entry = f"{phase};dur={seconds * 1000:.2f}"
+            if phase == "db":
+                entry += f';desc="{int(count)} queries"'
+            parts.append(entry)
+        parts.append(f"app;dur={total * 1000:.2f}")
+        return ", ".join(parts)
+
+
+# замеры текущего запроса; threadpool и run_sync наследуют контекст, поэтому видят тот же объект
+_timings: ContextVar[RequestTimings | None] = ContextVar("request_timings", default=None)
+
+
+def record(phase: str, seconds: float) -> None:
+    timings = _timings.get()
+    if timings is not None:
+        timings.add(phase, seconds)
+
+
+@contextmanager
+def timed(phase: str, histogram: Histogram | None = None, **labels: Any) -> Iterator[None]:
+    """Засчитывает время блока в фазу текущего запроса и, если задана, в гистограмму."""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - started
+        record(phase, elapsed)
+        if histogram is not None:
+            histogram.observe(elapsed, **labels)
+
+
+class StartupTimer:
+    """Разбивка времени запуска по фазам: пишется в лог и в метрику app_startup_seconds."""
+
+    def __init__(self) -> None:
+        self.phases: Dict[str, float] = {}
+
+    def add(self, phase: str, seconds: float) -> None:
+        self.phases[phase] = self.phases.get(phase, 0.0) + seconds
+
+    @contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, time.perf_counter() - started)
+
+    def report(self) -> None:
+        for phase, seconds in self.phases.items():
+            STARTUP.set(seconds, phase=phase)
+        logger.info(
+            "Запуск приложения: %s", ", ".join(f"{phase} {seconds * 1000:.1f} мс" for phase, seconds in self.phases.items())
+        )
+
+
+_slow_query_seconds: float | None = None
+
+
+def _operation(statement: str) -> str:
+    head = statement.lstrip()[:10].split(None, 1)
+    operation = head[0].upper() if head else ""
+    return operation if operation in SQL_OPERATIONS else "OTHER"
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):  # type: ignore[no-untyped-def]
+    conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):  # type: ignore[no-untyped-def]
+    started = conn.info["query_started"].pop()
+    elapsed = time.perf_counter() - started
+    record("db", elapsed)
+    DB_QUERY_DURATION.observe(elapsed, operation=_operation(statement))
+    if _slow_query_seconds is not None and elapsed >= _slow_query_seconds:
+        DB_SLOW_QUERIES.inc()
+        logger.warning("Медленный запрос к БД (%.1f мс): %s", elapsed * 1000, " ".join(statement.split())[:500])
+
+
+def _handle_error(context):  # type: ignore[no-untyped-def]
+    # запрос упал — after_cursor_execute не придёт, снимаем отметку начала
+    if context.connection is not None and context.connection.info.get("query_started"):
+        context.connection.info["query_started"].pop()
+
+
+def instrument_engine(engine: Engine, slow_query_ms: float = 0.0) -> None:
+    """Считает число и время запросов движка; запросы дольше `slow_query_ms` пишет в лог.
+
+    Повторный вызов для того же движка только меняет порог.
+    """
+    global _slow_query_seconds
+    _slow_query_seconds = slow_query_ms / 1000 if slow_query_ms > 0 else None
+    if event.contains(engine, "before_cursor_execute", _before_cursor_execute):
+        return
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+    event.listen(engine, "handle_error", _handle_error)
+
+
+def route_label(scope: Scope, root_path: str = "") -> str:
+    """Шаблон маршрута (`/api/wishlist/{item_id}`), а не сам путь, чтобы число серий было ограничено."""
+    route = scope.get("route")
+    if route is not None:
+        return getattr(route, "path", "unmatched")
+    # Mount (статика) не кладёт route в scope, но дописывает свой префикс в root_path
+    mounted = scope.get("root_path", "")
+    if mounted != root_path and mounted.startswith(root_path):
+        return mounted[len(root_path) :] + "/{path}"
+    return "unmatched"
+
+
+class MetricsMiddleware:
+    """Считает запросы и их длительность по маршрутам; в режиме отладки добавляет `Server-Timing`.
+
+    Время меряется до начала ответа: у потоков (SSE, выгрузки) длительность
+    соединения не говорит о скорости обработчика.
+    """
+
+    def __init__(self, app: ASGIApp, collect: bool = True, server_timing: bool = False):
+        self.app = app
+        self.collect = collect
+        self.server_timing = server_timing
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        timings = RequestTimings()
+        token = _timings.set(timings)
+        root_path = scope.get("root_path", "")
+        started = time.perf_counter()
+        responded = False
+
+        async def wrapped_send(message: Message) -> None:
+            nonlocal responded
+            if message["type"] == "http.response.start" and not responded:
+                responded = True
+                elapsed = time.perf_counter() - started
+                self._observe(scope, root_path, message["status"], elapsed, timings)
+                if self.server_timing:
+                    MutableHeaders(scope=message).append("Server-Timing", timings.server_timing(elapsed))
+            await send(message)
+
+        REQUESTS_IN_PROGRESS.inc()
+        try:
+            await self.app(scope, receive, wrapped_send)
+        except Exception:
+            if not responded:
+                self._observe(scope, root_path, 500, time.perf_counter() - started, timings)
+            raise
+        finally:
+            REQUESTS_IN_PROGRESS.dec()
+            _timings.reset(token)
+
+    def _observe(self, scope: Scope, root_path: str, status: int, elapsed: float, timings: RequestTimings) -> None:
+        if not self.collect:
+            return
+        method = scope["method"]
+        route = route_label(scope, root_path)
+        REQUESTS.inc(method=method, route=route, status=status)
+        REQUEST_DURATION.observe(elapsed, method=method, route=route)
+        DB_QUERIES_PER_REQUEST.observe(timings.count("db"), route=route)
+        DB_TIME_PER_REQUEST.observe(timings.seconds("db"), route=route)
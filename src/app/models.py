@@ -7,7 +7,7 @@ from sqlmodel import Field, SQLModel
 
 
 class Timestamped(SQLModel):
-    created_at: datetime = Field(default_factory=datetime.utcnow)
+    created_at: datetime = Field(default_factory=datetime.utcnow, index=True)
     updated_at: datetime | None = None
 
     def touch(self) -> None:
@@ -21,23 +21,34 @@ class WishItemBase(SQLModel):
     price: str | None = Field(default=None)
 
 
-class WishItem(WishItemBase, SQLModel, table=True):
+class WishItem(WishItemBase, Timestamped, table=True):
     id: Optional[int] = Field(default=None, primary_key=True)
     reserved_by: str | None = Field(default=None)
     reserved_contact: str | None = Field(default=None)
     reserved_note: str | None = Field(default=None)
     reserved_at: datetime | None = Field(default=None)
-    created_at: datetime = Field(default_factory=datetime.utcnow)
+    reservation_key: str | None = Field(default=None, description="Idempotency-Key запроса, сделавшего бронь")
     image_path: str | None = Field(default=None, description="Относительный путь к файлу с изображением")
+    image_variants: str | None = Field(default=None, description="JSON с уменьшенными копиями изображения")
+    image_placeholder: str | None = Field(default=None, description="Крошечное превью в виде data URI")
 
 
 class PostBase(SQLModel):
     title: str
     summary: str
     body: str
-    tags: str | None = Field(default=None, description="CSV список тегов")
 
 
-class Post(PostBase, SQLModel, table=True):
+class Post(PostBase, Timestamped, table=True):
     id: Optional[int] = Field(default=None, primary_key=True)
-    created_at: datetime = Field(default_factory=datetime.utcnow)
+
+
+class Tag(SQLModel, table=True):
+    id: Optional[int] = Field(default=None, primary_key=True)
+    name: str = Field(unique=True, index=True)
+
+
+class PostTag(SQLModel, table=True):
+    post_id: int = Field(foreign_key="post.id", primary_key=True)
+    tag_id: int = Field(foreign_key="tag.id", primary_key=True, index=True)
+    position: int = Field(default=0, description="Порядок тега в посте")
@@ -0,0 +1,105 @@
+from __future__ import annotations
+
+import hmac
+import math
+import threading
+import time
+from collections import OrderedDict
+from typing import Tuple
+
+from starlette.datastructures import Headers
+from starlette.responses import JSONResponse
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from . import metrics
+
+WRITE_METHODS = {"POST", "PUT", "PATCH", "DELETE"}
+
+
+class TokenBucket:
+    """Токены на каждого клиента: `rate` в секунду, не больше `burst` в запасе.
+
+    Клиентов не больше `max_clients`: давно не писавшие вытесняются первыми,
+    так что перебор адресов не раздувает память.
+    """
+
+    def __init__(self, rate: float, burst: int, max_clients: int = 10_000):
+        self.rate = rate
+        self.burst = max(burst, 1)
+        self.max_clients = max(max_clients, 1)
+        self._buckets: OrderedDict[str, Tuple[float, float]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def take(self, key: str, now: float | None = None) -> float:
+        """Списывает токен; 0, если он был, иначе сколько секунд ждать следующего."""
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            tokens, updated = self._buckets.pop(key, (float(self.burst), now))
+            tokens = min(float(self.burst), tokens + (now - updated) * self.rate)
+            if tokens >= 1.0:
+                tokens -= 1.0
+                wait = 0.0
+            else:
+                wait = (1.0 - tokens) / self.rate if self.rate > 0 else math.inf
+            self._buckets[key] = (tokens, now)
+            if len(self._buckets) > self.max_clients:
+                self._buckets.popitem(last=False)
+            return wait
+
+
+class AdmissionMiddleware:
+    """Отсекает лишние записи до маршрутизации, зависимостей и threadpool.
+
+    Запросы на запись (POST/PUT/PATCH/DELETE) списывают токен из корзины адреса
+    клиента — при пустой корзине 429. Одновременных записей не больше
+    `max_concurrent`, лишние сразу получают 503. Оба ответа с `Retry-After`.
+    Чтение не ограничивается. Должен стоять внутри ProxyHeadersMiddleware, чтобы
+    адрес клиента был уже взят из `X-Forwarded-For`.
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        bucket: TokenBucket | None = None,
+        max_concurrent: int = 0,
+        admin_token: str | None = None,
+    ):
+        self.app = app
+        self.bucket = bucket
+        self.max_concurrent = max_concurrent
+        # с верным токеном админ не упирается в лимит на адрес (но в общий — да)
+        self.admin_token = admin_token.encode("utf-8") if admin_token and admin_token != "change-me" else None
+        self.in_flight = 0
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or scope["method"] not in WRITE_METHODS:
+            await self.app(scope, receive, send)
+            return
+        if self.bucket is not None and not self._is_admin(scope):
+            client = scope.get("client")
+            wait = self.bucket.take(client[0] if client else "unknown")
+            if wait > 0:
+                metrics.RATE_LIMITED.inc(reason="rate")
+                await self._reject(scope, receive, send, 429, "Слишком много запросов, повторите позже", wait)
+                return
+        if self.max_concurrent and self.in_flight >= self.max_concurrent:
+            metrics.RATE_LIMITED.inc(reason="concurrency")
+            await self._reject(scope, receive, send, 503, "Сервер перегружен, повторите позже", 1.0)
+            return
+        self.in_flight += 1
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            self.in_flight -= 1
+
+    def _is_admin(self, scope: Scope) -> bool:
+        if self.admin_token is None:
+            return False
+        token = Headers(scope=scope).get("x-admin-token")
+        return token is not None and hmac.compare_digest(token.encode("utf-8"), self.admin_token)
+
+    @staticmethod
+    async def _reject(scope: Scope, receive: Receive, send: Send, status: int, detail: str, wait: float) -> None:
+        retry_after = str(max(1, math.ceil(wait))) if math.isfinite(wait) else "60"
+        response = JSONResponse({"detail": detail}, status_code=status, headers={"Retry-After": retry_after})
+        await response(scope, receive, send)
@@ -1,29 +1,157 @@
 from __future__ import annotations
 
+import atexit
 import json
+import logging
+import threading
+import time
 from pathlib import Path
 from typing import Any, Dict
 
-import yaml
+from .schemas import ResumeDocument
+from .serialization import dumps
+
+logger = logging.getLogger(__name__)
+
+
+def _parse_yaml(payload: bytes) -> Any:
+    # PyYAML импортируется при первом чтении резюме, а не при импорте пакета
+    import yaml
+
+    # libyaml в разы быстрее чистого Python; если PyYAML собран без неё — обычный SafeLoader
+    loader = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+    try:
+        return yaml.load(payload, Loader=loader)
+    except yaml.YAMLError as exc:
+        raise ValueError(str(exc)) from exc
 
 
 class ResumeLoader:
-    def __init__(self, path: Path):
+    """Резюме из YAML/JSON: разобрано и проверено схемой один раз на версию файла.
+
+    Изменения файла замечаются либо наблюдателем (`watch`, нужен пакет watchfiles),
+    либо проверкой mtime не чаще раза в `stat_interval` секунд. Между изменениями
+    `load` не обращается к диску.
+    """
+
+    def __init__(self, path: Path, stat_interval: float = 0.0):
         self.path = path
-        self._cache: Dict[str, Any] | None = None
+        self.stat_interval = stat_interval
+        self._data: Dict[str, Any] = {}
+        self._document = ResumeDocument()
+        self._json = b"{}"
+        self._loaded = False
         self._last_mtime: float | None = None
+        self._checked_at = 0.0
+        self._dirty = True
+        self._lock = threading.Lock()
+        self._watcher: threading.Thread | None = None
+        self._stop = threading.Event()
+        self.version = 0
+
+    @property
+    def mtime(self) -> float | None:
+        return self._last_mtime
+
+    @property
+    def watching(self) -> bool:
+        return self._watcher is not None and self._watcher.is_alive()
+
+    @property
+    def document(self) -> ResumeDocument:
+        self._refresh()
+        return self._document
+
+    @property
+    def json_bytes(self) -> bytes:
+        """Резюме, уже сериализованное в компактный JSON."""
+        self._refresh()
+        return self._json
 
     def load(self) -> Dict[str, Any]:
-        if not self.path.exists():
-            return {}
-        mtime = self.path.stat().st_mtime
-        if self._cache is not None and self._last_mtime == mtime:
-            return self._cache
-        with self.path.open("r", encoding="utf-8") as fh:
-            if self.path.suffix.lower() in {".yaml", ".yml"}:
-                data = yaml.safe_load(fh) or {}
-            else:
-                data = json.load(fh)
-        self._cache = data
+        self._refresh()
+        return self._data
+
+    def _refresh(self) -> None:
+        if self.watching:
+            if not self._dirty:
+                return
+        elif self._loaded and time.monotonic() - self._checked_at < self.stat_interval:
+            return
+        with self._lock:
+            self._dirty = False
+            self._checked_at = time.monotonic()
+            try:
+                mtime: float | None = self.path.stat().st_mtime
+            except OSError:
+                mtime = None
+            if self._loaded and mtime == self._last_mtime:
+                return
+            self._reload(mtime)
+
+    def _reload(self, mtime: float | None) -> None:
+        if mtime is None:
+            raw: Any = {}
+        else:
+            try:
+                payload = self.path.read_bytes()
+                if self.path.suffix.lower() in {".yaml", ".yml"}:
+                    raw = _parse_yaml(payload) or {}
+                else:
+                    raw = json.loads(payload)
+                document = ResumeDocument.model_validate(raw)
+            except (OSError, ValueError) as exc:
+                # ValidationError и ошибки YAML — ValueError; до исправления файла отдаём прошлую версию
+                logger.error("Резюме %s не загружено, используется прошлая версия: %s", self.path, exc)
+                self._last_mtime = mtime
+                if not self._loaded:
+                    self._loaded = True
+                    self.version += 1
+                return
+        if mtime is None:
+            document = ResumeDocument()
+        # exclude_unset: в шаблон попадают только поля из файла, как и раньше
+        data = document.model_dump(mode="json", exclude_unset=True)
+        self._document = document
+        self._data = data
+        self._json = dumps(data)
         self._last_mtime = mtime
-        return data
+        self._loaded = True
+        self.version += 1
+
+    def start_watching(self) -> bool:
+        """Запускает наблюдение за файлом; False, если watchfiles не установлен."""
+        try:
+            import watchfiles
+        except ImportError:
+            logger.warning("Пакет watchfiles не установлен, резюме проверяется по mtime")
+            return False
+        if self.watching:
+            return True
+        self._stop.clear()
+        self._dirty = True
+
+        target = self.path.resolve()
+
+        def run() -> None:
+            # каталог, а не файл: редакторы часто сохраняют через переименование
+            for _ in watchfiles.watch(
+                target.parent,
+                watch_filter=lambda _change, changed: Path(changed).resolve() == target,
+                stop_event=self._stop,
+                recursive=False,
+                debounce=200,
+            ):
+                self._dirty = True
+
+        self._watcher = threading.Thread(target=run, name="resume-watch", daemon=True)
+        self._watcher.start()
+        # поток watchfiles нельзя бросать работающим при завершении интерпретатора
+        atexit.register(self.stop_watching)
+        return True
+
+    def stop_watching(self) -> None:
+        self._stop.set()
+        if self._watcher is not None:
+            self._watcher.join(timeout=2)
+            self._watcher = None
@@ -1,9 +1,9 @@
 from __future__ import annotations
 
 from datetime import datetime
-from typing import List, Optional
+from typing import Dict, List, Optional
 
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, ConfigDict, Field
 
 
 class WishItemCreate(BaseModel):
@@ -14,6 +14,10 @@ class WishItemCreate(BaseModel):
     image_path: str | None = None
 
 
+class WishItemImport(WishItemCreate):
+    created_at: datetime | None = None
+
+
 class WishItemUpdate(BaseModel):
     title: str | None = None
     description: str | None = None
@@ -28,6 +32,11 @@ class WishItemReserve(BaseModel):
     note: str | None = Field(default=None, description="Комментарий к брони")
 
 
+class ImageVariantPublic(BaseModel):
+    url: str
+    width: int
+
+
 class WishItemPublic(BaseModel):
     id: int
     title: str
@@ -40,6 +49,9 @@ class WishItemPublic(BaseModel):
     reserved_note: str | None
     reserved_at: datetime | None
     image_url: str | None
+    image_variants: List[ImageVariantPublic] = Field(default_factory=list)
+    image_srcset: str | None = None
+    image_placeholder: str | None = None
 
 
 class PostCreate(BaseModel):
@@ -49,6 +61,10 @@ class PostCreate(BaseModel):
     tags: List[str] = Field(default_factory=list)
 
 
+class PostImport(PostCreate):
+    created_at: datetime | None = None
+
+
 class PostUpdate(BaseModel):
     title: str | None = None
     summary: str | None = None
@@ -63,3 +79,66 @@ class PostPublic(BaseModel):
     body: str
     tags: List[str]
     created_at: datetime
+
+
+class ResumeSection(BaseModel):
+    """Основа схемы резюме: лишние поля сохраняются, числа принимаются как строки."""
+
+    model_config = ConfigDict(extra="allow", coerce_numbers_to_str=True)
+
+
+class ResumeLanguage(ResumeSection):
+    name: str
+    level: str | None = None
+
+
+class ResumePerson(ResumeSection):
+    name: str | None = None
+    title: str | None = None
+    location: str | None = None
+    photo: str | None = None
+    open_to_projects: bool | None = None
+
+
+class ResumeContacts(ResumeSection):
+    phone: str | None = None
+    email: str | None = None
+    github: str | None = None
+    languages: List[ResumeLanguage] = Field(default_factory=list)
+
+
+class ResumeExperience(ResumeSection):
+    company: str | None = None
+    role: str | None = None
+    period: str | None = None
+    location: str | None = None
+    focus: str | None = None
+
+
+class ResumeEducation(ResumeSection):
+    place: str | None = None
+    program: str | None = None
+    period: str | None = None
+
+
+class ResumeProject(ResumeSection):
+    name: str
+    stack: List[str] = Field(default_factory=list)
+    summary: str | None = None
+
+
+class ResumeAchievement(ResumeSection):
+    title: str
+    detail: str | None = None
+
+
+class ResumeDocument(ResumeSection):
+    person: ResumePerson = Field(default_factory=ResumePerson)
+    contacts: ResumeContacts = Field(default_factory=ResumeContacts)
+    summary: str | None = None
+    skills: Dict[str, List[str]] = Field(default_factory=dict)
+    interests: List[str] = Field(default_factory=list)
+    experience: List[ResumeExperience] = Field(default_factory=list)
+    education: List[ResumeEducation] = Field(default_factory=list)
+    projects: List[ResumeProject] = Field(default_factory=list)
+    achievements: List[ResumeAchievement] = Field(default_factory=list)
@@ -0,0 +1,164 @@
+from __future__ import annotations
+
+import html
+import re
+from typing import Any, Dict, List, Sequence
+
+from sqlalchemy import inspect, text
+from sqlalchemy.exc import OperationalError
+from sqlmodel import Session
+
+from .models import Post, WishItem
+
+SEARCH_TABLE = "search_index"
+# маркеры подсветки заменяются на <mark> уже после экранирования HTML
+_OPEN, _CLOSE = "\x02", "\x03"
+_TOKEN = re.compile(r"\w+", re.UNICODE)
+
+enabled = False
+
+
+def ensure_search_index(engine: Any) -> bool:
+    """Создаёт FTS5-таблицу поиска и наполняет её, если она рассинхронизирована с данными."""
+    global enabled
+    if engine.dialect.name != "sqlite":
+        enabled = False
+        return False
+    try:
+        with engine.begin() as conn:
+            conn.execute(
+                text(
+                    f"CREATE VIRTUAL TABLE IF NOT EXISTS {SEARCH_TABLE} USING fts5("
+                    "kind UNINDEXED, ref_id UNINDEXED, title, summary, body, tags, "
+                    "tokenize='unicode61 remove_diacritics 2')"
+                )
+            )
+            indexed = conn.execute(text(f"SELECT count(*) FROM {SEARCH_TABLE}")).scalar_one()
+            total = conn.execute(
+                text("SELECT (SELECT count(*) FROM post) + (SELECT count(*) FROM wishitem)")
+            ).scalar_one()
+            if indexed != total:
+                _rebuild(conn)
+    except OperationalError:
+        # SQLite собран без FTS5
+        enabled = False
+        return False
+    enabled = True
+    return True
+
+
+def detect_search_index(engine: Any) -> bool:
+    """Включает поиск, если таблица уже создана: воркеры не пересобирают индекс сами."""
+    global enabled
+    enabled = engine.dialect.name == "sqlite" and inspect(engine).has_table(SEARCH_TABLE)
+    return enabled
+
+
+def _rebuild(conn: Any) -> None:
+    conn.execute(text(f"DELETE FROM {SEARCH_TABLE}"))
+    conn.execute(
+        text(
+            f"INSERT INTO {SEARCH_TABLE} (kind, ref_id, title, summary, body, tags) "
+            "SELECT 'post', id, title, summary, body, coalesce(("
+            "SELECT group_concat(tag.name, ' ') FROM posttag JOIN tag ON tag.id = posttag.tag_id "
+            "WHERE posttag.post_id = post.id), '') FROM post"
+        )
+    )
+    conn.execute(
+        text(
+            f"INSERT INTO {SEARCH_TABLE} (kind, ref_id, title, summary, body, tags) "
+            "SELECT 'wish', id, title, coalesce(description, ''), '', '' FROM wishitem"
+        )
+    )
+
+
+def remove(session: Session, kind: str, ref_id: int) -> None:
+    if not enabled:
+        return
+    session.exec(
+        text(f"DELETE FROM {SEARCH_TABLE} WHERE kind = :kind AND ref_id = :ref_id"),  # type: ignore[call-overload]
+        params={"kind": kind, "ref_id": ref_id},
+    )
+
+
+def _put(session: Session, kind: str, ref_id: int, title: str, summary: str, body: str, tags: str) -> None:
+    remove(session, kind, ref_id)
+    session.exec(
+        text(  # type: ignore[call-overload]
+            f"INSERT INTO {SEARCH_TABLE} (kind, ref_id, title, summary, body, tags) "
+            "VALUES (:kind, :ref_id, :title, :summary, :body, :tags)"
+        ),
+        params={"kind": kind, "ref_id": ref_id, "title": title, "summary": summary, "body": body, "tags": tags},
+    )
+
+
+def index_many(session: Session, kind: str, rows: Sequence[Dict[str, Any]]) -> None:
+    """Индексирует только что вставленные записи одним executemany (без удаления старых строк)."""
+    if not enabled or not rows:
+        return
+    session.exec(
+        text(  # type: ignore[call-overload]
+            f"INSERT INTO {SEARCH_TABLE} (kind, ref_id, title, summary, body, tags) "
+            "VALUES (:kind, :ref_id, :title, :summary, :body, :tags)"
+        ),
+        params=[{"kind": kind, **row} for row in rows],
+    )
+
+
+def index_post(session: Session, post: Post, tags: Sequence[str] = ()) -> None:
+    if not enabled or post.id is None:
+        return
+    _put(session, "post", post.id, post.title, post.summary, post.body, " ".join(tags))
+
+
+def index_wish(session: Session, item: WishItem) -> None:
+    if not enabled or item.id is None:
+        return
+    _put(session, "wish", item.id, item.title, item.description or "", "", "")
+
+
+def match_expression(query: str) -> str | None:
+    """Превращает пользовательский ввод в безопасное выражение MATCH: все слова, последнее — по префиксу."""
+    tokens = _TOKEN.findall(query)
+    if not tokens:
+        return None
+    quoted = [f'"{t}"' for t in tokens]
+    quoted[-1] += "*"
+    return " ".join(quoted)
+
+
+def _marked(value: str) -> str:
+    return html.escape(value).replace(_OPEN, "<mark>").replace(_CLOSE, "</mark>")
+
+
+def search(session: Session, query: str, kind: str | None, limit: int, offset: int) -> Dict[str, Any]:
+    expression = match_expression(query)
+    if expression is None:
+        return {"items": [], "next_offset": None}
+    where = f"{SEARCH_TABLE} MATCH :query"
+    params: Dict[str, Any] = {"query": expression, "limit": limit + 1, "offset": offset}
+    if kind:
+        where += " AND kind = :kind"
+        params["kind"] = kind
+    rows = session.exec(
+        text(  # type: ignore[call-overload]
+            f"SELECT kind, ref_id, "
+            f"highlight({SEARCH_TABLE}, 2, '{_OPEN}', '{_CLOSE}') AS title, "
+            f"snippet({SEARCH_TABLE}, -1, '{_OPEN}', '{_CLOSE}', '…', 16) AS snippet, "
+            f"bm25({SEARCH_TABLE}, 0, 0, 10.0, 4.0, 1.0, 6.0) AS score "
+            f"FROM {SEARCH_TABLE} WHERE {where} ORDER BY score LIMIT :limit OFFSET :offset"
+        ),
+        params=params,
+    ).all()
+    items: List[Dict[str, Any]] = [
+        {
+            "kind": row.kind,
+            "id": row.ref_id,
+            "title": _marked(row.title),
+            "snippet": _marked(row.snippet),
+            "score": row.score,
+        }
+        for row in rows[:limit]
+    ]
+    next_offset = offset + limit if len(rows) > limit else None
+    return {"items": items, "next_offset": next_offset}
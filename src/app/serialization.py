@@ -0,0 +1,55 @@
+from __future__ import annotations
+
+import json
+from datetime import date, datetime
+from typing import Any
+
+from pydantic import BaseModel
+from starlette.responses import JSONResponse
+
+from . import metrics
+
+try:  # orjson — необязательная зависимость (extra `json`)
+    import orjson
+except ImportError:  # pragma: no cover - зависит от окружения
+    orjson = None
+
+
+def _default(value: Any) -> Any:
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, BaseModel):
+        return value.model_dump(mode="json")
+    if isinstance(value, (set, frozenset, tuple)):
+        return list(value)
+    raise TypeError(f"Не сериализуется в JSON: {type(value).__name__}")
+
+
+def dumps(value: Any) -> bytes:
+    """Компактный JSON в UTF-8. datetime пишутся в ISO 8601, pydantic-модели — как model_dump.
+
+    С orjson — за один проход без промежуточных структур; без него — стандартный json.
+    """
+    if orjson is not None:
+        return orjson.dumps(value, default=_default)
+    return json.dumps(value, ensure_ascii=False, separators=(",", ":"), default=_default).encode("utf-8")
+
+
+def loads(data: bytes | str) -> Any:
+    return orjson.loads(data) if orjson is not None else json.loads(data)
+
+
+def script_json(data: bytes) -> str:
+    """JSON для `<script type="application/json">`: `<` экранирован, чтобы `</script>` в данных не закрыл тег."""
+    return data.replace(b"<", b"\\u003c").decode("utf-8")
+
+
+class JSONBytesResponse(JSONResponse):
+    """JSON-ответ через `dumps`; время кодирования попадает в метрики.
+
+    Обработчик, вернувший такой ответ сам, минует и `jsonable_encoder` FastAPI.
+    """
+
+    def render(self, content: Any) -> bytes:
+        with metrics.timed("serialize", metrics.JSON_SERIALIZE, kind="response"):
+            return dumps(content)
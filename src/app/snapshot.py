@@ -0,0 +1,129 @@
+from __future__ import annotations
+
+import threading
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, Hashable, Tuple, TypeVar
+
+from . import metrics
+from .generation import SharedGeneration
+from .resume_loader import ResumeLoader
+from .serialization import dumps, script_json
+
+T = TypeVar("T")
+
+
+@dataclass(frozen=True)
+class PageSnapshot:
+    """Готовое состояние страницы: исходные данные и уже сериализованный JSON."""
+
+    state: Dict[str, Any]
+    body: bytes
+    initial_json: str
+
+    @classmethod
+    def from_state(cls, state: Dict[str, Any], prepared: Dict[str, bytes] | None = None) -> "PageSnapshot":
+        """`prepared` — ключи состояния, уже сериализованные в JSON (и уже JSON-совместимые)."""
+        prepared = prepared or {}
+        with metrics.timed("serialize", metrics.JSON_SERIALIZE, kind="snapshot"):
+            parts = [
+                dumps(key) + b":" + (prepared[key] if key in prepared else dumps(value)) for key, value in state.items()
+            ]
+            body = b"{" + b",".join(parts) + b"}"
+            # тот же компактный JSON идёт в <script> страницы, без второго прохода с отступами
+            initial_json = script_json(body)
+        return cls(state=state, body=body, initial_json=initial_json)
+
+
+class SnapshotCache:
+    """Кэш срезов данных в памяти процесса, привязанный к поколению данных.
+
+    Поколение увеличивается при каждой записи (`bump`) и при изменении файла
+    резюме, после чего все срезы пересобираются при первом обращении. С `shared`
+    записи в других воркерах тоже сбрасывают кэш этого процесса.
+    """
+
+    def __init__(self, resume_loader: ResumeLoader, shared: SharedGeneration | None = None):
+        self._resume_loader = resume_loader
+        self._resume_version: int | None = None
+        self._shared = shared
+        self._shared_seen = shared.value if shared is not None else 0
+        self._entries: Dict[Hashable, Any] = {}
+        self._lock = threading.Lock()
+        self.generation = 0
+        self.hits = 0
+        self.misses = 0
+        self.rebuilds = 0
+
+    def bump(self) -> int:
+        with self._lock:
+            self.generation += 1
+            self._entries.clear()
+            if self._shared is not None:
+                self._shared_seen = self._shared.bump()
+            return self.generation
+
+    def _sync_sources(self) -> None:
+        if self._shared is not None and self._shared.value != self._shared_seen:
+            with self._lock:
+                shared = self._shared.value
+                if shared != self._shared_seen:
+                    self._shared_seen = shared
+                    self.generation += 1
+                    self._entries.clear()
+        self._resume_loader.load()
+        version = self._resume_loader.version
+        if version != self._resume_version:
+            with self._lock:
+                if version != self._resume_version:
+                    self._resume_version = version
+                    self.generation += 1
+                    self._entries.clear()
+
+    def _lookup(self, key: Hashable) -> Tuple[bool, Any, int]:
+        with self._lock:
+            found = key in self._entries
+            if found:
+                self.hits += 1
+            else:
+                self.misses += 1
+            value = self._entries.get(key)
+            generation = self.generation
+        metrics.CACHE_LOOKUPS.inc(cache="snapshot", result="hit" if found else "miss")
+        return found, value, generation
+
+    def _store(self, key: Hashable, value: Any, generation: int) -> None:
+        with self._lock:
+            self.rebuilds += 1
+            # срез, собранный до очередной записи, уже устарел — не сохраняем
+            if self.generation == generation:
+                self._entries[key] = value
+
+    def peek(self, key: Hashable) -> Any | None:
+        """Готовое значение без сборки; None, если его нет в текущем поколении."""
+        self._sync_sources()
+        with self._lock:
+            value = self._entries.get(key)
+            if value is not None:
+                self.hits += 1
+        if value is not None:
+            metrics.CACHE_LOOKUPS.inc(cache="snapshot", result="hit")
+        return value
+
+    async def get(self, key: Hashable, build: Callable[[], Awaitable[T]]) -> T:
+        self._sync_sources()
+        found, value, generation = self._lookup(key)
+        if found:
+            return value
+        value = await build()
+        self._store(key, value, generation)
+        return value
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "generation": self.generation,
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "rebuilds": self.rebuilds,
+            }
@@ -30,15 +30,19 @@ document.addEventListener("DOMContentLoaded", () => {
     adminTokenInput.value = adminToken;
   }
 
-  const initialState = stateEl ? JSON.parse(stateEl.textContent) : { wishlist: [], posts: [] };
+  const initialState = stateEl ? JSON.parse(stateEl.textContent) : {};
+  // в страницу встроена только первая страница данных; остальное догружается из API
   const state = {
     wishlist: initialState.wishlist || [],
+    wishlistCursor: initialState.wishlist_cursor || null,
     posts: initialState.posts || [],
+    postsCursor: initialState.posts_cursor || null,
     filter: "all",
   };
+  const POST_SUMMARY_FIELDS = "id,title,summary,tags,created_at";
 
-  const api = async (path, { method = "GET", body, admin = false } = {}) => {
-    const headers = {};
+  const api = async (path, { method = "GET", body, admin = false, extraHeaders = {} } = {}) => {
+    const headers = { ...extraHeaders };
     adminToken = adminTokenInput?.value || adminToken || "";
     if (admin && adminToken) {
       headers["X-Admin-Token"] = adminToken;
@@ -68,6 +72,17 @@ document.addEventListener("DOMContentLoaded", () => {
     return response.json();
   };
 
+  const reserveKeys = new Map();
+
+  const wishCover = (item) => {
+    if (!item.image_url) return "";
+    const variants = item.image_variants || [];
+    const src = variants.length ? variants[Math.min(1, variants.length - 1)].url : item.image_url;
+    const srcset = item.image_srcset ? ` srcset="${item.image_srcset}" sizes="(max-width: 720px) 100vw, 50vw"` : "";
+    const placeholder = item.image_placeholder ? ` style="background-image:url('${item.image_placeholder}')"` : "";
+    return `<img class="wish-cover" src="${src}"${srcset}${placeholder} alt="" loading="lazy" decoding="async">`;
+  };
+
   const filteredWishlist = () => {
     const filter = state.filter || "all";
     if (filter === "free") return state.wishlist.filter((w) => !w.reserved);
@@ -107,7 +122,7 @@ document.addEventListener("DOMContentLoaded", () => {
           : "";
         return `
         <div class="card wish-card" data-id="${item.id}">
-          ${item.image_url ? `<div class="wish-cover" style="background-image:url('${item.image_url}')"></div>` : ""}
+          ${wishCover(item)}
           <div class="badge ${reserved ? "busy" : "free"}">${reserved ? "Забронировано" : "Свободно"}</div>
           <div class="card-title">${item.title}</div>
           ${item.price ? `<p class="muted">Ориентир: ${item.price}</p>` : ""}
@@ -162,13 +177,18 @@ document.addEventListener("DOMContentLoaded", () => {
       postsGrid.innerHTML = `<div class="card"><div class="card-title">Нет записей</div><p class="muted">Добавьте первую заметку в админке.</p></div>`;
       return;
     }
-    postsGrid.innerHTML = state.posts
-      .map(
-        (post) => `
+    postsGrid.innerHTML =
+      state.posts
+        .map(
+          (post) => `
       <div class="card">
         <div class="card-title">${post.title}</div>
         <p class="muted">${post.summary}</p>
-        <p>${post.body}</p>
+        ${
+          post.body !== undefined
+            ? `<p>${post.body}</p>`
+            : `<button class="button ghost" data-action="read" data-id="${post.id}">Читать</button>`
+        }
         ${
           post.tags?.length
             ? `<div>${post.tags.map((t) => `<span class="tag">${t}</span>`).join("")}</div>`
@@ -176,17 +196,44 @@ document.addEventListener("DOMContentLoaded", () => {
         }
       </div>
     `,
-      )
-      .join("");
+        )
+        .join("") +
+      (state.postsCursor ? `<button class="button ghost full" data-action="more">Показать ещё</button>` : "");
+  };
+
+  // страница списка с курсором; на странице вишлиста — все страницы подряд
+  const loadWishlist = async () => {
+    if (wishlistGridPage) {
+      const items = [];
+      let cursor = "";
+      do {
+        const data = await api(`/api/wishlist${cursor ? `?cursor=${encodeURIComponent(cursor)}` : ""}`);
+        items.push(...data.items);
+        cursor = data.next_cursor;
+      } while (cursor);
+      state.wishlist = items;
+    } else if (wishlistGridHome) {
+      // без параметров: этот адрес есть и в статической выгрузке; превью обрезается при отрисовке
+      const data = await api("/api/wishlist");
+      state.wishlist = data.items;
+    }
+    state.wishlistCursor = null;
+    renderWishlist();
+  };
+
+  const loadPosts = async (cursor = "") => {
+    if (!postsGrid) return;
+    const data = await api(
+      `/api/posts?fields=${POST_SUMMARY_FIELDS}${cursor ? `&cursor=${encodeURIComponent(cursor)}` : ""}`,
+    );
+    state.posts = cursor ? state.posts.concat(data.items) : data.items;
+    state.postsCursor = data.next_cursor;
+    renderPosts();
   };
 
   const refreshAll = async () => {
     try {
-      const data = await api("/api/resume");
-      state.wishlist = data.wishlist || [];
-      state.posts = data.posts || [];
-      renderWishlist();
-      renderPosts();
+      await Promise.all([loadWishlist(), loadPosts()]);
     } catch (err) {
       toast(err.message || "Не удалось обновить данные", "error");
     }
@@ -299,7 +346,14 @@ document.addEventListener("DOMContentLoaded", () => {
         return;
       }
       try {
-        const { item } = await api(`/api/wishlist/${id}/reserve`, { method: "POST", body: payload });
+        // ключ живёт до успешного ответа: повторное нажатие после обрыва связи не даст 409
+        if (!reserveKeys.has(id)) reserveKeys.set(id, crypto.randomUUID?.() || `${Date.now()}-${Math.random()}`);
+        const { item } = await api(`/api/wishlist/${id}/reserve`, {
+          method: "POST",
+          body: payload,
+          extraHeaders: { "Idempotency-Key": reserveKeys.get(id) },
+        });
+        reserveKeys.delete(id);
         const idx = state.wishlist.findIndex((w) => w.id === item.id);
         if (idx >= 0) state.wishlist[idx] = item;
         renderWishlist();
@@ -369,8 +423,59 @@ document.addEventListener("DOMContentLoaded", () => {
     wishlistGridPage.addEventListener("click", (e) => wishClickHandler(wishlistGridPage, e));
   }
 
-  renderWishlist();
+  if (postsGrid) {
+    postsGrid.addEventListener("click", async (e) => {
+      const target = e.target.closest("[data-action]");
+      if (!target) return;
+      try {
+        if (target.dataset.action === "more") {
+          target.disabled = true;
+          await loadPosts(state.postsCursor);
+        }
+        if (target.dataset.action === "read") {
+          const post = await api(`/api/posts/${target.dataset.id}`);
+          const idx = state.posts.findIndex((p) => p.id === post.id);
+          if (idx >= 0) state.posts[idx] = post;
+          renderPosts();
+        }
+      } catch (err) {
+        toast(err.message || "Не удалось загрузить посты", "error");
+      }
+    });
+  }
+
+  const applyWish = (item) => {
+    const idx = state.wishlist.findIndex((w) => w.id === item.id);
+    if (idx >= 0) state.wishlist[idx] = item;
+    else state.wishlist.unshift(item);
+    renderWishlist();
+  };
+
+  // изменения вишлиста приходят через поток событий, без перечитывания списка
+  const subscribeWishlist = () => {
+    if (!window.EventSource || !(wishlistGridHome || wishlistGridPage)) return false;
+    const source = new EventSource("/api/wishlist/stream");
+    source.addEventListener("upsert", (e) => applyWish(JSON.parse(e.data)));
+    source.addEventListener("delete", (e) => {
+      const { id } = JSON.parse(e.data);
+      state.wishlist = state.wishlist.filter((w) => w.id !== id);
+      renderWishlist();
+    });
+    // поток касается только вишлиста: заметки по reset не перечитываем
+    source.addEventListener("reset", () =>
+      loadWishlist().catch((err) => toast(err.message || "Не удалось обновить вишлист", "error")),
+    );
+    return true;
+  };
+
+  // на главной вишлиста во встроенном состоянии нет, на странице вишлиста — только первая страница
+  const wishlistPending = (wishlistGridHome && !initialState.wishlist) || state.wishlistCursor;
+  if (initialState.wishlist) renderWishlist();
   renderPosts();
+  if (wishlistPending) {
+    loadWishlist().catch((err) => toast(err.message || "Не удалось загрузить вишлист", "error"));
+  }
+  const streaming = subscribeWishlist();
   // периодическая подгрузка чтобы видеть новые брони/посты без перезапуска
-  setInterval(() => refreshAll(), 60000);
+  setInterval(() => refreshAll(), streaming ? 300000 : 60000);
 });
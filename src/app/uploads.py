@@ -0,0 +1,101 @@
+from __future__ import annotations
+
+import hashlib
+import os
+import re
+import secrets
+from pathlib import Path
+from typing import BinaryIO, Iterable, Tuple
+
+from fastapi import HTTPException, UploadFile, status
+from starlette.concurrency import run_in_threadpool
+
+from . import metrics
+
+CHUNK_SIZE = 1024 * 1024
+HASH_LENGTH = 32
+# имена файлов с адресацией по содержимому: хэш, у уменьшенных копий ещё и ширина
+CONTENT_ADDRESSED = re.compile(rf"^[0-9a-f]{{{HASH_LENGTH}}}(-\d+)?\.[a-z0-9]+$")
+
+
+def sniff_image_type(head: bytes) -> str | None:
+    """Расширение по сигнатуре файла; заголовку Content-Type клиента не доверяем."""
+    if head.startswith(b"\xff\xd8\xff"):
+        return ".jpg"
+    if head.startswith(b"\x89PNG\r\n\x1a\n"):
+        return ".png"
+    if head[:6] in (b"GIF87a", b"GIF89a"):
+        return ".gif"
+    if head[:4] == b"RIFF" and head[8:12] == b"WEBP":
+        return ".webp"
+    if head[4:8] == b"ftyp" and head[8:12] in (b"avif", b"avis"):
+        return ".avif"
+    return None
+
+
+def _open_temp(target_dir: Path) -> Tuple[Path, BinaryIO]:
+    target_dir.mkdir(parents=True, exist_ok=True)
+    temp_path = target_dir / f".upload-{secrets.token_hex(8)}"
+    return temp_path, temp_path.open("wb")
+
+
+def _finish(temp_path: Path, handle: BinaryIO, target: Path) -> bool:
+    handle.close()
+    if target.exists():
+        # такой файл уже загружали — оставляем существующий
+        temp_path.unlink(missing_ok=True)
+        return False
+    os.replace(temp_path, target)
+    return True
+
+
+def _discard(temp_path: Path, handle: BinaryIO) -> None:
+    handle.close()
+    temp_path.unlink(missing_ok=True)
+
+
+async def save_upload(upload: UploadFile, base_dir: Path, subdir: str, max_bytes: int) -> str:
+    """Сохраняет загруженное изображение под именем из sha256 содержимого.
+
+    Файл читается и пишется кусками вне event loop, размер ограничен `max_bytes`.
+    Повторная загрузка того же файла не создаёт копию. Возвращает путь относительно `base_dir`.
+    """
+    target_dir = base_dir / subdir
+    temp_path, handle = await run_in_threadpool(_open_temp, target_dir)
+    digest = hashlib.sha256()
+    size = 0
+    ext: str | None = None
+    try:
+        while chunk := await upload.read(CHUNK_SIZE):
+            if ext is None:
+                ext = sniff_image_type(chunk[:16])
+                if ext is None:
+                    raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Нужно изображение")
+            size += len(chunk)
+            if size > max_bytes:
+                raise HTTPException(
+                    status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE, detail="Файл слишком большой"
+                )
+            digest.update(chunk)
+            await run_in_threadpool(handle.write, chunk)
+        if ext is None:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Пустой файл")
+    except BaseException:
+        metrics.UPLOADS.inc(result="rejected")
+        await run_in_threadpool(_discard, temp_path, handle)
+        raise
+    name = f"{digest.hexdigest()[:HASH_LENGTH]}{ext}"
+    stored = await run_in_threadpool(_finish, temp_path, handle, target_dir / name)
+    metrics.UPLOADS.inc(result="stored" if stored else "duplicate")
+    metrics.UPLOAD_BYTES.inc(size)
+    return f"{subdir}/{name}"
+
+
+def remove_files(base_dir: Path, subdir: str, rel_paths: Iterable[str]) -> None:
+    """Удаляет файлы изображений; пути вне `base_dir/subdir` игнорируются."""
+    root = (base_dir / subdir).resolve()
+    for rel_path in rel_paths:
+        path = (base_dir / rel_path).resolve()
+        if root not in path.parents:
+            continue
+        path.unlink(missing_ok=True)
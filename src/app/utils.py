@@ -3,11 +3,11 @@ from __future__ import annotations
 from typing import Iterable, List
 
 
-def tags_to_text(tags: Iterable[str] | None) -> str | None:
+def normalize_tags(tags: Iterable[str] | None) -> List[str]:
     if not tags:
-        return None
+        return []
     cleaned = [t.strip() for t in tags if t and t.strip()]
-    return ",".join(cleaned) if cleaned else None
+    return list(dict.fromkeys(cleaned))
 
 
 def tags_from_text(text: str | None) -> List[str]:
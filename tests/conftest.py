@@ -0,0 +1,28 @@
+from __future__ import annotations
+
+import asyncio
+from typing import Iterator
+
+import pytest
+
+from app import assets, database, search
+
+
+@pytest.fixture(autouse=True)
+def isolated_globals() -> Iterator[None]:
+    """Движки БД, флаг поиска и манифесты статики — глобальные на процесс.
+
+    create_app не пересоздаёт уже открытый движок, поэтому без сброса второе
+    приложение в тесте работало бы с базой из tmp_path предыдущего.
+    """
+    manifests = dict(assets._manifests)
+    yield
+    if database.engine is not None:
+        database.engine.dispose()
+        database.engine = None
+    if database.async_engine is not None:
+        asyncio.run(database.async_engine.dispose())
+        database.async_engine = None
+    search.enabled = False
+    assets._manifests.clear()
+    assets._manifests.update(manifests)
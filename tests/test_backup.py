@@ -0,0 +1,55 @@
+from __future__ import annotations
+
+import sqlite3
+import time
+from contextlib import closing
+from pathlib import Path
+
+import pytest
+
+from app import backup
+
+
+@pytest.fixture
+def database(tmp_path: Path) -> Path:
+    path = tmp_path / "app.db"
+    with closing(sqlite3.connect(path)) as conn:
+        conn.execute("CREATE TABLE t (x TEXT)")
+        conn.executemany("INSERT INTO t VALUES (?)", [("x" * 3000,) for _ in range(40)])
+        conn.commit()
+    return path
+
+
+def copy_seconds(database: Path, target: Path, pause: float) -> float:
+    started = time.perf_counter()
+    backup.copy_database(database, target, pages_per_step=1, pause=pause)
+    return time.perf_counter() - started
+
+
+def test_pause_between_steps(database: Path, tmp_path: Path) -> None:
+    with closing(sqlite3.connect(database)) as conn:
+        pages = conn.execute("PRAGMA page_count").fetchone()[0]
+    fast = copy_seconds(database, tmp_path / "fast.db", 0.0)
+    slow = copy_seconds(database, tmp_path / "slow.db", 0.01)
+    # пауза после каждого шага, кроме последнего
+    assert slow - fast >= (pages - 1) * 0.01 * 0.8
+    with closing(sqlite3.connect(tmp_path / "slow.db")) as conn:
+        assert conn.execute("SELECT count(*) FROM t").fetchone()[0] == 40
+
+
+def test_restore_latest_skips_safety_copy(database: Path, tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setenv("APP_DATA_DIR", str(tmp_path))
+    monkeypatch.setattr(backup, "get_settings", lambda: backup.Settings())
+    backup_dir = tmp_path / "backups"
+    first = backup.create_backup(tmp_path, database, backup_dir, name="20240101T000000Z")
+    with closing(sqlite3.connect(database)) as conn:
+        conn.execute("DELETE FROM t")
+        conn.commit()
+    assert backup.main(["restore", "latest"]) == 0
+    assert backup.main(["restore", "latest"]) == 0
+    names = [b.name for b in backup.list_backups(backup_dir)]
+    assert len([name for name in names if backup.PRE_RESTORE_SUFFIX in name]) == 2
+    with closing(sqlite3.connect(database)) as conn:
+        # оба раза восстановлена первая копия, а не страховочная с пустой таблицей
+        assert conn.execute("SELECT count(*) FROM t").fetchone()[0] == 40
+    assert first.name in names
@@ -0,0 +1,50 @@
+from __future__ import annotations
+
+import os
+from pathlib import Path
+
+from starlette.applications import Starlette
+from starlette.routing import Mount
+from starlette.staticfiles import StaticFiles
+from starlette.testclient import TestClient
+
+from app.compression import CompressionMiddleware, strip_encoding
+
+GZIP = {"Accept-Encoding": "gzip"}
+
+
+def make_client(directory: Path) -> TestClient:
+    app = Starlette(routes=[Mount("/static", StaticFiles(directory=directory))])
+    return TestClient(CompressionMiddleware(app, minimum_size=16))
+
+
+def test_strip_encoding() -> None:
+    assert strip_encoding('"abc-gzip"') == '"abc"'
+    assert strip_encoding('"abc-br"') == '"abc"'
+    assert strip_encoding('"abc"') == '"abc"'
+
+
+def test_same_etag_different_files_not_mixed(tmp_path: Path) -> None:
+    # ETag StaticFiles — из mtime и размера: у этих файлов он совпадает
+    for name, char in (("a.css", "a"), ("b.css", "b")):
+        path = tmp_path / name
+        path.write_text(char * 2000)
+        os.utime(path, (1_700_000_000, 1_700_000_000))
+    client = make_client(tmp_path)
+    first = client.get("/static/a.css", headers=GZIP)
+    second = client.get("/static/b.css", headers=GZIP)
+    assert first.headers["etag"] == second.headers["etag"]
+    assert first.text == "a" * 2000
+    assert second.text == "b" * 2000
+
+
+def test_compressed_static_revalidates(tmp_path: Path) -> None:
+    (tmp_path / "app.js").write_text("console.log(1);\n" * 200)
+    client = make_client(tmp_path)
+    response = client.get("/static/app.js", headers=GZIP)
+    assert response.headers["content-encoding"] == "gzip"
+    etag = response.headers["etag"]
+    assert etag.endswith('-gzip"')
+    revalidated = client.get("/static/app.js", headers={**GZIP, "If-None-Match": etag})
+    assert revalidated.status_code == 304
+    assert revalidated.headers["etag"] == etag
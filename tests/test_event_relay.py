@@ -0,0 +1,50 @@
+from __future__ import annotations
+
+from pathlib import Path
+
+import pytest
+
+from app import generation
+from app.generation import EventRelay
+
+
+def as_worker(monkeypatch: pytest.MonkeyPatch, pid: int) -> None:
+    monkeypatch.setattr(generation.os, "getpid", lambda: pid)
+
+
+def test_relays_only_foreign_events(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    path = tmp_path / "events"
+    first, second = EventRelay(path), EventRelay(path)
+    as_worker(monkeypatch, 1)
+    first.append("upsert", {"id": 7})
+    assert first.read() == []
+    as_worker(monkeypatch, 2)
+    second.append("delete", {"id": 3})
+    assert second.read() == [("upsert", {"id": 7})]
+    assert second.read() == []
+    as_worker(monkeypatch, 1)
+    assert first.read() == [("delete", {"id": 3})]
+
+
+def test_rotation_keeps_unread_events(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    path = tmp_path / "events"
+    writer, reader = EventRelay(path, max_bytes=200), EventRelay(path, max_bytes=200)
+    as_worker(monkeypatch, 1)
+    for item_id in range(5):
+        writer.append("upsert", {"id": item_id})
+    assert path.with_name("events.1").exists()
+    as_worker(monkeypatch, 2)
+    assert [data["id"] for _, data in reader.read()] == [0, 1, 2, 3, 4]
+
+
+def test_lost_events_become_reset(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    path = tmp_path / "events"
+    writer, reader = EventRelay(path, max_bytes=120), EventRelay(path, max_bytes=120)
+    as_worker(monkeypatch, 1)
+    for item_id in range(6):
+        writer.append("upsert", {"id": item_id})
+    as_worker(monkeypatch, 2)
+    assert reader.read() == [("reset", {})]
+    writer.append("delete", {"id": 1})
+    as_worker(monkeypatch, 3)
+    assert reader.read() == [("delete", {"id": 1})]
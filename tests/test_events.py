@@ -0,0 +1,37 @@
+from __future__ import annotations
+
+import asyncio
+from typing import List
+
+from app.events import EventHub
+
+
+async def first_chunk(hub: EventHub, last_event_id: str | None) -> bytes:
+    stream = hub.stream(last_event_id)
+    try:
+        return await stream.__anext__()
+    finally:
+        await stream.aclose()
+
+
+def names(chunk: bytes) -> List[str]:
+    return [line[len(b"event: ") :].decode() for line in chunk.splitlines() if line.startswith(b"event: ")]
+
+
+def test_replay_from_own_id() -> None:
+    hub = EventHub()
+    first = hub.publish("upsert", {"id": 1})
+    hub.publish("delete", {"id": 2})
+    chunk = asyncio.run(first_chunk(hub, hub.event_id(first.id)))
+    assert names(chunk) == ["delete"]
+
+
+def test_foreign_id_gets_reset() -> None:
+    # другой воркер с теми же номерами событий: его id не должен досылать наши события
+    other, hub = EventHub(), EventHub()
+    for hub_ in (other, hub):
+        hub_.publish("upsert", {"id": 1})
+        hub_.publish("upsert", {"id": 2})
+    chunk = asyncio.run(first_chunk(hub, other.event_id(1)))
+    assert names(chunk) == ["reset"]
+    assert names(asyncio.run(first_chunk(hub, "12345"))) == ["reset"]
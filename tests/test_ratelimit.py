@@ -0,0 +1,56 @@
+from __future__ import annotations
+
+from pathlib import Path
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.app_factory import create_app
+from app.config import Settings
+from app.ratelimit import TokenBucket
+
+
+def make_client(tmp_path: Path, **overrides: object) -> TestClient:
+    settings = Settings(
+        data_dir=tmp_path,
+        admin_token="secret",
+        rate_limit_burst=2,
+        rate_limit_writes_per_minute=0.01,
+        **overrides,
+    )
+    return TestClient(create_app(settings))
+
+
+def statuses(client: TestClient, forwarded: bool) -> list[int]:
+    result = []
+    for i in range(4):
+        headers = {"X-Forwarded-For": f"203.0.113.{i}"} if forwarded else {}
+        result.append(client.post("/api/wishlist/1/reserve", json={}, headers=headers).status_code)
+    return result
+
+
+def test_bucket_refills_at_rate() -> None:
+    bucket = TokenBucket(rate=1.0, burst=2)
+    assert bucket.take("a", now=0.0) == 0
+    assert bucket.take("a", now=0.0) == 0
+    assert bucket.take("a", now=0.0) == pytest.approx(1.0)
+    assert bucket.take("a", now=1.0) == 0
+    assert bucket.take("b", now=0.0) == 0
+
+
+def test_any_proxy_trusted_disables_per_client_limit(tmp_path: Path) -> None:
+    # с APP_TRUSTED_HOSTS=* адрес клиента неизвестен: лимит на адрес выключен, а не общий на всех
+    client = make_client(tmp_path, trusted_hosts="*")
+    assert 429 not in statuses(client, forwarded=False)
+
+
+def test_any_proxy_trusted_rejects_explicit_limit(tmp_path: Path) -> None:
+    with pytest.raises(RuntimeError, match="APP_TRUSTED_HOSTS"):
+        make_client(tmp_path, trusted_hosts="*", rate_limit_enabled=True)
+
+
+def test_forwarded_for_used_from_trusted_proxy(tmp_path: Path) -> None:
+    # TestClient подключается с адреса "testclient": за доверенным прокси у каждого клиента своя корзина
+    client = make_client(tmp_path, trusted_hosts="testclient")
+    assert 429 not in statuses(client, forwarded=True)
+    assert statuses(client, forwarded=False)[2:] == [429, 429]
@@ -0,0 +1,74 @@
+from __future__ import annotations
+
+import io
+from pathlib import Path
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.app_factory import create_app
+from app.config import Settings, get_settings
+from app.images import ImageError, build_variants
+
+Image = pytest.importorskip("PIL.Image")
+
+ADMIN = {"X-Admin-Token": "secret"}
+
+
+@pytest.fixture
+def client(tmp_path: Path) -> TestClient:
+    settings = Settings(data_dir=tmp_path, admin_token="secret", rate_limit_enabled=False)
+    app = create_app(settings)
+    app.dependency_overrides[get_settings] = lambda: settings
+    return TestClient(app)
+
+
+def jpeg(color: str = "red") -> bytes:
+    buffer = io.BytesIO()
+    Image.new("RGB", (64, 48), color).save(buffer, "JPEG")
+    return buffer.getvalue()
+
+
+def stored(tmp_path: Path) -> list[str]:
+    directory = tmp_path / "wishlist"
+    return sorted(p.name for p in directory.iterdir()) if directory.is_dir() else []
+
+
+def test_update_missing_item_keeps_no_upload(client: TestClient, tmp_path: Path) -> None:
+    response = client.put("/api/wishlist/42", headers=ADMIN, data={"title": "x"}, files={"image": ("a.jpg", jpeg(), "image/jpeg")})
+    assert response.status_code == 404
+    assert stored(tmp_path) == []
+
+
+def test_unprocessable_image_is_removed(client: TestClient, tmp_path: Path) -> None:
+    broken = jpeg()[:40]
+    response = client.post("/api/wishlist", headers=ADMIN, data={"title": "x"}, files={"image": ("a.jpg", broken, "image/jpeg")})
+    assert response.status_code == 400
+    assert stored(tmp_path) == []
+
+
+def test_failed_update_keeps_current_image(client: TestClient, tmp_path: Path) -> None:
+    created = client.post("/api/wishlist", headers=ADMIN, data={"title": "x"}, files={"image": ("a.jpg", jpeg(), "image/jpeg")})
+    item_id = created.json()["item"]["id"]
+    before = stored(tmp_path)
+    assert before
+    response = client.put(
+        f"/api/wishlist/{item_id}", headers=ADMIN, data={"title": "y"}, files={"image": ("b.jpg", jpeg("blue")[:40], "image/jpeg")}
+    )
+    assert response.status_code == 400
+    assert stored(tmp_path) == before
+
+
+def test_decompression_bomb_is_rejected(client: TestClient, tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(Image, "MAX_IMAGE_PIXELS", 100)
+    response = client.post("/api/wishlist", headers=ADMIN, data={"title": "x"}, files={"image": ("a.jpg", jpeg(), "image/jpeg")})
+    assert response.status_code == 400
+    assert stored(tmp_path) == []
+
+
+def test_unsupported_variant_format_raises_image_error(tmp_path: Path) -> None:
+    source = tmp_path / "a.jpg"
+    source.write_bytes(jpeg())
+    with pytest.raises(ImageError):
+        build_variants(source, tmp_path, "nosuchformat", (32,), 80)
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["a.jpg"]